@@ -1,27 +1,124 @@
+import threading
+from dataclasses import dataclass
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..models.models import User
-from ..schemas.schemas import Token, UserCreate, UserResponse
+from ..schemas.schemas import Token, UserAccessUpdate, UserCreate, UserResponse
 from ..core.security import hash_password, verify_password, create_access_token
+from ..core import duplicates
+from ..core.cache import TTLCache
+from ..core.metrics import InstrumentedRoute
+from ..core.config import settings
 from jose import jwt, JWTError
 from datetime import timedelta
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+EMBED_PRINCIPAL_CLAIMS = settings.embed_principal_claims
+PRINCIPAL_CACHE_SIZE = settings.principal_cache_size
+PRINCIPAL_CACHE_TTL = settings.principal_cache_ttl
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-
-router = APIRouter(tags=["Authentication"])
+router = APIRouter(tags=["Authentication"], route_class=InstrumentedRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route handlers"""
+    id: str
+    username: str
+    is_admin: bool
+    is_active: bool = True
+
+
+# Principals resolved from the database, keyed by username. Tokens carrying
+# uid/role claims also carry the user's access_version, which the database
+# bumps whenever the user is deactivated, renamed or changes role; the claims
+# are trusted while it still matches, so the full user is not loaded. Both
+# caches are per process and invalidated only in the process making the
+# change, so another worker can act on a stale principal or access version
+# for at most PRINCIPAL_CACHE_TTL seconds.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+access_versions = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+_claim_lock = threading.Lock()
+_claim_resolutions = 0
+
+
+def invalidate_principal(user: User):
+    """Forget cached principals and token claims for a user whose access changed"""
+    principal_cache.pop(user.username)
+    access_versions.pop(user.id)
+
+
+def _access_changed(target: User) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in ("is_active", "is_admin", "username"))
+
+
+@event.listens_for(User, "before_update")
+def _bump_access_version(mapper, connection, target):
+    """Make tokens issued before an access change stop resolving from their claims"""
+    if _access_changed(target):
+        target.access_version = (target.access_version or 1) + 1
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_access_change(mapper, connection, target):
+    """Invalidate principals when a user is deactivated, renamed or changes role"""
+    if _access_changed(target):
+        invalidate_principal(target)
+        # The previous username is still cached under its old key
+        for old_username in inspect(target).attrs.username.history.deleted:
+            principal_cache.pop(old_username)
+
+
+def principal_claims(user: User) -> dict:
+    """Get the JWT claims identifying a user, with id and role when enabled"""
+    claims = {"sub": user.username}
+    if EMBED_PRINCIPAL_CLAIMS:
+        claims.update({"uid": user.id, "role": "admin" if user.is_admin else "user", "av": user.access_version or 1})
+    return claims
+
+
+def current_access_version(db: Session, user_id: str) -> int:
+    """Get a user's access version, cached for PRINCIPAL_CACHE_TTL; 0 if the user is gone"""
+    version = access_versions.get(user_id)
+    if version is None:
+        version = db.query(User.access_version).filter(User.id == user_id).scalar() or 0
+        access_versions.set(user_id, version)
+    return version
+
+
+def principal_cache_stats() -> dict:
+    """Get principal cache counters, including lookups answered by token claims"""
+    stats = principal_cache.stats()
+    stats["token_claim_resolutions"] = _claim_resolutions
+    return stats
+
+
+def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """Validate a JWT without resolving its user, for read-only lookup services"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = None
+    if not payload or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     """Get current user from JWT token"""
+    global _claim_resolutions
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -35,14 +132,27 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    
+    # Trust embedded claims unless the user's access changed since the token was issued
+    user_id, role, version = payload.get("uid"), payload.get("role"), payload.get("av")
+    if user_id and role and version and version == current_access_version(db, user_id):
+        with _claim_lock:
+            _claim_resolutions += 1
+        return Principal(id=user_id, username=username, is_admin=role == "admin")
+    
+    principal = principal_cache.get(username)
+    if principal is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal(id=user.id, username=user.username, is_admin=user.is_admin, is_active=user.is_active)
+        principal_cache.set(username, principal)
+    if not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login endpoint that returns JWT token"""
     user = db.query(User).filter(User.username == form_data.username).first()
     
@@ -52,15 +162,18 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
         
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=principal_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
     db_user = db.query(User).filter(User.username == user.username).first()
@@ -88,11 +201,49 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
+    # Queue existing users with a near-identical name and email for review
+    db.flush()
+    duplicates.check_entity(db, "user", db_user.id, duplicates.user_features(db_user.full_name, db_user.email))
     db.commit()
     db.refresh(db_user)
     return db_user
 
 @router.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user profile"""
-    return current_user
\ No newline at end of file
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.get("/users/principal-cache")
+def read_principal_cache_stats(current_user: Principal = Depends(get_current_user)):
+    """Get principal cache hit rates (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can view cache statistics")
+    return principal_cache_stats()
+
+@router.patch("/users/{user_id}", response_model=UserResponse)
+def update_user_access(
+    user_id: str,
+    access: UserAccessUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Activate, deactivate, promote or demote a user (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can change user access")
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if access.is_active is not None:
+        user.is_active = access.is_active
+    if access.is_admin is not None:
+        user.is_admin = access.is_admin
+    
+    # Cached principals are invalidated by the User after_update hook
+    db.commit()
+    db.refresh(user)
+    return user
\ No newline at end of file
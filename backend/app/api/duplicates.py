@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Dict, List, Literal, Optional
+from datetime import datetime
+from ..db.database import get_db
+from ..models.models import DuplicateCandidate, LandRecord, User
+from ..schemas.schemas import DuplicateCandidateResponse, DuplicateReview
+from ..core.pagination import decode_cursor, keyset_page, split_page
+from ..core.projection import FastJSONResponse
+from ..core.metrics import InstrumentedRoute
+from .auth import Principal, get_current_user
+
+router = APIRouter(prefix="/duplicates", tags=["Duplicates"], route_class=InstrumentedRoute)
+
+def _require_admin(current_user: Principal):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can review duplicates")
+
+def _summaries(db: Session, candidates: List[DuplicateCandidate]) -> Dict[str, dict]:
+    """Load the parcels and users referenced by candidates, two queries at most"""
+    ids = {"parcel": set(), "user": set()}
+    for candidate in candidates:
+        ids[candidate.kind].update((candidate.first_id, candidate.second_id))
+    summaries = {}
+    if ids["parcel"]:
+        rows = db.query(
+            LandRecord.id, LandRecord.survey_number, LandRecord.property_address,
+            LandRecord.area_sqft, LandRecord.owner_id, LandRecord.created_at,
+        ).filter(LandRecord.id.in_(ids["parcel"]))
+        summaries.update((row.id, row._asdict()) for row in rows)
+    if ids["user"]:
+        rows = db.query(
+            User.id, User.username, User.full_name, User.email, User.is_active, User.created_at,
+        ).filter(User.id.in_(ids["user"]))
+        summaries.update((row.id, row._asdict()) for row in rows)
+    return summaries
+
+def _response(candidate: DuplicateCandidate, summaries: Dict[str, dict]) -> dict:
+    return {
+        **{name: getattr(candidate, name) for name in DuplicateCandidateResponse.model_fields
+           if name not in ("first", "second")},
+        "first": summaries.get(candidate.first_id),
+        "second": summaries.get(candidate.second_id),
+    }
+
+@router.get("/", response_model=List[DuplicateCandidateResponse])
+def read_duplicates(
+    status: Literal["pending", "confirmed", "dismissed"] = "pending",
+    kind: Optional[Literal["parcel", "user"]] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get a page of the duplicate review queue, oldest first (admin only)
+
+    Each candidate pair includes a summary of both parcels or users. Pages
+    continue from the opaque cursor in the ``X-Next-Cursor`` header.
+    """
+    _require_admin(current_user)
+    try:
+        after = decode_cursor(cursor, "detected_at") if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = db.query(DuplicateCandidate).filter(DuplicateCandidate.status == status)
+    if kind:
+        query = query.filter(DuplicateCandidate.kind == kind)
+    rows = keyset_page(query, DuplicateCandidate.detected_at, DuplicateCandidate.id, after, limit, False)
+    candidates, next_cursor = split_page(rows, "detected_at", limit)
+    summaries = _summaries(db, candidates)
+
+    return FastJSONResponse(
+        [_response(candidate, summaries) for candidate in candidates],
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+    )
+
+@router.put("/{candidate_id}", response_model=DuplicateCandidateResponse)
+def review_duplicate(
+    candidate_id: str,
+    review: DuplicateReview,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Confirm or dismiss a duplicate candidate (admin only)
+
+    Dismissed pairs are not queued again by later scans.
+    """
+    _require_admin(current_user)
+    candidate = db.query(DuplicateCandidate).filter(DuplicateCandidate.id == candidate_id).first()
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Duplicate candidate not found")
+
+    candidate.status = review.status
+    candidate.reviewed_by = current_user.id
+    candidate.reviewed_at = datetime.now()
+    db.commit()
+    db.refresh(candidate)
+    return _response(candidate, _summaries(db, [candidate]))
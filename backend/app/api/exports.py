@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from datetime import datetime
+from ..db.database import read_engine
+from ..core import export
+from ..core.metrics import InstrumentedRoute
+from .auth import Principal, get_current_user
+
+router = APIRouter(prefix="/exports", tags=["Exports"], route_class=InstrumentedRoute)
+
+def _export_stream(dataset: str, fmt: str, since: Optional[datetime], compress: bool):
+    # Runs while the response is sent, after request dependencies have
+    # closed, so it holds its own connection until the export ends
+    with read_engine.connect() as conn:
+        yield from export.encode(dataset, fmt, export.iter_rows(conn, dataset, since), compress)
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: Literal["land_records", "mutations", "documents"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    compress: bool = False,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream every row of a dataset, or only rows changed after ``since`` (admin only)
+
+    The ``X-Export-Watermark`` header holds the ``since`` value for the next
+    incremental export. Rows may repeat across exports; upsert them by id.
+    Set ``compress`` for a gzip file.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can export the registry")
+    
+    next_since = export.watermark(datetime.now())
+    return StreamingResponse(
+        _export_stream(dataset, format, since, compress),
+        media_type="application/gzip" if compress else export.MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export.file_name(dataset, format, compress, since)}"',
+            "X-Export-Watermark": next_since.isoformat(),
+        },
+    )
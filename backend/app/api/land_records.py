@@ -1,34 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-import os
-import uuid
-from ..db.database import get_db
-from ..models.models import LandRecord, Document
-from ..schemas.schemas import LandRecordCreate, LandRecordResponse, DocumentResponse
-from ..core.security import calculate_file_hash
-from .auth import get_current_user
-from ..models.models import User
+from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Literal, Optional
+import mimetypes
+from datetime import datetime
 from pathlib import Path
+from urllib.parse import quote
+from ..db.database import get_db
+from ..models.models import LandRecord, Document, MutationRecord, OwnershipInterval
+from ..schemas.schemas import LandRecordCreate, LandRecordResponse, LandRecordDetail, LandRecordSearchResult, DocumentResponse, ImportReport
+from ..core import boundaries, bulk_import, duplicates, ledger, previews, reports, verification
+from ..core.bulk_import import detect_format
+from ..core.storage import UploadTooLarge, accel_redirect, store_stream
+from ..core.pagination import decode_cursor, keyset_page, split_page
+from ..core.http_cache import not_modified, validator_headers
+from ..core.projection import FastJSONResponse, columns, parse_fields, rows_to_dicts, select_names
+from ..core.geo import CLUSTER_MAX_ZOOM, index_parcel, query_clusters, query_parcels
+from ..core.search import search_parcels
+from ..core.metrics import InstrumentedRoute
+from .auth import Principal, get_current_user
 
-router = APIRouter(prefix="/land-records", tags=["Land Records"])
+router = APIRouter(prefix="/land-records", tags=["Land Records"], route_class=InstrumentedRoute)
 
-# Ensure upload directory exists
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+MAX_BATCH_FILES = 20
+
+def _owned_at(as_of: datetime) -> list:
+    """Filter ownership intervals to those in effect at a moment"""
+    return [
+        OwnershipInterval.valid_from <= as_of,
+        or_(OwnershipInterval.valid_to.is_(None), OwnershipInterval.valid_to > as_of),
+    ]
 
 @router.post("/", response_model=LandRecordResponse)
-async def create_land_record(
+def create_land_record(
     land_record: LandRecordCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create a new land record"""
+    """Create a new land record
+
+    A record with a boundary is refused if it overlaps a registered parcel;
+    without an explicit location it is mapped at a point inside the boundary.
+    """
     # Check if survey number already exists
     existing_record = db.query(LandRecord).filter(LandRecord.survey_number == land_record.survey_number).first()
     if existing_record:
         raise HTTPException(status_code=400, detail="Survey number already registered")
     
+    boundary = None
+    if land_record.boundary is not None:
+        try:
+            boundary = boundaries.normalize(land_record.boundary)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     # Create the record
     db_land_record = LandRecord(
         owner_id=current_user.id,
@@ -38,114 +64,478 @@ async def create_land_record(
         geo_latitude=land_record.geo_latitude,
         geo_longitude=land_record.geo_longitude
     )
+    if boundary:
+        db_land_record.boundary = boundaries.encode(boundary)
+        if land_record.geo_latitude is None or land_record.geo_longitude is None:
+            db_land_record.geo_longitude, db_land_record.geo_latitude = boundaries.interior_point(boundary)
     
     db.add(db_land_record)
+    index_parcel(db, db_land_record)
+    if boundary:
+        # Flushing first moves the session onto the writer, so the check and
+        # the insert cannot interleave with another registration's
+        db.flush()
+        overlapping = boundaries.find_overlaps(db, boundary)
+        if overlapping:
+            db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail=f"Boundary overlaps registered parcel(s): {', '.join(sorted(overlapping))}"
+            )
+        boundaries.index_boundary(db, db_land_record)
+    # Queue registered parcels with a near-identical address for review
+    db.flush()
+    duplicates.check_entity(db, "parcel", db_land_record.id, duplicates.parcel_features(db_land_record.property_address))
+    reports.record_parcels_created(db, [(current_user.id, land_record.area_sqft, datetime.now())])
     db.commit()
+    verification.invalidate("property", [db_land_record.survey_number])
     db.refresh(db_land_record)
     return db_land_record
 
+@router.post("/import", response_model=ImportReport)
+def import_land_records(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Form(None),
+    start_row: int = Form(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Bulk import land records from a CSV or NDJSON file (admin only)
+
+    Rows without an ``owner_username`` or ``owner_id`` are assigned to the
+    importing administrator. Valid rows are committed in batches; the report
+    lists failed rows and the checkpoint to resume from.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can import land records")
+    
+    fmt = format or detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Could not detect file format; pass format=csv or format=ndjson")
+    
+    file.file.seek(0)
+    result = bulk_import.import_land_records(
+        db, bulk_import.iter_rows(file.file, fmt), default_owner_id=current_user.id, start_row=start_row
+    )
+    return result.as_dict()
+
 @router.get("/", response_model=List[LandRecordResponse])
-async def read_land_records(
-    skip: int = 0, 
-    limit: int = 100, 
+def read_land_records(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    sort: Literal["created_at", "updated_at"] = "created_at",
+    order: Literal["asc", "desc"] = "asc",
+    owner_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    as_of: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, default all"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all land records owned by the current user"""
+    """Get a page of land records owned by the current user
+
+    Pages are ordered by ``sort`` and continue from the opaque cursor returned
+    in the ``X-Next-Cursor`` header of the previous page. With ``as_of``,
+    ownership is as it was at that moment: the records owned then, each with
+    its owner then. Other fields are current.
+    """
+    try:
+        after = decode_cursor(cursor, sort) if cursor else None
+        field_names = parse_fields(fields, LandRecordResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    sort_column = getattr(LandRecord, sort)
+    names = select_names(field_names, "id", sort)
+    owner_column = LandRecord.owner_id
+    if as_of:
+        owner_column = OwnershipInterval.owner_id
+        selected = [owner_column.label(name) if name == "owner_id" else getattr(LandRecord, name).label(name) for name in names]
+        query = db.query(*selected).join(OwnershipInterval, OwnershipInterval.land_id == LandRecord.id) \
+            .filter(*_owned_at(as_of))
+    else:
+        query = db.query(*columns(LandRecord, names))
     if current_user.is_admin:
-        # Admins can see all records
-        records = db.query(LandRecord).offset(skip).limit(limit).all()
+        # Admins can see all records, optionally narrowed to one owner
+        if owner_id:
+            query = query.filter(owner_column == owner_id)
     else:
         # Regular users see only their records
-        records = db.query(LandRecord).filter(LandRecord.owner_id == current_user.id).offset(skip).limit(limit).all()
-    return records
+        query = query.filter(owner_column == current_user.id)
+    if date_from:
+        query = query.filter(sort_column >= date_from)
+    if date_to:
+        query = query.filter(sort_column < date_to)
+    
+    rows = keyset_page(query, sort_column, LandRecord.id, after, limit, order == "desc")
+    records, next_cursor = split_page(rows, sort, limit)
+    return FastJSONResponse(
+        rows_to_dicts(records, names, field_names),
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+    )
+
+@router.get("/map")
+def read_map_parcels(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    limit: int = Query(2000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get land records inside a map viewport as GeoJSON, clustered at low zoom"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if current_user.is_admin and zoom <= CLUSTER_MAX_ZOOM:
+        # Admins see the whole registry, so zoomed-out views use precomputed clusters
+        features = query_clusters(db, bbox, zoom, limit)
+    else:
+        # Regular users only see their own records, which are never clustered
+        owner_id = None if current_user.is_admin else current_user.id
+        features = query_parcels(db, bbox, limit, owner_id)
+    return {"type": "FeatureCollection", "features": features}
+
+@router.get("/search", response_model=List[LandRecordSearchResult])
+def search_land_records(
+    q: str = Query(..., min_length=3, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Search land records by partial survey number, address or owner name
+
+    Results matching every word come first; then, if there are too few,
+    records with similar spelling.
+    """
+    # Regular users only search their own records
+    owner_id = None if current_user.is_admin else current_user.id
+    try:
+        return search_parcels(db, q, limit, owner_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/at", response_model=List[LandRecordResponse])
+def read_land_records_at(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get the land records whose boundaries contain a coordinate"""
+    # Regular users only look up their own records
+    owner_id = None if current_user.is_admin else current_user.id
+    record_ids = boundaries.parcels_at(db, lat, lon, owner_id)
+    if not record_ids:
+        return []
+    return db.query(LandRecord).filter(LandRecord.id.in_(record_ids)).order_by(LandRecord.survey_number).all()
 
 @router.get("/{record_id}", response_model=LandRecordResponse)
-async def read_land_record(
+def read_land_record(
     record_id: str,
+    request: Request,
+    response: Response,
+    as_of: Optional[datetime] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get a specific land record"""
+    """Get a specific land record
+
+    With ``as_of``, ``owner_id`` is whoever owned the parcel at that moment;
+    that owner can read it too. The ETag is the record's version, so
+    revalidation skips serialization.
+    """
     record = db.query(LandRecord).filter(LandRecord.id == record_id).first()
     
     if not record:
         raise HTTPException(status_code=404, detail="Land record not found")
     
+    owner_then = None
+    if as_of:
+        owner_then = db.query(OwnershipInterval.owner_id) \
+            .filter(OwnershipInterval.land_id == record_id, *_owned_at(as_of)) \
+            .order_by(OwnershipInterval.valid_from.desc()).limit(1).scalar()
+        if owner_then is None:
+            raise HTTPException(status_code=404, detail="Land record was not registered at that time")
+    
     # Only owner or admin can view the record
-    if record.owner_id != current_user.id and not current_user.is_admin:
+    if current_user.id not in (record.owner_id, owner_then) and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to access this record")
-        
+    
+    etag = f'"{record.id}.{record.version}"' if not as_of else f'"{record.id}.{record.version}@{as_of.isoformat()}"'
+    unchanged = not_modified(request, etag, record.updated_at)
+    if unchanged:
+        return unchanged
+    response.headers.update(validator_headers(etag, record.updated_at))
+    if as_of:
+        return {**{name: getattr(record, name) for name in LandRecordResponse.model_fields}, "owner_id": owner_then}
     return record
 
-@router.post("/{record_id}/documents", response_model=DocumentResponse)
-async def upload_document(
+@router.get("/{record_id}/full", response_model=LandRecordDetail)
+def read_land_record_full(
     record_id: str,
-    document_type: str = Form(...),
-    file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Upload a document for a land record"""
-    # Verify land record exists and user owns it
-    record = db.query(LandRecord).filter(LandRecord.id == record_id).first()
+    """Get a land record with its owner, documents and full mutation history
+
+    Loaded in three queries: the record joined to its owner, its documents,
+    and its mutations joined to both parties.
+    """
+    record = db.query(LandRecord).options(
+        joinedload(LandRecord.owner),
+        selectinload(LandRecord.documents),
+        selectinload(LandRecord.mutations).options(
+            joinedload(MutationRecord.previous_owner),
+            joinedload(MutationRecord.new_owner),
+        ),
+    ).filter(LandRecord.id == record_id).first()
+    
     if not record:
         raise HTTPException(status_code=404, detail="Land record not found")
     
+    # Only owner or admin can view the record
     if record.owner_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Not authorized to upload to this record")
+        raise HTTPException(status_code=403, detail="Not authorized to access this record")
     
-    # Create a directory for this record if it doesn't exist
-    record_dir = UPLOAD_DIR / record_id
-    record_dir.mkdir(exist_ok=True)
+    mutations = sorted(record.mutations, key=lambda mutation: (mutation.mutation_date, mutation.id))
+    owner_since = max(
+        (mutation.decided_at or mutation.mutation_date for mutation in mutations
+         if mutation.status == "approved" and mutation.new_owner_id == record.owner_id),
+        default=record.created_at,
+    )
+    return {
+        **{name: getattr(record, name) for name in LandRecordResponse.model_fields},
+        "is_active": record.is_active is not False,
+        "owner": record.owner,
+        "owner_since": owner_since,
+        "documents": sorted(record.documents, key=lambda document: (document.uploaded_at, document.id)),
+        "mutations": mutations,
+    }
+
+@router.get("/{record_id}/boundary")
+def read_land_record_boundary(
+    record_id: str,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get a land record's boundary as a GeoJSON polygon feature"""
+    record = db.query(LandRecord.owner_id, LandRecord.survey_number, LandRecord.boundary).filter(
+        LandRecord.id == record_id
+    ).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Land record not found")
     
-    # Save the file with a unique name
-    file_uuid = str(uuid.uuid4())
-    filename_parts = os.path.splitext(file.filename)
-    secure_filename = f"{file_uuid}{filename_parts[1]}"
-    file_path = record_dir / secure_filename
+    if record.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this record")
     
-    with open(file_path, "wb") as buffer:
-        contents = await file.read()
-        buffer.write(contents)
+    if record.boundary is None:
+        raise HTTPException(status_code=404, detail="Land record has no boundary")
     
-    # Calculate file hash for tamper-proof verification
-    file_hash = calculate_file_hash(file_path)
+    ring = boundaries.decode(record.boundary)
+    return {
+        "type": "Feature",
+        "id": record_id,
+        "geometry": {"type": "Polygon", "coordinates": [[list(position) for position in ring + ring[:1]]]},
+        "properties": {"id": record_id, "survey_number": record.survey_number},
+    }
+
+def _store_document(record_id: str, document_type: str, file: UploadFile) -> Document:
+    """Stream an upload into the object store and build its document row"""
+    try:
+        file_hash, file_path, _ = store_stream(file.file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Save document record to database
-    db_document = Document(
+    return Document(
         land_id=record_id,
         document_type=document_type,
         file_path=str(file_path),
         file_name=file.filename,
         file_hash=file_hash
     )
+
+def _ledger_documents(db: Session, documents: List[Document]):
+    """Append newly added documents to their parcel's ledger chain (caller commits)"""
+    # Flush first so ids and upload times are assigned
+    db.flush()
+    heads = {}
+    for document in documents:
+        ledger.append(db, document.land_id, "document", document.id, ledger.document_payload(document), heads)
+    ledger.seal_if_due(db)
+
+@router.post("/{record_id}/documents", response_model=DocumentResponse)
+def upload_document(
+    record_id: str,
+    document_type: str = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Upload a document for a land record"""
+    # Verify land record exists and user owns it
+    record = db.query(LandRecord).filter(LandRecord.id == record_id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Land record not found")
     
+    if record.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to upload to this record")
+    
+    # Store the file, hashing it for tamper-proof verification as it is written
+    db_document = _store_document(record_id, document_type, file)
+    
+    # Save document record and update land record with latest document hash
     db.add(db_document)
+    reports.record_documents_uploaded(db, [document_type], datetime.now(), record.document_hash is None)
+    record.document_hash = db_document.file_hash
+    _ledger_documents(db, [db_document])
     db.commit()
+    verification.invalidate("document", [db_document.file_hash])
+    verification.invalidate("property", [record.survey_number])
     db.refresh(db_document)
     
-    # Update land record with latest document hash
-    record.document_hash = file_hash
+    return db_document
+
+@router.post("/{record_id}/documents/batch", response_model=List[DocumentResponse])
+def upload_documents(
+    record_id: str,
+    document_type: List[str] = Form(...),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Upload several documents for a land record in one request
+
+    Send one ``document_type`` for all files or one per file, in file order.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files can be uploaded at once")
+    if len(document_type) not in (1, len(files)):
+        raise HTTPException(status_code=400, detail="Provide one document type, or one per file")
+    
+    # Verify land record exists and user owns it
+    record = db.query(LandRecord).filter(LandRecord.id == record_id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Land record not found")
+    
+    if record.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to upload to this record")
+    
+    document_types = document_type * len(files) if len(document_type) == 1 else document_type
+    db_documents = [
+        _store_document(record_id, doc_type, file)
+        for doc_type, file in zip(document_types, files)
+    ]
+    
+    db.add_all(db_documents)
+    reports.record_documents_uploaded(db, document_types, datetime.now(), record.document_hash is None)
+    record.document_hash = db_documents[-1].file_hash
+    _ledger_documents(db, db_documents)
     db.commit()
+    verification.invalidate("document", [db_document.file_hash for db_document in db_documents])
+    verification.invalidate("property", [record.survey_number])
+    for db_document in db_documents:
+        db.refresh(db_document)
     
-    return db_document
+    return db_documents
 
 @router.get("/{record_id}/documents", response_model=List[DocumentResponse])
-async def get_documents(
+def get_documents(
     record_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, default all"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all documents for a land record"""
+    try:
+        field_names = parse_fields(fields, DocumentResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # Verify land record exists and user can access it
-    record = db.query(LandRecord).filter(LandRecord.id == record_id).first()
-    if not record:
+    owner_id = db.query(LandRecord.owner_id).filter(LandRecord.id == record_id).first()
+    if not owner_id:
         raise HTTPException(status_code=404, detail="Land record not found")
     
-    if record.owner_id != current_user.id and not current_user.is_admin:
+    if owner_id[0] != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to access this record")
     
     # Get all documents for this record
-    documents = db.query(Document).filter(Document.land_id == record_id).all()
-    return documents
\ No newline at end of file
+    documents = db.query(*columns(Document, field_names)).filter(Document.land_id == record_id)
+    return FastJSONResponse(rows_to_dicts(documents, field_names, field_names))
+
+def _stored_document(db: Session, record_id: str, document_id: str, current_user: Principal):
+    """Get a document's stored file details, checking the caller may read its parcel"""
+    row = db.query(Document.file_path, Document.file_name, Document.file_hash, Document.uploaded_at, LandRecord.owner_id) \
+        .join(LandRecord, LandRecord.id == Document.land_id) \
+        .filter(Document.id == document_id, Document.land_id == record_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    if row.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this record")
+    
+    if not row.file_path or not Path(row.file_path).is_file():
+        raise HTTPException(status_code=404, detail="Document file is missing from storage")
+    return row
+
+def _attachment(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+@router.get("/{record_id}/documents/{document_id}/file")
+def download_document(
+    record_id: str,
+    document_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Download a document's file
+
+    Supports Range requests, resumable with If-Range. The ETag is the
+    document's SHA-256, so a cached copy is revalidated without sending it.
+    """
+    document = _stored_document(db, record_id, document_id, current_user)
+    etag = f'"{document.file_hash}"'
+    unchanged = not_modified(request, etag, document.uploaded_at)
+    if unchanged:
+        return unchanged
+    
+    headers = validator_headers(etag, document.uploaded_at)
+    filename = document.file_name or document.file_hash
+    media_type = mimetypes.guess_type(document.file_name or "")[0] or "application/octet-stream"
+    redirect = accel_redirect(document.file_path)
+    if redirect:
+        # nginx sends the file, so it never passes through a worker
+        return Response(media_type=media_type, headers={
+            **headers, "X-Accel-Redirect": redirect, "Content-Disposition": _attachment(filename),
+        })
+    # The server sends the file with http.response.pathsend where it supports it
+    return FileResponse(document.file_path, media_type=media_type, filename=filename, headers=headers)
+
+@router.get("/{record_id}/documents/{document_id}/preview")
+def preview_document(
+    record_id: str,
+    document_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get a small JPEG of a document's first page, for PDFs and images"""
+    document = _stored_document(db, record_id, document_id, current_user)
+    etag = f'"{document.file_hash}-preview-{previews.PREVIEW_SIZE}"'
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    path = previews.get_preview(document.file_hash, Path(document.file_path))
+    if path is None:
+        raise HTTPException(status_code=404, detail="No preview is available for this document")
+    return FileResponse(path, media_type="image/jpeg", headers=validator_headers(etag))
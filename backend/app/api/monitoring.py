@@ -0,0 +1,20 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from ..core.config import settings
+from ..core.metrics import InstrumentedRoute, render_metrics
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = settings.metrics_token
+
+router = APIRouter(tags=["Monitoring"], route_class=InstrumentedRoute)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(request: Request):
+    """Expose request and SQL metrics in the Prometheus text format"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,21 +1,32 @@
-import hashlib
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Literal, Optional
+from datetime import datetime
 import uuid
 from ..db.database import get_db
 from ..models.models import MutationRecord, LandRecord
-from ..schemas.schemas import MutationCreate, MutationResponse
+from ..schemas.schemas import MutationBatchDecision, MutationBatchResult, MutationCreate, MutationResponse
 from ..core.security import calculate_file_hash
-from .auth import get_current_user
+from ..core import events, ledger, reports, verification
+from ..core.pagination import decode_cursor, keyset_page, merge_pages, split_page
+from ..core.projection import FastJSONResponse, columns, parse_fields, rows_to_dicts, select_names
+from ..core.metrics import InstrumentedRoute
+from .auth import Principal, get_current_user
 from ..models.models import User
 
-router = APIRouter(prefix="/mutations", tags=["Mutations"])
+router = APIRouter(prefix="/mutations", tags=["Mutations"], route_class=InstrumentedRoute)
+
+def _mutation_state(mutation: MutationRecord, **changes) -> dict:
+    """A mutation as returned by the API, for its change event"""
+    return {**{name: getattr(mutation, name) for name in MutationResponse.model_fields}, **changes}
 
 @router.post("/", response_model=MutationResponse)
-async def create_mutation(
+def create_mutation(
     mutation: MutationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new mutation record (ownership transfer request)"""
@@ -46,86 +57,276 @@ async def create_mutation(
     )
     
     db.add(db_mutation)
+    reports.record_mutation_requested(db, datetime.now())
+    db.flush()
+    events.record(db, "created", [_mutation_state(db_mutation)])
     db.commit()
+    events.hub.notify()
+    verification.invalidate("property", [land_record.survey_number])
     db.refresh(db_mutation)
     return db_mutation
 
 @router.get("/", response_model=List[MutationResponse])
-async def read_mutations(
-    skip: int = 0, 
-    limit: int = 100, 
+def read_mutations(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    order: Literal["asc", "desc"] = "desc",
+    status: Optional[Literal["pending", "approved", "rejected"]] = None,
+    owner_id: Optional[str] = None,
+    land_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, default all"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all mutation records related to the current user"""
-    if current_user.is_admin:
-        # Admins can see all mutations
-        mutations = db.query(MutationRecord).offset(skip).limit(limit).all()
+    """Get a page of mutation records related to the current user
+
+    Pages are ordered by mutation date and continue from the opaque cursor
+    returned in the ``X-Next-Cursor`` header of the previous page.
+    """
+    try:
+        after = decode_cursor(cursor, "mutation_date") if cursor else None
+        field_names = parse_fields(fields, MutationResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    names = select_names(field_names, "id", "mutation_date")
+    query = db.query(*columns(MutationRecord, names))
+    if status:
+        query = query.filter(MutationRecord.status == status)
+    if land_id:
+        query = query.filter(MutationRecord.land_id == land_id)
+    if date_from:
+        query = query.filter(MutationRecord.mutation_date >= date_from)
+    if date_to:
+        query = query.filter(MutationRecord.mutation_date < date_to)
+    
+    # Admins can see all mutations; regular users see mutations where they are previous or new owner
+    party_id = owner_id if current_user.is_admin else current_user.id
+    descending = order == "desc"
+    if party_id:
+        # Each side of the OR is paged through its own owner index and the pages merged
+        pages = [
+            keyset_page(query.filter(column == party_id), MutationRecord.mutation_date,
+                        MutationRecord.id, after, limit, descending)
+            for column in (MutationRecord.previous_owner_id, MutationRecord.new_owner_id)
+        ]
+        rows = merge_pages(pages, "mutation_date", limit, descending)
     else:
-        # Regular users see mutations where they are previous or new owner
-        mutations = db.query(MutationRecord).filter(
-            (MutationRecord.previous_owner_id == current_user.id) | 
-            (MutationRecord.new_owner_id == current_user.id)
-        ).offset(skip).limit(limit).all()
-    return mutations
+        rows = keyset_page(query, MutationRecord.mutation_date, MutationRecord.id, after, limit, descending)
+    
+    mutations, next_cursor = split_page(rows, "mutation_date", limit)
+    return FastJSONResponse(
+        rows_to_dicts(mutations, names, field_names),
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+    )
+
+@router.get("/events")
+async def stream_mutation_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream changes to the current user's mutations as server-sent events
+
+    Each ``mutation`` event carries a mutation's type of change (created,
+    approved, rejected) and its full new state, so clients can update their
+    list in place. Reconnect with ``Last-Event-ID`` to resume; a ``reset``
+    event means changes were missed and the list should be fetched again.
+    Admins receive every mutation's events.
+    """
+    try:
+        after = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event id")
+    
+    await events.hub.start()
+    return StreamingResponse(
+        events.stream(current_user.id, current_user.is_admin, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _decide_mutations(db: Session, mutation_ids: List[str], action: str) -> List[dict]:
+    """Approve or reject pending mutations in one transaction
+
+    The batch is applied set-based: one UPDATE ... RETURNING claims the
+    statuses, one executemany UPDATE each applies the ownership transfers and
+    the verification hashes, and one INSERT adds the ledger entries. Claiming
+    the statuses is the first write, so the parcels are read afterwards under
+    the write lock; a transfer whose parcel is no longer owned by the
+    transferring owner is reported as a conflict and its mutation returned to
+    pending. Each decision is appended to the parcel's ledger chain and its
+    entry hash becomes the mutation's verification hash. Returns one result
+    per distinct mutation id, in request order.
+    """
+    status = "approved" if action == "approve" else "rejected"
+    mutation_ids = list(dict.fromkeys(mutation_ids))
+    # Plain rows rather than ORM objects, so nothing is reloaded after commit
+    mutations = {
+        mutation.id: mutation
+        for mutation in db.query(*columns(MutationRecord, MutationResponse.model_fields))
+        .filter(MutationRecord.id.in_(mutation_ids))
+    }
+    outcomes = {}
+    for mutation_id in mutation_ids:
+        mutation = mutations.get(mutation_id)
+        if mutation is None:
+            outcomes[mutation_id] = ("not_found", "Mutation record not found")
+        elif mutation.status != "pending":
+            outcomes[mutation_id] = ("invalid", f"Mutation is already {mutation.status}")
+    pending = [mutation_id for mutation_id in mutation_ids if mutation_id not in outcomes]
+    
+    land_records = LandRecord.__table__
+    mutation_records = MutationRecord.__table__
+    now = datetime.now()
+    transfers = []
+    decided = []
+    decided_states = []
+    survey_numbers = {}
+    if pending:
+        # Claim the statuses unless another request decided them meanwhile
+        # (UPDATE ... RETURNING needs SQLite 3.35)
+        ours = set(db.execute(
+            update(mutation_records)
+            .where(mutation_records.c.id.in_(pending), mutation_records.c.status == "pending")
+            .values(status=status, decided_at=now)
+            .returning(mutation_records.c.id)
+        ).scalars())
+        for mutation_id in pending:
+            if mutation_id not in ours:
+                outcomes[mutation_id] = ("invalid", "Mutation was decided by another request")
+        pending = [mutation_id for mutation_id in pending if mutation_id in ours]
+        
+        # Current owner, version and area of every parcel touched by the batch
+        parcels = {}
+        for land_id, owner_id, version, area, survey_number in db.query(
+            LandRecord.id, LandRecord.owner_id, LandRecord.version, LandRecord.area_sqft, LandRecord.survey_number
+        ).filter(LandRecord.id.in_({mutations[mutation_id].land_id for mutation_id in pending})):
+            parcels[land_id] = (owner_id, version, area)
+            survey_numbers[land_id] = survey_number
+        
+        moves = []
+        released = []
+        for mutation_id in pending:
+            mutation = mutations[mutation_id]
+            if action == "approve":
+                owner_id, version, area = parcels.get(mutation.land_id, (None, None, None))
+                if owner_id != mutation.previous_owner_id:
+                    outcomes[mutation_id] = ("conflict", "Land record is no longer owned by the transferring owner")
+                    released.append({"mutation_id": mutation_id})
+                    continue
+                # Later transfers of the same parcel in this batch chain on this one
+                parcels[mutation.land_id] = (mutation.new_owner_id, version + 1, area)
+                moves.append({"land_id": mutation.land_id, "read_version": version, "new_owner_id": mutation.new_owner_id})
+                transfers.append((mutation.previous_owner_id, mutation.new_owner_id, area))
+            decided.append(mutation)
+        
+        if released:
+            db.execute(
+                update(mutation_records)
+                .where(mutation_records.c.id == bindparam("mutation_id"))
+                .values(status="pending", decided_at=None),
+                released,
+            )
+        if moves:
+            # Version-guarded; the write lock makes a miss here a bug, not a race
+            moved = db.execute(
+                update(land_records)
+                .where(land_records.c.id == bindparam("land_id"), land_records.c.version == bindparam("read_version"))
+                .values(owner_id=bindparam("new_owner_id"), version=bindparam("read_version") + 1, updated_at=now),
+                moves,
+            ).rowcount
+            if moved != len(moves):
+                raise StaleDataError("Land record was modified by another request")
+        
+        entry_hashes = ledger.append_many(db, [
+            (mutation.land_id, "mutation", mutation.id, ledger.mutation_payload(mutation, status, now))
+            for mutation in decided
+        ])
+        if decided:
+            db.execute(
+                update(mutation_records)
+                .where(mutation_records.c.id == bindparam("mutation_id"))
+                .values(verification_hash=bindparam("entry_hash")),
+                [
+                    {"mutation_id": mutation.id, "entry_hash": entry_hash}
+                    for mutation, entry_hash in zip(decided, entry_hashes)
+                ],
+            )
+        decided_states = [
+            _mutation_state(mutation, status=status, decided_at=now, verification_hash=entry_hash)
+            for mutation, entry_hash in zip(decided, entry_hashes)
+        ]
+        for mutation in decided:
+            outcomes[mutation.id] = (status, None)
+    
+    reports.record_mutations_decided(db, status, len(decided_states), now, transfers)
+    events.record(db, status, decided_states)
+    ledger.seal_if_due(db)
+    db.commit()
+    events.hub.notify()
+    
+    verification.invalidate("transaction", [mutation.transaction_id for mutation in decided])
+    verification.invalidate("property", [survey_numbers.get(mutation.land_id) for mutation in decided])
+    return [
+        {"mutation_id": mutation_id, "outcome": outcomes[mutation_id][0], "detail": outcomes[mutation_id][1]}
+        for mutation_id in mutation_ids
+    ]
+
+def _decide_mutation(db: Session, mutation_id: str, action: str) -> MutationRecord:
+    """Approve or reject a single mutation, mapping failures to HTTP errors"""
+    result = _decide_mutations(db, [mutation_id], action)[0]
+    if result["outcome"] == "not_found":
+        raise HTTPException(status_code=404, detail=result["detail"])
+    if result["outcome"] == "invalid":
+        raise HTTPException(status_code=400, detail=result["detail"])
+    if result["outcome"] == "conflict":
+        raise HTTPException(status_code=409, detail=result["detail"])
+    
+    db.expire_all()
+    return db.query(MutationRecord).filter(MutationRecord.id == mutation_id).first()
+
+@router.post("/batch", response_model=MutationBatchResult)
+def decide_mutations(
+    batch: MutationBatchDecision,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Approve or reject many mutations in one transaction (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail=f"Only administrators can {batch.action} mutations")
+    
+    results = _decide_mutations(db, batch.mutation_ids, batch.action)
+    outcomes = [result["outcome"] for result in results]
+    return {
+        "results": results,
+        "approved": outcomes.count("approved"),
+        "rejected": outcomes.count("rejected"),
+        "conflicts": outcomes.count("conflict"),
+        "failed": outcomes.count("not_found") + outcomes.count("invalid"),
+    }
 
 @router.put("/{mutation_id}/approve", response_model=MutationResponse)
-async def approve_mutation(
+def approve_mutation(
     mutation_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Approve a mutation (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only administrators can approve mutations")
     
-    mutation = db.query(MutationRecord).filter(MutationRecord.id == mutation_id).first()
-    if not mutation:
-        raise HTTPException(status_code=404, detail="Mutation record not found")
-    
-    if mutation.status != "pending":
-        raise HTTPException(status_code=400, detail=f"Mutation is already {mutation.status}")
-    
-    # Update mutation status
-    mutation.status = "approved"
-    
-    # Transfer ownership of the land record
-    land_record = db.query(LandRecord).filter(LandRecord.id == mutation.land_id).first()
-    if land_record:
-        land_record.owner_id = mutation.new_owner_id
-    
-    # Generate verification hash
-    verification_data = f"{mutation.id}-{mutation.land_id}-{mutation.previous_owner_id}-{mutation.new_owner_id}-approved"
-    mutation.verification_hash = hashlib.sha256(verification_data.encode()).hexdigest()
-    
-    db.commit()
-    db.refresh(mutation)
-    return mutation
+    return _decide_mutation(db, mutation_id, "approve")
 
 @router.put("/{mutation_id}/reject", response_model=MutationResponse)
-async def reject_mutation(
+def reject_mutation(
     mutation_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Reject a mutation (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only administrators can reject mutations")
     
-    mutation = db.query(MutationRecord).filter(MutationRecord.id == mutation_id).first()
-    if not mutation:
-        raise HTTPException(status_code=404, detail="Mutation record not found")
-    
-    if mutation.status != "pending":
-        raise HTTPException(status_code=400, detail=f"Mutation is already {mutation.status}")
-    
-    # Update mutation status
-    mutation.status = "rejected"
-    
-    # Generate verification hash
-    verification_data = f"{mutation.id}-{mutation.land_id}-{mutation.previous_owner_id}-{mutation.new_owner_id}-rejected"
-    mutation.verification_hash = hashlib.sha256(verification_data.encode()).hexdigest()
-    
-    db.commit()
-    db.refresh(mutation)
-    return mutation
\ No newline at end of file
+    return _decide_mutation(db, mutation_id, "reject")
\ No newline at end of file
@@ -0,0 +1,171 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, aliased
+from typing import Literal, Optional
+from datetime import datetime
+from ..db.database import get_db
+from ..models.models import LandRecord, MutationRecord, User
+from ..core.reports import month_bucket, read_bucket, read_metric
+from ..core.metrics import InstrumentedRoute
+from .auth import Principal, get_current_user
+
+router = APIRouter(prefix="/reports", tags=["Reports"], route_class=InstrumentedRoute)
+
+# Report listings show the most recent rows; totals come from report_aggregates
+REPORT_ROW_LIMIT = 100
+TREND_MONTHS = 12
+
+def _require_admin(current_user: Principal):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only administrators can view registry reports")
+
+def _monthly(metric: dict, months: int = TREND_MONTHS) -> dict:
+    """Get the last few month buckets of a metric as chart labels and counts"""
+    labels = sorted(metric)[-months:]
+    return {"labels": labels, "data": [metric[label][0] for label in labels]}
+
+@router.get("/properties")
+def property_report(
+    limit: int = Query(REPORT_ROW_LIMIT, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get the latest registered properties with registry totals"""
+    query = db.query(LandRecord, User.full_name).join(User, User.id == LandRecord.owner_id)
+    if current_user.is_admin:
+        total_properties, total_area = read_bucket(db, "parcels", "all")
+        total_owners = read_bucket(db, "owners", "all")[0]
+    else:
+        # Regular users get a report of their own holdings
+        query = query.filter(LandRecord.owner_id == current_user.id)
+        total_properties, total_area = read_bucket(db, "parcels.owner", current_user.id)
+        total_owners = 1 if total_properties else 0
+
+    rows = query.order_by(LandRecord.created_at.desc(), LandRecord.id.desc()).limit(limit)
+    return {
+        "properties": [
+            {
+                "id": record.id,
+                "survey_number": record.survey_number,
+                "property_address": record.property_address,
+                "property_area": record.area_sqft,
+                "property_area_unit": "sq ft",
+                "owner_id": record.owner_id,
+                "owner_name": owner_name,
+                "registration_date": record.created_at,
+                "status": "active" if record.is_active else "inactive",
+            }
+            for record, owner_name in rows
+        ],
+        "totalProperties": total_properties,
+        "totalArea": total_area,
+        "totalOwners": total_owners,
+    }
+
+@router.get("/transactions")
+def transaction_report(
+    status: Optional[Literal["pending", "approved", "rejected"]] = None,
+    limit: int = Query(REPORT_ROW_LIMIT, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get the latest ownership transfers with status totals (admin only)"""
+    _require_admin(current_user)
+
+    previous_owner = aliased(User)
+    new_owner = aliased(User)
+    query = db.query(MutationRecord, LandRecord.property_address, previous_owner.full_name, new_owner.full_name) \
+        .outerjoin(LandRecord, LandRecord.id == MutationRecord.land_id) \
+        .outerjoin(previous_owner, previous_owner.id == MutationRecord.previous_owner_id) \
+        .outerjoin(new_owner, new_owner.id == MutationRecord.new_owner_id)
+    if status:
+        query = query.filter(MutationRecord.status == status)
+    rows = query.order_by(MutationRecord.mutation_date.desc(), MutationRecord.id.desc()).limit(limit).all()
+
+    statuses = read_metric(db, "mutations.status")
+    return {
+        "transactions": [
+            {
+                "transaction_id": mutation.transaction_id,
+                "property_id": mutation.land_id,
+                "property_address": address,
+                "transaction_type": mutation.mutation_reason,
+                "previous_owner_id": mutation.previous_owner_id,
+                "from_owner": from_owner,
+                "new_owner_id": mutation.new_owner_id,
+                "to_owner": to_owner,
+                "transaction_date": mutation.mutation_date,
+                "status": mutation.status,
+            }
+            for mutation, address, from_owner, to_owner in rows
+        ],
+        "completedTransactions": statuses.get("approved", (0, 0.0))[0],
+        "pendingTransactions": statuses.get("pending", (0, 0.0))[0],
+        "rejectedTransactions": statuses.get("rejected", (0, 0.0))[0],
+        "lastTransactionDate": db.query(MutationRecord.mutation_date)
+            .order_by(MutationRecord.mutation_date.desc()).limit(1).scalar(),
+    }
+
+@router.get("/verifications")
+def verification_report(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get monthly counts of hash-verifiable documents and decided transfers (admin only)"""
+    _require_admin(current_user)
+
+    documents = read_metric(db, "documents.month")
+    approved = read_metric(db, "mutations.approved")
+    rejected = read_metric(db, "mutations.rejected")
+    verifications = [
+        {"verification_type": "Document", "month": month, "result": "success", "count": count}
+        for month, (count, _) in sorted(documents.items())
+    ] + [
+        {"verification_type": "Transaction", "month": month, "result": "success", "count": count}
+        for month, (count, _) in sorted(approved.items())
+    ] + [
+        {"verification_type": "Transaction", "month": month, "result": "failed", "count": count}
+        for month, (count, _) in sorted(rejected.items())
+    ]
+    return {
+        "verifications": verifications,
+        "successfulVerifications": sum(count for count, _ in documents.values()) + sum(count for count, _ in approved.values()),
+        "failedVerifications": sum(count for count, _ in rejected.values()),
+    }
+
+@router.get("/analytics")
+def analytics_report(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get registry-wide dashboard figures from the precomputed aggregates (admin only)"""
+    _require_admin(current_user)
+
+    total_properties, total_area = read_bucket(db, "parcels", "all")
+    statuses = read_metric(db, "mutations.status")
+    requested = read_metric(db, "mutations.requested")
+    document_types = read_metric(db, "documents.type")
+    total_documents = read_bucket(db, "documents", "all")[0]
+    trend = _monthly(requested)
+    return {
+        "totalProperties": total_properties,
+        "totalArea": total_area,
+        "totalOwners": read_bucket(db, "owners", "all")[0],
+        "propertiesVerified": read_bucket(db, "parcels.documented", "all")[0],
+        "totalTransactions": sum(count for count, _ in statuses.values()),
+        "pendingTransactions": statuses.get("pending", (0, 0.0))[0],
+        "approvedTransactions": statuses.get("approved", (0, 0.0))[0],
+        "rejectedTransactions": statuses.get("rejected", (0, 0.0))[0],
+        "transactionsThisMonth": requested.get(month_bucket(datetime.now()), (0, 0.0))[0],
+        "totalDocuments": total_documents,
+        "documentsVerified": total_documents,
+        "documentTypeDistribution": {
+            "labels": list(document_types),
+            "data": [count for count, _ in document_types.values()],
+        },
+        "registrationTrend": _monthly(read_metric(db, "parcels.month")),
+        "transferThroughput": _monthly(read_metric(db, "mutations.approved")),
+        "transactionTrend": {
+            "labels": trend["labels"],
+            "datasets": [{"label": "Transactions", "data": trend["data"]}],
+        },
+    }
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..db.database import get_db
+from ..models.models import Document, LedgerEntry, MutationRecord
+from ..schemas.schemas import VerificationBatchRequest
+from ..core import ledger
+from ..core.verification import lookup, lookup_one
+from ..core.metrics import InstrumentedRoute
+from .auth import get_token_payload
+
+# Read-only lookups for banks and other institutions. Callers need a valid
+# token, but the token's user is not loaded, keeping each lookup to the
+# cache or a single indexed query.
+router = APIRouter(
+    prefix="/verification",
+    tags=["Verification"],
+    dependencies=[Depends(get_token_payload)],
+    route_class=InstrumentedRoute,
+)
+
+@router.get("/property")
+def verify_property(survey_number: str, db: Session = Depends(get_db)):
+    """Verify a land record by survey number"""
+    answer = lookup_one(db, "property", survey_number)
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return answer
+
+@router.get("/document")
+def verify_document(hash: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+    """Verify a document by its SHA-256 hash"""
+    answer = lookup_one(db, "document", hash.lower())
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return answer
+
+@router.get("/transaction")
+def verify_transaction(id: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+    """Verify an ownership transfer by its transaction ID"""
+    answer = lookup_one(db, "transaction", id)
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return answer
+
+@router.post("/batch")
+def verify_batch(request: VerificationBatchRequest, db: Session = Depends(get_db)):
+    """Verify many survey numbers, document hashes and transaction IDs at once
+
+    Each answer is null when the key is unknown.
+    """
+    return {
+        "properties": lookup(db, "property", request.survey_numbers) if request.survey_numbers else {},
+        "documents": lookup(db, "document", [h.lower() for h in request.document_hashes]) if request.document_hashes else {},
+        "transactions": lookup(db, "transaction", request.transaction_ids) if request.transaction_ids else {},
+    }
+
+@router.get("/ledger/proof")
+def ledger_proof(
+    transaction_id: Optional[str] = None,
+    document_hash: Optional[str] = None,
+    entry_hash: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get a ledger entry with its Merkle inclusion proof
+
+    Identify the entry by exactly one of transaction ID, document hash (the
+    first upload of that content) or entry hash. ``payload`` is the canonical
+    payload whose SHA-256 is the entry's payload_hash. ``proof`` is null
+    until the entry's batch is sealed, at most LEDGER_SEAL_MAX_AGE after it
+    was appended.
+    """
+    if sum(key is not None for key in (transaction_id, document_hash, entry_hash)) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of transaction_id, document_hash or entry_hash")
+    
+    query = db.query(LedgerEntry)
+    if transaction_id is not None:
+        mutation_ids = db.query(MutationRecord.id).filter(MutationRecord.transaction_id == transaction_id)
+        query = query.filter(LedgerEntry.entry_type == "mutation", LedgerEntry.ref_id.in_(mutation_ids))
+    elif document_hash is not None:
+        document_ids = db.query(Document.id).filter(Document.file_hash == document_hash.lower())
+        query = query.filter(LedgerEntry.entry_type == "document", LedgerEntry.ref_id.in_(document_ids))
+    else:
+        query = query.filter(LedgerEntry.entry_hash == entry_hash.lower())
+    entry = query.order_by(LedgerEntry.seq).first()
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Ledger entry not found")
+    
+    if entry.seal_id is None and ledger.seal_due(db):
+        # No write has sealed the waiting entries since they came due
+        try:
+            ledger.seal(db)
+            db.commit()
+        except IntegrityError:
+            # Another request sealed them first
+            db.rollback()
+        db.refresh(entry)
+    
+    return {
+        "entry": ledger.entry_view(entry),
+        "payload": ledger.entry_payload(db, entry),
+        "sealed": entry.seal_id is not None,
+        "proof": ledger.inclusion_proof(db, entry),
+    }
+
+@router.get("/ledger/parcels/{land_id}")
+def ledger_chain(land_id: str, limit: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_db)):
+    """Get a parcel's hash chain, oldest entry first"""
+    return [ledger.entry_view(entry) for entry in ledger.parcel_chain(db, land_id, limit)]
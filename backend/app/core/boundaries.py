@@ -0,0 +1,208 @@
+import math
+import struct
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ..models.models import LandRecord
+
+# Parcel boundaries are simple polygons stored in land_records.boundary as
+# little-endian WKB (the binary form PostGIS and SpatiaLite read), 16 bytes a
+# vertex. Their bounding boxes are indexed in parcel_boundaries, an SQLite
+# R-tree sharing land_records' rowid (migration 9), so point and overlap
+# lookups only load the few boundaries whose boxes intersect and test those
+# exactly, however large the registry grows.
+
+Position = Tuple[float, float]  # lon, lat, in GeoJSON order
+MAX_VERTICES = 500
+# Points this close (in degrees, about a centimetre) count as touching, so
+# parcels digitised along a shared edge do not overlap each other
+EPSILON = 1e-7
+
+_WKB_HEADER = struct.Struct("<BIII")  # byte order, geometry type, ring count, vertex count
+_WKB_POLYGON = 3
+
+CANDIDATES_SQL = """
+    SELECT land_records.id, land_records.survey_number, land_records.boundary
+    FROM parcel_boundaries JOIN land_records ON land_records.rowid = parcel_boundaries.id
+    WHERE parcel_boundaries.min_lon <= :max_lon AND parcel_boundaries.max_lon >= :min_lon
+      AND parcel_boundaries.min_lat <= :max_lat AND parcel_boundaries.max_lat >= :min_lat
+      {owner_filter}
+"""
+INDEX_SQL = """
+    INSERT OR REPLACE INTO parcel_boundaries (id, min_lon, max_lon, min_lat, max_lat)
+    SELECT rowid, :min_lon, :max_lon, :min_lat, :max_lat FROM land_records WHERE id = :land_id
+"""
+
+
+def normalize(positions: Sequence[Sequence[float]]) -> List[Position]:
+    """Validate a boundary ring of [lon, lat] positions and return it without the closing position"""
+    ring = [(float(lon), float(lat)) for lon, lat in positions]
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+    if not 3 <= len(ring) <= MAX_VERTICES:
+        raise ValueError(f"A boundary needs between 3 and {MAX_VERTICES} distinct positions")
+    for lon, lat in ring:
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise ValueError(f"Boundary position [{lon}, {lat}] is not a valid [longitude, latitude]")
+    if abs(_area(ring)) < EPSILON ** 2:
+        raise ValueError("Boundary does not enclose an area")
+    return ring
+
+
+def encode(ring: List[Position]) -> bytes:
+    """Encode a ring as a WKB polygon, closing it"""
+    closed = ring + ring[:1]
+    return _WKB_HEADER.pack(1, _WKB_POLYGON, 1, len(closed)) + struct.pack(f"<{2 * len(closed)}d", *(
+        value for position in closed for value in position
+    ))
+
+
+def decode(blob: bytes) -> List[Position]:
+    """Decode a WKB polygon written by encode() into its ring, without the closing position"""
+    order, geometry_type, rings, count = _WKB_HEADER.unpack_from(blob)
+    if order != 1 or geometry_type != _WKB_POLYGON or rings != 1:
+        raise ValueError("Unsupported boundary encoding")
+    values = struct.unpack_from(f"<{2 * count}d", blob, _WKB_HEADER.size)
+    return list(zip(values[0::2], values[1::2]))[:-1]
+
+
+def bounding_box(ring: List[Position]) -> Tuple[float, float, float, float]:
+    """Get min_lon, max_lon, min_lat, max_lat"""
+    lons = [lon for lon, _ in ring]
+    lats = [lat for _, lat in ring]
+    return min(lons), max(lons), min(lats), max(lats)
+
+
+def _area(ring: List[Position]) -> float:
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in _edges(ring)) / 2
+
+
+def _edges(ring: List[Position]):
+    return zip(ring, ring[1:] + ring[:1])
+
+
+def _side(a: Position, b: Position, p: Position) -> int:
+    """Which side of the line a-b p lies on: 1 left, -1 right, 0 within EPSILON of it"""
+    cross = (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])
+    if abs(cross) <= EPSILON * math.hypot(b[0] - a[0], b[1] - a[1]):
+        return 0
+    return 1 if cross > 0 else -1
+
+
+def _distance_to_edge(a: Position, b: Position, p: Position) -> float:
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def _on_boundary(ring: List[Position], point: Position) -> bool:
+    return any(_distance_to_edge(a, b, point) <= EPSILON for a, b in _edges(ring))
+
+
+def _crosses(ring: List[Position], point: Position) -> bool:
+    # Even-odd rule: count edges crossed by a ray running east from the point
+    inside = False
+    x, y = point
+    for (x1, y1), (x2, y2) in _edges(ring):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def contains(ring: List[Position], point: Position) -> bool:
+    """Whether a point lies inside a ring or on its edge"""
+    return _on_boundary(ring, point) or _crosses(ring, point)
+
+
+def _strictly_inside(ring: List[Position], point: Position) -> bool:
+    return _crosses(ring, point) and not _on_boundary(ring, point)
+
+
+def interior_point(ring: List[Position]) -> Position:
+    """Get a point inside a ring (its centroid may not be, for a concave one)"""
+    # Scan across the middle between two vertex latitudes so no vertex lies on the line
+    lats = sorted({lat for _, lat in ring})
+    middle = len(lats) // 2
+    y = (lats[middle - 1] + lats[middle]) / 2
+    xs = sorted(
+        x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        for (x1, y1), (x2, y2) in _edges(ring) if (y1 > y) != (y2 > y)
+    )
+    left, right = max(zip(xs[0::2], xs[1::2]), key=lambda span: span[1] - span[0])
+    return (left + right) / 2, y
+
+
+def overlaps(a: List[Position], b: List[Position]) -> bool:
+    """Whether two rings share any area; parcels that only touch do not overlap"""
+    # Edges crossing each other
+    for a1, a2 in _edges(a):
+        for b1, b2 in _edges(b):
+            if (_side(a1, a2, b1) * _side(a1, a2, b2) < 0
+                    and _side(b1, b2, a1) * _side(b1, b2, a2) < 0):
+                return True
+    # Otherwise one lies inside the other, or they coincide: some vertex, edge
+    # midpoint or interior point of one is then strictly inside the other
+    for ring, other in ((a, b), (b, a)):
+        probes = ring + [((x1 + x2) / 2, (y1 + y2) / 2) for (x1, y1), (x2, y2) in _edges(ring)]
+        probes.append(interior_point(ring))
+        if any(_strictly_inside(other, point) for point in probes):
+            return True
+    return False
+
+
+def _candidates(db: Session, box: Tuple[float, float, float, float], owner_id: Optional[str] = None):
+    min_lon, max_lon, min_lat, max_lat = box
+    params = {"min_lon": min_lon, "max_lon": max_lon, "min_lat": min_lat, "max_lat": max_lat}
+    owner_filter = ""
+    if owner_id is not None:
+        owner_filter = "AND land_records.owner_id = :owner_id"
+        params["owner_id"] = owner_id
+    return db.execute(text(CANDIDATES_SQL.format(owner_filter=owner_filter)), params)
+
+
+def find_overlaps(db: Session, ring: List[Position]) -> List[str]:
+    """Get the survey numbers of registered parcels whose boundaries overlap a ring"""
+    return [
+        row.survey_number for row in _candidates(db, bounding_box(ring))
+        if overlaps(ring, decode(row.boundary))
+    ]
+
+
+def parcels_at(db: Session, lat: float, lon: float, owner_id: Optional[str] = None) -> List[str]:
+    """Get the ids of the parcels whose boundaries contain a point"""
+    return [
+        row.id for row in _candidates(db, (lon, lon, lat, lat), owner_id)
+        if contains(decode(row.boundary), (lon, lat))
+    ]
+
+
+def index_boundary(db: Session, record: LandRecord):
+    """Add a flushed record's boundary to the R-tree (caller commits)"""
+    min_lon, max_lon, min_lat, max_lat = bounding_box(decode(record.boundary))
+    db.execute(text(INDEX_SQL), {
+        "land_id": record.id, "min_lon": min_lon, "max_lon": max_lon, "min_lat": min_lat, "max_lat": max_lat,
+    })
+
+
+def rebuild_boundary_index(conn, batch_size: int = 5000) -> int:
+    """Re-index every boundary, e.g. after a VACUUM has renumbered land_records rowids"""
+    conn.execute(text("DELETE FROM parcel_boundaries"))
+    indexed = 0
+    last_rowid = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT rowid, boundary FROM land_records WHERE boundary IS NOT NULL AND rowid > :last "
+            "ORDER BY rowid LIMIT :limit"
+        ), {"last": last_rowid, "limit": batch_size}).all()
+        if not rows:
+            return indexed
+        conn.execute(text(
+            "INSERT INTO parcel_boundaries (id, min_lon, max_lon, min_lat, max_lat) "
+            "VALUES (:id, :min_lon, :max_lon, :min_lat, :max_lat)"
+        ), [
+            dict(zip(("min_lon", "max_lon", "min_lat", "max_lat"), bounding_box(decode(boundary))), id=rowid)
+            for rowid, boundary in rows
+        ])
+        indexed += len(rows)
+        last_rowid = rows[-1][0]
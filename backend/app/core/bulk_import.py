@@ -0,0 +1,194 @@
+import csv
+import io
+import json
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..models.models import LandRecord, User
+from ..schemas.schemas import LandRecordCreate
+from . import reports, verification
+from .geo import apply_cluster_deltas, cell_key, cluster_deltas
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+# (row number, parsed fields or None, parse error or None)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Guess the import format from a file name"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[ParsedRow]:
+    """Parse a CSV (with header) or NDJSON byte stream one row at a time"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            # Empty CSV cells mean "not provided"
+            yield row_number, {key: value for key, value in row.items() if key and value != ""}, None
+    else:
+        for row_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Expected a JSON object"
+                continue
+            yield row_number, row, None
+
+
+class ImportResult:
+    """Running totals for an import; errors beyond MAX_REPORTED_ERRORS are only counted"""
+
+    def __init__(self, start_row: int = 0):
+        self.imported = 0
+        self.failed = 0
+        self.checkpoint = start_row
+        self.errors = []
+
+    def add_error(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "checkpoint": self.checkpoint,
+            "errors": self.errors,
+        }
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _insert_batch(db: Session, batch: list, default_owner_id: Optional[str], result: ImportResult,
+                  on_error: Optional[Callable[[int, str], None]]):
+    """Validate one batch against the database, insert the valid rows and commit"""
+    def fail(row_number, message):
+        result.add_error(row_number, message)
+        if on_error:
+            on_error(row_number, message)
+
+    # Resolve owners referenced by username or id with one query each
+    usernames = {row["owner_username"] for _, row in batch if row.get("owner_username")}
+    owner_ids = {row["owner_id"] for _, row in batch if row.get("owner_id")}
+    by_username = dict(db.query(User.username, User.id).filter(User.username.in_(usernames))) if usernames else {}
+    known_ids = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(owner_ids))} if owner_ids else set()
+
+    # Survey numbers must be unique across the registry and within the batch
+    survey_numbers = {str(row.get("survey_number")) for _, row in batch if row.get("survey_number") is not None}
+    taken = {number for (number,) in db.query(LandRecord.survey_number).filter(
+        LandRecord.survey_number.in_(survey_numbers)
+    )} if survey_numbers else set()
+
+    values = []
+    for row_number, row in batch:
+        try:
+            land_record = LandRecordCreate(**row)
+        except ValidationError as e:
+            fail(row_number, _validation_message(e))
+            continue
+
+        if row.get("owner_username"):
+            owner_id = by_username.get(row["owner_username"])
+        elif row.get("owner_id"):
+            owner_id = row["owner_id"] if row["owner_id"] in known_ids else None
+        else:
+            owner_id = default_owner_id
+        if owner_id is None:
+            fail(row_number, "Owner not found")
+            continue
+        if land_record.boundary is not None:
+            # Boundaries are checked for overlaps one registration at a time
+            fail(row_number, "Register parcels with a boundary individually")
+            continue
+
+        if land_record.survey_number in taken:
+            fail(row_number, "Survey number already registered")
+            continue
+        taken.add(land_record.survey_number)
+
+        located = land_record.geo_latitude is not None and land_record.geo_longitude is not None
+        values.append({
+            "owner_id": owner_id,
+            "property_address": land_record.property_address,
+            "area_sqft": land_record.area_sqft,
+            "survey_number": land_record.survey_number,
+            "geo_latitude": land_record.geo_latitude,
+            "geo_longitude": land_record.geo_longitude,
+            "geo_cell": cell_key(land_record.geo_latitude, land_record.geo_longitude) if located else None,
+        })
+
+    if values:
+        db.execute(insert(LandRecord), values)
+        apply_cluster_deltas(db, cluster_deltas(
+            (value["geo_latitude"], value["geo_longitude"]) for value in values
+            if value["geo_cell"] is not None
+        ))
+        reports.record_parcels_created(db, (
+            (value["owner_id"], value["area_sqft"], None) for value in values
+        ))
+    db.commit()
+    verification.invalidate("property", [value["survey_number"] for value in values])
+    result.imported += len(values)
+    result.checkpoint = batch[-1][0]
+
+
+def import_land_records(
+    db: Session,
+    rows: Iterator[ParsedRow],
+    default_owner_id: Optional[str] = None,
+    start_row: int = 0,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_error: Optional[Callable[[int, str], None]] = None,
+    on_checkpoint: Optional[Callable[[int], None]] = None,
+) -> ImportResult:
+    """Import parsed rows in committed batches, skipping rows up to start_row
+
+    Rows may name their owner by ``owner_username`` or ``owner_id``; others
+    are assigned to ``default_owner_id``. After each committed batch the
+    checkpoint is the last row number handled, so a failed import can be
+    resumed by passing it back as ``start_row``.
+    """
+    result = ImportResult(start_row)
+    batch = []
+    last_row = start_row
+    for row_number, row, error in rows:
+        if row_number <= start_row:
+            continue
+        last_row = row_number
+        if error:
+            result.add_error(row_number, error)
+            if on_error:
+                on_error(row_number, error)
+            continue
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            _insert_batch(db, batch, default_owner_id, result, on_error)
+            batch = []
+            if on_checkpoint:
+                on_checkpoint(result.checkpoint)
+    if batch:
+        _insert_batch(db, batch, default_owner_id, result, on_error)
+    # Trailing rows that failed to parse are done with too
+    result.checkpoint = last_row
+    if on_checkpoint:
+        on_checkpoint(result.checkpoint)
+    return result
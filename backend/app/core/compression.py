@@ -0,0 +1,163 @@
+import gzip
+from typing import List, Optional
+from .config import settings
+from .http_cache import raw_header
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = settings.compression_min_size
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # Fast enough to compress per response
+
+COMPRESSIBLE_TYPES = (b"application/json", b"application/x-ndjson", b"application/javascript", b"text/")
+# Streams (server-sent events, exports, downloads) are never buffered here
+STREAMING_TYPES = (b"text/event-stream",)
+# Validators the client may send back with a compressed response's ETag
+VALIDATOR_HEADERS = (b"if-none-match", b"if-range")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL)
+
+
+def _strip_encoding_suffixes(validator: bytes) -> bytes:
+    # ETags of compressed bodies carry the encoding; validate against the identity ETag
+    return validator.replace(b'-br"', b'"').replace(b'-gzip"', b'"')
+
+
+def _is_strong(etag: Optional[bytes]) -> bool:
+    return etag is not None and not etag.startswith(b"W/") and etag.endswith(b'"')
+
+
+def _encoded_etag(etag: bytes, encoding: str) -> bytes:
+    # The compressed bytes differ, so a strong ETag names the encoding too
+    return etag[:-1] + f'-{encoding}"'.encode("latin-1")
+
+
+def _with_etag(headers, etag: bytes) -> List[tuple]:
+    return [(key, value) for key, value in headers if key.lower() != b"etag"] + [(b"etag", etag)]
+
+
+def _is_download(status: int, headers) -> bool:
+    """Whether a response is a file download or byte range, whose bytes and ETag must stay as stored"""
+    disposition = raw_header(headers, b"content-disposition") or b""
+    return (
+        status == 206
+        or raw_header(headers, b"content-range") is not None
+        or raw_header(headers, b"accept-ranges") is not None
+        or disposition.lower().startswith(b"attachment")
+    )
+
+
+class CompressionMiddleware:
+    """Compress complete text and JSON responses with brotli or gzip above a size threshold
+
+    Responses sent in several body messages (streams), downloads and byte
+    ranges, and responses that already have a Content-Encoding pass through
+    untouched.
+    A strong ETag gets the encoding appended, as the compressed bytes differ.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept_encoding = raw_header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept_encoding.decode("latin-1")) if accept_encoding else None
+        if_none_match = raw_header(scope["headers"], b"if-none-match") or b""
+        if any(key.lower() in VALIDATOR_HEADERS for key, _ in scope["headers"]):
+            # Rewritten in place so outer middleware keeps seeing the routed scope
+            scope["headers"] = [
+                (key, _strip_encoding_suffixes(value) if key.lower() in VALIDATOR_HEADERS else value)
+                for key, value in scope["headers"]
+            ]
+        if encoding is None or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] == 304:
+                    # Revalidated a compressed copy: answer with the ETag its 200 carried
+                    passthrough = True
+                    etag = raw_header(headers, b"etag")
+                    if _is_strong(etag) and _encoded_etag(etag, encoding) in if_none_match:
+                        headers = _with_etag(headers, _encoded_etag(etag, encoding)) + [(b"vary", b"Accept-Encoding")]
+                        message = {**message, "headers": headers}
+                    return await send(message)
+                content_type = raw_header(headers, b"content-type") or b""
+                if (
+                    not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(STREAMING_TYPES)
+                    or raw_header(headers, b"content-encoding") is not None
+                    or _is_download(message["status"], headers)
+                    or message["status"] < 200 or message["status"] == 204
+                ):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            content = message.get("body", b"")
+            headers: List[tuple] = list(start.get("headers", []))
+            if message.get("more_body", False):
+                # Streamed in several messages; send as is
+                passthrough = True
+                await send(start)
+                return await send(message)
+            if len(content) < self.minimum_size:
+                headers.append((b"vary", b"Accept-Encoding"))
+                await send({**start, "headers": headers})
+                return await send(message)
+
+            compressed = compress(content, encoding)
+            headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+            etag = raw_header(headers, b"etag")
+            if _is_strong(etag):
+                headers = _with_etag(headers, _encoded_etag(etag, encoding))
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application settings; each field is read from the upper-cased environment variable"""
+
+    database_url: str = "sqlite:///./land_registration.db"
+    # Connection pools; request handlers run in a thread pool of the same size
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    # SQLite storage mode and tuning (see db/database.py)
+    db_mode: str = "production"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "FULL"
+    sqlite_cache_mb: int = 64
+    sqlite_mmap_mb: int = 256
+    group_commit_window_ms: float = 2.0
+    group_commit_max: int = 64
+
+    secret_key: Optional[str] = None
+    algorithm: Optional[str] = None
+    access_token_expire_minutes: int = 30
+    embed_principal_claims: bool = True
+    principal_cache_size: int = 10000
+    principal_cache_ttl: int = 60
+
+    upload_dir: str = "uploads"
+    max_upload_bytes: int = 50 * 1024 * 1024
+    # Set to nginx's internal location for the object store to have it send
+    # downloads itself (X-Accel-Redirect), e.g. /protected-objects
+    download_accel_prefix: str = ""
+    preview_size: int = 512
+    preview_cache_mb: int = 256
+    verification_cache_size: int = 100000
+    verification_cache_ttl: int = 300
+    ledger_seal_size: int = 1024
+    ledger_seal_max_age_seconds: int = 300
+    compression_min_size: int = 1024
+    slow_query_ms: float = 200.0
+    metrics_token: str = ""
+    # Mutation event streams (see core.events)
+    event_backlog: int = 1000
+    event_poll_seconds: float = 1.0
+    event_keepalive_seconds: float = 15.0
+
+    # Production server (serve.py)
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = 0  # 0 means one worker per CPU
+    graceful_timeout: int = 30
+    max_requests: int = 0  # recycle workers after this many requests, 0 for never
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Read settings from the environment, after loading .env"""
+        load_dotenv()
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is not None:
+                values[field.name] = _coerce(field.name, raw, field.default)
+        return cls(**values)
+
+
+def _coerce(name: str, raw: str, default):
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    try:
+        if isinstance(default, int):
+            return int(raw)
+        if isinstance(default, float):
+            return float(raw)
+    except ValueError:
+        raise ValueError(f"{name.upper()} must be a number, got {raw!r}")
+    return raw
+
+
+settings = Settings.from_env()
@@ -0,0 +1,234 @@
+import hashlib
+import re
+import struct
+from datetime import datetime
+from functools import lru_cache
+from itertools import combinations, groupby
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..models.models import DuplicateBucket, DuplicateCandidate, LandRecord, User
+
+# Near-duplicate detection for parcels (by address) and users (by name and
+# email). Each entity's text is normalized and split into character
+# trigrams; a MinHash signature of those estimates the Jaccard similarity of
+# two entities, and locality-sensitive hashing cuts the signature into bands
+# so that similar entities very likely share a band bucket while dissimilar
+# ones rarely do. Buckets also include a blocking key, the numbers in a
+# parcel's address or a user's name, since "12 Gandhi Road" and "14 Gandhi
+# Road" are similar text but different parcels. Only entities sharing a
+# bucket are compared, so finding candidates is near-linear instead of
+# pairwise. Pairs whose exact trigram similarity reaches MIN_SIMILARITY are
+# queued in duplicate_candidates for an administrator to confirm or dismiss.
+
+KINDS = ("parcel", "user")
+BANDS = 16
+ROWS_PER_BAND = 4            # pairs are likely candidates above about (1/BANDS) ** (1/ROWS_PER_BAND) = 0.5
+MIN_SIMILARITY = 0.6
+MAX_PAIRWISE_BUCKET = 50     # larger buckets pair each member with the first only
+MAX_CANDIDATES = 200         # per entity checked as it is registered
+
+# 16-bit hash values, 32 from each blake2b digest; a minimum that collides
+# by chance only adds a little to the estimated similarity
+_HASH_SALTS = [f"land-minhash-{i}".encode() for i in range(BANDS * ROWS_PER_BAND // 32)]
+_UNPACK_HASHES = struct.Struct(f"<{32 * len(_HASH_SALTS)}H").unpack
+_BAND_VALUES = struct.Struct(f"<H{ROWS_PER_BAND}H")
+_ABBREVIATIONS = {
+    "rd": "road", "st": "street", "ave": "avenue", "ln": "lane", "nr": "near", "opp": "opposite",
+    "apt": "apartment", "blk": "block", "sec": "sector", "dist": "district", "no": "",
+}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_NUMBER = re.compile(r"\d+")
+
+Features = Tuple[str, Set[str]]  # blocking key, trigram shingles
+
+
+def normalize_address(address: str) -> str:
+    words = _NON_WORD.sub(" ", (address or "").lower()).split()
+    return " ".join(filter(None, (_ABBREVIATIONS.get(word, word) for word in words)))
+
+
+def _shingles(value: str, prefix: str = "") -> Set[str]:
+    padded = f" {value} "
+    return {prefix + padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parcel_features(property_address: str) -> Features:
+    address = normalize_address(property_address)
+    return " ".join(sorted(_NUMBER.findall(address))), _shingles(address)
+
+
+def user_features(full_name: str, email: str) -> Features:
+    name = " ".join(_NON_WORD.sub(" ", (full_name or "").lower()).split())
+    # Dots and +tags do not change where mail goes
+    local = (email or "").lower().split("@")[0].split("+")[0].replace(".", "")
+    return " ".join(_NUMBER.findall(name)), _shingles(name, "n") | _shingles(local, "e")
+
+
+@lru_cache(maxsize=200000)
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    # Most trigrams recur across addresses and names, so this is mostly cached
+    return _UNPACK_HASHES(b"".join(
+        hashlib.blake2b(shingle.encode(), digest_size=64, salt=salt).digest() for salt in _HASH_SALTS
+    ))
+
+
+def signature(shingles: Set[str]) -> List[int]:
+    """MinHash signature: the minimum of each of BANDS * ROWS_PER_BAND independent hashes"""
+    return list(map(min, zip(*map(_shingle_hashes, shingles))))
+
+
+def band_buckets(features: Features) -> List[int]:
+    """Get the LSH bucket of each band, as signed 64-bit integers"""
+    block, shingles = features
+    values = signature(shingles)
+    return [
+        int.from_bytes(hashlib.blake2b(
+            _BAND_VALUES.pack(band, *values[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]) + block.encode(),
+            digest_size=8,
+        ).digest(), "little", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(first: Features, second: Features) -> float:
+    """Jaccard similarity of two entities' shingles, 0 across blocks"""
+    if first[0] != second[0] or not first[1] or not second[1]:
+        return 0.0
+    return len(first[1] & second[1]) / len(first[1] | second[1])
+
+
+def load_features(db: Session, kind: str, entity_ids: Iterable[str]) -> Dict[str, Features]:
+    """Get the features of parcels or users by id"""
+    entity_ids = list(entity_ids)
+    features = {}
+    for start in range(0, len(entity_ids), 500):
+        chunk = entity_ids[start:start + 500]
+        if kind == "parcel":
+            rows = db.query(LandRecord.id, LandRecord.property_address).filter(LandRecord.id.in_(chunk))
+            features.update((record_id, parcel_features(address)) for record_id, address in rows)
+        else:
+            rows = db.query(User.id, User.full_name, User.email).filter(User.id.in_(chunk))
+            features.update((user_id, user_features(name, email)) for user_id, name, email in rows)
+    return features
+
+
+def _bucket_pairs(entity_ids: List[str]) -> Iterable[Tuple[str, str]]:
+    if len(entity_ids) <= MAX_PAIRWISE_BUCKET:
+        return combinations(entity_ids, 2)
+    # A crowded bucket still links every member to the cluster, through its first
+    return ((entity_ids[0], entity_id) for entity_id in entity_ids[1:])
+
+
+def _queue(db: Session, kind: str, pairs: Dict[Tuple[str, str], float]) -> int:
+    """Add new candidate pairs to the review queue, skipping pairs already queued or reviewed"""
+    if not pairs:
+        return 0
+    queued = set(db.query(DuplicateCandidate.first_id, DuplicateCandidate.second_id).filter(
+        DuplicateCandidate.kind == kind,
+        DuplicateCandidate.first_id.in_({first for first, _ in pairs}),
+    ))
+    now = datetime.now()
+    new = [
+        DuplicateCandidate(kind=kind, first_id=first, second_id=second, similarity=round(score, 4), detected_at=now)
+        for (first, second), score in pairs.items() if (first, second) not in queued
+    ]
+    db.add_all(new)
+    return len(new)
+
+
+def _verified_pairs(features: Dict[str, Features], pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+    verified = {}
+    for first, second in pairs:
+        if first in features and second in features:
+            score = similarity(features[first], features[second])
+            if score >= MIN_SIMILARITY:
+                verified[min(first, second), max(first, second)] = score
+    return verified
+
+
+def check_entity(db: Session, kind: str, entity_id: str, features: Features) -> int:
+    """Index a new parcel or user and queue its likely duplicates (caller commits)
+
+    Returns the number of candidates queued.
+    """
+    buckets = band_buckets(features)
+    matches = [
+        other_id for (other_id,) in db.query(DuplicateBucket.entity_id).filter(
+            DuplicateBucket.kind == kind, DuplicateBucket.bucket.in_(buckets)
+        ).distinct().limit(MAX_CANDIDATES)
+        if other_id != entity_id
+    ]
+    db.execute(insert(DuplicateBucket.__table__), [
+        {"kind": kind, "bucket": bucket, "entity_id": entity_id} for bucket in buckets
+    ])
+    if not matches:
+        return 0
+    candidates = load_features(db, kind, matches)
+    candidates[entity_id] = features
+    return _queue(db, kind, _verified_pairs(candidates, ((entity_id, other_id) for other_id in matches)))
+
+
+def _entity_features(db: Session, kind: str, after: str, limit: int) -> List[Tuple[str, Features]]:
+    if kind == "parcel":
+        rows = db.query(LandRecord.id, LandRecord.property_address).filter(LandRecord.id > after) \
+            .order_by(LandRecord.id).limit(limit).all()
+        return [(record_id, parcel_features(address)) for record_id, address in rows]
+    rows = db.query(User.id, User.full_name, User.email).filter(User.id > after).order_by(User.id).limit(limit).all()
+    return [(user_id, user_features(name, email)) for user_id, name, email in rows]
+
+
+class ScanResult:
+    """Totals for a duplicate scan of one kind"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.indexed = 0
+        self.compared = 0
+        self.queued = 0
+
+
+def find_duplicates(db: Session, kind: str, batch_size: int = 5000) -> ScanResult:
+    """Rebuild the LSH buckets of every parcel or user and queue all likely duplicates
+
+    Commits after every batch. Pairs already in the queue, including
+    dismissed ones, are not queued again.
+    """
+    result = ScanResult(kind)
+    db.query(DuplicateBucket).filter(DuplicateBucket.kind == kind).delete(synchronize_session=False)
+    db.commit()
+    last_id = ""
+    while True:
+        entities = _entity_features(db, kind, last_id, batch_size)
+        if not entities:
+            break
+        # Core inserts in index order, which is much faster for millions of rows
+        buckets = sorted(
+            (bucket, entity_id) for entity_id, features in entities for bucket in band_buckets(features)
+        )
+        db.execute(insert(DuplicateBucket.__table__), [
+            {"kind": kind, "bucket": bucket, "entity_id": entity_id} for bucket, entity_id in buckets
+        ])
+        db.commit()
+        result.indexed += len(entities)
+        last_id = entities[-1][0]
+
+    # Walk the buckets in order; only members of shared buckets are compared
+    rows = db.query(DuplicateBucket.bucket, DuplicateBucket.entity_id) \
+        .filter(DuplicateBucket.kind == kind) \
+        .order_by(DuplicateBucket.bucket, DuplicateBucket.entity_id) \
+        .yield_per(batch_size)
+    pairs = set()
+    for _, members in groupby(rows, key=lambda row: row.bucket):
+        entity_ids = [row.entity_id for row in members]
+        if len(entity_ids) > 1:
+            pairs.update(_bucket_pairs(entity_ids))
+    result.compared = len(pairs)
+
+    pairs = sorted(pairs)
+    for start in range(0, len(pairs), batch_size):
+        chunk = pairs[start:start + batch_size]
+        features = load_features(db, kind, {entity_id for pair in chunk for entity_id in pair})
+        result.queued += _queue(db, kind, _verified_pairs(features, chunk))
+        db.commit()
+    return result
@@ -0,0 +1,218 @@
+import asyncio
+import bisect
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+import anyio
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from ..db.database import read_engine
+from ..models.models import MutationEvent
+from .config import settings
+
+# Mutation changes are written to mutation_events in the same transaction as
+# the change, so event ids (the row's seq) follow commit order and mean the
+# same on every worker process. Each process runs one poller that appends new
+# rows to an in-memory backlog and wakes the streams waiting on it: a commit
+# in the same process wakes the poller at once, other processes see the row
+# within EVENT_POLL_SECONDS. An idle stream is a suspended coroutine holding
+# its last event id, with no queue and no database connection. Only the
+# latest EVENT_BACKLOG events are kept; a client resuming from an older id
+# gets a reset event and should fetch its list again.
+
+EVENT_BACKLOG = settings.event_backlog
+EVENT_POLL_SECONDS = settings.event_poll_seconds
+EVENT_KEEPALIVE_SECONDS = settings.event_keepalive_seconds
+RETRY_MS = 3000  # client reconnect delay
+
+log = logging.getLogger("app.events")
+
+
+class Event(NamedTuple):
+    seq: int
+    event_type: str
+    audience: frozenset
+    payload: str
+
+
+class EventsMissed(Exception):
+    """The requested position is no longer (or not yet) in the backlog"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def record(db: Session, event_type: str, mutations: List[dict]):
+    """Record events for mutations' new states in the caller's transaction
+
+    The caller commits, then calls hub.notify().
+    """
+    if not mutations:
+        return
+    now = datetime.now()
+    db.execute(insert(MutationEvent), [
+        {
+            "event_type": event_type,
+            "mutation_id": mutation["id"],
+            "audience": f"{mutation['previous_owner_id']} {mutation['new_owner_id']}",
+            "payload": json.dumps(mutation, default=_encode, separators=(",", ":")),
+            "created_at": now,
+        }
+        for mutation in mutations
+    ])
+    latest = select(func.max(MutationEvent.seq)).scalar_subquery()
+    db.execute(delete(MutationEvent).where(MutationEvent.seq <= latest - EVENT_BACKLOG))
+
+
+def _event(row) -> Event:
+    return Event(row.seq, row.event_type, frozenset(row.audience.split()), row.payload)
+
+
+class EventHub:
+    """Fans recorded events out to the streams open in this process"""
+
+    def __init__(self, backlog: int = EVENT_BACKLOG, poll_seconds: float = EVENT_POLL_SECONDS):
+        self.backlog = backlog
+        self.poll_seconds = poll_seconds
+        self.last_seq = 0
+        self._events: List[Event] = []
+        self._seqs: List[int] = []
+        self._loop = None
+        self._task = None
+        self._ready = None
+        self._wake = None
+        self._changed = None
+
+    def _fetch(self, after: Optional[int]) -> list:
+        columns = (MutationEvent.seq, MutationEvent.event_type, MutationEvent.audience, MutationEvent.payload)
+        with read_engine.connect() as conn:
+            if after is None:
+                # The retained backlog, newest last
+                rows = conn.execute(select(*columns).order_by(MutationEvent.seq.desc()).limit(self.backlog)).all()
+                return rows[::-1]
+            return conn.execute(
+                select(*columns).where(MutationEvent.seq > after).order_by(MutationEvent.seq).limit(self.backlog)
+            ).all()
+
+    def _append(self, rows):
+        self._events.extend(map(_event, rows))
+        self._seqs.extend(row.seq for row in rows)
+        if rows:
+            self.last_seq = rows[-1].seq
+        # Trim in chunks so appends stay cheap
+        if len(self._events) > 2 * self.backlog:
+            del self._events[:-self.backlog]
+            del self._seqs[:-self.backlog]
+
+    async def start(self):
+        """Load the backlog and start polling in the running event loop, once"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return await self._ready.wait()
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._events, self._seqs, self.last_seq = [], [], 0
+        try:
+            self._append(await anyio.to_thread.run_sync(self._fetch, None))
+        except BaseException:
+            self._loop = None
+            raise
+        self._task = loop.create_task(self._poll())
+        self._ready.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._loop = self._task = None
+
+    def notify(self):
+        """Wake the poller after committing events; safe to call from any thread"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    async def _poll(self):
+        while True:
+            self._wake.clear()
+            try:
+                rows = await anyio.to_thread.run_sync(self._fetch, self.last_seq)
+            except Exception:
+                log.exception("Polling mutation events failed")
+                rows = []
+            if rows:
+                self._append(rows)
+                changed, self._changed = self._changed, asyncio.Event()
+                changed.set()
+                if len(rows) == self.backlog:
+                    continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait(self, after: int, visible: Callable[[Event], bool], timeout: float) -> Tuple[int, List[Event]]:
+        """Wait up to timeout for visible events after an id
+
+        Returns the new position, which moves past invisible events too, and
+        the visible events. Raises EventsMissed if the position is outside
+        the backlog.
+        """
+        deadline = self._loop.time() + timeout
+        while True:
+            changed = self._changed
+            if after > self.last_seq or (self._seqs and after < self._seqs[0] - 1):
+                raise EventsMissed()
+            events = self._events[bisect.bisect_right(self._seqs, after):]
+            if events:
+                after = events[-1].seq
+                events = [event for event in events if visible(event)]
+                if events:
+                    return after, events
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return after, []
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return after, []
+
+
+hub = EventHub()
+
+
+def _message(event_type: str, data: str, seq: Optional[int] = None) -> str:
+    return (f"id: {seq}\n" if seq is not None else "") + f"event: {event_type}\ndata: {data}\n\n"
+
+
+async def stream(user_id: str, is_admin: bool, after: Optional[int]) -> AsyncIterator[str]:
+    """Server-sent events for the mutations a user is party to, or all for admins
+
+    A new stream (no ``after``) starts with a ``ready`` event carrying the
+    current position; ``mutation`` events follow, each with the mutation's
+    full new state.
+    """
+    def visible(event: Event) -> bool:
+        return is_admin or user_id in event.audience
+
+    yield f"retry: {RETRY_MS}\n\n"
+    if after is None:
+        after = hub.last_seq
+        yield _message("ready", "{}", after)
+    while True:
+        try:
+            after, events = await hub.wait(after, visible, EVENT_KEEPALIVE_SECONDS)
+        except EventsMissed:
+            after = hub.last_seq
+            yield _message("reset", "{}", after)
+            continue
+        if not events:
+            # Keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+        for event in events:
+            yield _message("mutation", f'{{"type":"{event.event_type}","mutation":{event.payload}}}', event.seq)
@@ -0,0 +1,110 @@
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+from sqlalchemy import or_, select
+from ..models.models import Document, LandRecord, MutationRecord
+from .projection import dumps
+
+# Full and incremental dumps of the registry for banks and auditors. Rows
+# are read by a single statement, so a dump is a consistent snapshot, and
+# fetched EXPORT_BATCH_SIZE at a time (yield_per), so memory stays constant
+# however large the table. An incremental dump holds the rows created or
+# changed after a watermark; every dump reports the watermark to pass as
+# `since` next time. It is WATERMARK_OVERLAP before the snapshot started, so
+# rows written by transactions still in flight are not missed; consumers
+# upsert by id, which makes the few rows sent twice harmless.
+
+EXPORT_BATCH_SIZE = 1000
+WATERMARK_OVERLAP = timedelta(seconds=60)
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class Dataset(NamedTuple):
+    columns: list
+    changed: list  # timestamps a row counts as changed at, for incremental dumps
+
+
+DATASETS = {
+    "land_records": Dataset(
+        [LandRecord.id, LandRecord.survey_number, LandRecord.owner_id, LandRecord.property_address,
+         LandRecord.area_sqft, LandRecord.document_hash, LandRecord.geo_latitude, LandRecord.geo_longitude,
+         LandRecord.is_active, LandRecord.created_at, LandRecord.updated_at, LandRecord.version],
+        [LandRecord.updated_at],
+    ),
+    "mutations": Dataset(
+        [MutationRecord.id, MutationRecord.land_id, MutationRecord.previous_owner_id, MutationRecord.new_owner_id,
+         MutationRecord.mutation_date, MutationRecord.mutation_reason, MutationRecord.transaction_id,
+         MutationRecord.status, MutationRecord.verification_hash, MutationRecord.decided_at],
+        # Requested, or approved or rejected since
+        [MutationRecord.mutation_date, MutationRecord.decided_at],
+    ),
+    "documents": Dataset(
+        [Document.id, Document.land_id, Document.document_type, Document.file_name, Document.file_hash,
+         Document.uploaded_at],
+        [Document.uploaded_at],
+    ),
+}
+
+
+def watermark(started: datetime) -> datetime:
+    """Get the `since` value for the next incremental dump after one started at this time"""
+    return started - WATERMARK_OVERLAP
+
+
+def export_query(dataset: str, since: Optional[datetime] = None):
+    columns, changed = DATASETS[dataset]
+    query = select(*columns)
+    if since is not None:
+        query = query.where(or_(*(column > since for column in changed)))
+    return query
+
+
+def iter_rows(conn, dataset: str, since: Optional[datetime] = None,
+              batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """Yield a dataset's rows in batches, fetched incrementally from the database"""
+    result = conn.execution_options(yield_per=batch_size).execute(export_query(dataset, since))
+    yield from result.partitions()
+
+
+def _ndjson(names: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+
+def _csv(names: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode(dataset: str, fmt: str, batches: Iterable[List[tuple]], compress: bool = False) -> Iterator[bytes]:
+    """Encode row batches as NDJSON or CSV (with a header row), optionally gzipped"""
+    names = [column.key for column in DATASETS[dataset].columns]
+    chunks = _ndjson(names, batches) if fmt == "ndjson" else _csv(names, batches)
+    return _gzip(chunks) if compress else chunks
+
+
+def file_name(dataset: str, fmt: str, compress: bool, since: Optional[datetime] = None) -> str:
+    suffix = f"-since-{since:%Y%m%dT%H%M%S}" if since is not None else ""
+    return f"{dataset}{suffix}.{fmt}" + (".gz" if compress else "")
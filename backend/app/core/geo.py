@@ -0,0 +1,188 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+from ..db.database import increment
+from ..models.models import LandRecord, ParcelCluster
+
+# Parcels are indexed on a Web Mercator (slippy map) grid. Every located
+# record stores the key of its cell at GRID_ZOOM, and parcel_clusters keeps a
+# running count and coordinate sum per cell for the coarser cluster levels.
+GRID_ZOOM = 16
+CLUSTER_LEVELS = 16          # cluster cells are kept for levels 0..15
+CLUSTER_MAX_ZOOM = 13        # map zooms at or below this are served as clusters
+CLUSTER_LEVEL_OFFSET = 2     # a 256px tile is split into 4x4 cluster cells
+MAX_CELL_COLUMNS = 64        # wider viewports fall back to a plain range filter
+MAX_LATITUDE = 85.05112878
+
+BoundingBox = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def tile_xy(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Convert a coordinate to slippy map tile indices at the given zoom"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    n = 1 << zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cell_key(lat: float, lon: float) -> int:
+    """Get the grid cell key stored in LandRecord.geo_cell"""
+    x, y = tile_xy(lat, lon, GRID_ZOOM)
+    return (x << GRID_ZOOM) | y
+
+
+def cell_ranges(bbox: BoundingBox) -> Optional[List[Tuple[int, int]]]:
+    """Get the geo_cell key ranges covering a bounding box, one per grid column"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    # Tile y grows southwards, so the north edge gives the smallest row
+    x_min, y_min = tile_xy(max_lat, min_lon, GRID_ZOOM)
+    x_max, y_max = tile_xy(min_lat, max_lon, GRID_ZOOM)
+    if x_max - x_min + 1 > MAX_CELL_COLUMNS:
+        return None
+    return [((x << GRID_ZOOM) | y_min, (x << GRID_ZOOM) | y_max) for x in range(x_min, x_max + 1)]
+
+
+def cluster_level(zoom: int) -> int:
+    """Get the cluster level used to render a map zoom"""
+    return min(zoom + CLUSTER_LEVEL_OFFSET, CLUSTER_LEVELS - 1)
+
+
+def cluster_deltas(points, sign: int = 1) -> Dict[Tuple[int, int, int], List[float]]:
+    """Accumulate per-cell count and coordinate sums for (lat, lon) points"""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for lat, lon in points:
+        for level in range(CLUSTER_LEVELS):
+            delta = deltas[(level,) + tile_xy(lat, lon, level)]
+            delta[0] += sign
+            delta[1] += sign * lat
+            delta[2] += sign * lon
+    return deltas
+
+
+def apply_cluster_deltas(db: Session, deltas: Dict[Tuple[int, int, int], List[float]]):
+    """Add accumulated deltas to parcel_clusters (caller commits)"""
+    for (level, x, y), (count, lat_sum, lon_sum) in deltas.items():
+        increment(
+            db,
+            ParcelCluster,
+            {"zoom": level, "cell_x": x, "cell_y": y},
+            {"parcel_count": count, "lat_sum": lat_sum, "lon_sum": lon_sum},
+        )
+
+
+def index_parcel(db: Session, record: LandRecord):
+    """Set the grid cell of a new record and count it in the clusters (caller commits)"""
+    if record.geo_latitude is None or record.geo_longitude is None:
+        record.geo_cell = None
+        return
+    record.geo_cell = cell_key(record.geo_latitude, record.geo_longitude)
+    apply_cluster_deltas(db, cluster_deltas([(record.geo_latitude, record.geo_longitude)]))
+
+
+def query_clusters(db: Session, bbox: BoundingBox, zoom: int, limit: int) -> List[dict]:
+    """Get up to ``limit`` cluster features for a viewport from the precomputed cell counts
+
+    A bounding box wider than the zoom implies is served from a coarser
+    level, at most MAX_CELL_COLUMNS cells across and down; the most populous
+    cells are kept when there are more than ``limit``.
+    """
+    min_lat, min_lon, max_lat, max_lon = bbox
+    level = cluster_level(zoom)
+    while True:
+        x_min, y_min = tile_xy(max_lat, min_lon, level)
+        x_max, y_max = tile_xy(min_lat, max_lon, level)
+        if level == 0 or max(x_max - x_min, y_max - y_min) < MAX_CELL_COLUMNS:
+            break
+        level -= 1
+    cells = db.query(
+        ParcelCluster.parcel_count, ParcelCluster.lat_sum, ParcelCluster.lon_sum
+    ).filter(
+        ParcelCluster.zoom == level,
+        ParcelCluster.cell_x.between(x_min, x_max),
+        ParcelCluster.cell_y.between(y_min, y_max),
+        ParcelCluster.parcel_count > 0,
+    ).order_by(ParcelCluster.parcel_count.desc()).limit(limit)
+    return [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [round(lon_sum / count, 6), round(lat_sum / count, 6)],
+            },
+            "properties": {"cluster": True, "point_count": count},
+        }
+        for count, lat_sum, lon_sum in cells
+    ]
+
+
+def query_parcels(db: Session, bbox: BoundingBox, limit: int, owner_id: Optional[str] = None) -> List[dict]:
+    """Get compact point features for the located records inside a viewport"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    query = db.query(
+        LandRecord.id,
+        LandRecord.survey_number,
+        LandRecord.area_sqft,
+        LandRecord.geo_latitude,
+        LandRecord.geo_longitude,
+    )
+    if owner_id is not None:
+        query = query.filter(LandRecord.owner_id == owner_id)
+    else:
+        ranges = cell_ranges(bbox)
+        if ranges is not None:
+            query = query.filter(or_(*[LandRecord.geo_cell.between(lo, hi) for lo, hi in ranges]))
+    rows = query.filter(
+        LandRecord.geo_latitude.between(min_lat, max_lat),
+        LandRecord.geo_longitude.between(min_lon, max_lon),
+    ).limit(limit)
+    return [
+        {
+            "type": "Feature",
+            "id": record_id,
+            "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+            "properties": {"id": record_id, "survey_number": survey_number, "area_sqft": area_sqft},
+        }
+        for record_id, survey_number, area_sqft, lat, lon in rows
+    ]
+
+
+def rebuild_parcel_grid(db: Session, batch_size: int = 5000) -> int:
+    """Recompute geo_cell for every record and rebuild parcel_clusters from scratch"""
+    records = LandRecord.__table__
+    set_cell = update(records).where(records.c.id == bindparam("record_id")).values(
+        geo_cell=bindparam("cell"),
+        # Re-indexing is not a change to the record itself
+        updated_at=records.c.updated_at,
+    )
+    db.query(ParcelCluster).delete(synchronize_session=False)
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    indexed = 0
+    last_id = ""
+    while True:
+        rows = db.query(
+            LandRecord.id, LandRecord.geo_latitude, LandRecord.geo_longitude
+        ).filter(LandRecord.id > last_id).order_by(LandRecord.id).limit(batch_size).all()
+        if not rows:
+            break
+        located = [(lat, lon) for _, lat, lon in rows if lat is not None and lon is not None]
+        db.execute(set_cell, [
+            {
+                "record_id": record_id,
+                "cell": cell_key(lat, lon) if lat is not None and lon is not None else None,
+            }
+            for record_id, lat, lon in rows
+        ])
+        for cell, (count, lat_sum, lon_sum) in cluster_deltas(located).items():
+            total = deltas[cell]
+            total[0] += count
+            total[1] += lat_sum
+            total[2] += lon_sum
+        indexed += len(located)
+        last_id = rows[-1][0]
+    apply_cluster_deltas(db, deltas)
+    db.commit()
+    return indexed
@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, List, Optional
+from fastapi import Request, Response
+
+# Conditional GET. ETagMiddleware gives every complete 200 JSON response to a
+# GET a strong ETag (a digest of the body) and answers a matching
+# If-None-Match with an empty 304, so an unchanged payload is never resent.
+# Endpoints with a cheaper version identifier set their own ETag (and
+# Last-Modified) and call not_modified() before loading or serializing
+# anything; the middleware then leaves their ETag alone.
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def raw_header(headers: Iterable, name: bytes) -> Optional[bytes]:
+    """Get a header from ASGI (name, value) byte pairs; name must be lower case"""
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def http_date(moment: datetime) -> str:
+    """Format a naive local or aware timestamp as an HTTP date"""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Get a 304 response when the client's copy is current, else None
+
+    If-Modified-Since is only consulted when the request has no If-None-Match.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    elif last_modified is not None and "if-modified-since" in request.headers:
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            fresh = last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+    return Response(status_code=304, headers=validator_headers(etag, last_modified)) if fresh else None
+
+
+class ETagMiddleware:
+    """Add body-digest ETags to JSON GET responses and answer matching requests with 304"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        if_none_match = raw_header(scope["headers"], b"if-none-match")
+        if_none_match = if_none_match.decode("latin-1") if if_none_match else None
+        start = None
+        passthrough = False
+        body: List[bytes] = []
+
+        async def send_with_etag(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                content_type = raw_header(message.get("headers", []), b"content-type") or b""
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            content = b"".join(body)
+            headers = [(key, value) for key, value in start.get("headers", []) if key.lower() != b"cache-control"]
+            etag = raw_header(headers, b"etag")
+            if etag is None:
+                etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'.encode("latin-1")
+                headers.append((b"etag", etag))
+            headers.append((b"cache-control", CACHE_CONTROL.encode("latin-1")))
+
+            if etag_matches(if_none_match, etag.decode("latin-1")):
+                kept = [(key, value) for key, value in headers
+                        if key.lower() in (b"etag", b"cache-control", b"last-modified", b"vary")]
+                await send({"type": "http.response.start", "status": 304, "headers": kept})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": content})
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,306 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_
+from sqlalchemy.orm import Session
+from ..models.models import Document, LedgerEntry, LedgerNode, LedgerSeal, MutationRecord
+from .config import settings
+
+# Entries are sealed into Merkle trees of at most this many leaves, or
+# sooner once the oldest waiting entry is this old
+LEDGER_SEAL_SIZE = settings.ledger_seal_size
+LEDGER_SEAL_MAX_AGE = timedelta(seconds=settings.ledger_seal_max_age_seconds)
+# Domain tags keeping Merkle leaves, inner nodes and chain entries apart
+LEAF_TAG = "leaf:"
+NODE_TAG = "node:"
+
+# The ledger is append-only. Each entry commits to its payload and to the
+# previous entry of the same parcel:
+#
+#     entry_hash = sha256(prev_hash + payload_hash)
+#
+# where prev_hash is "" for a parcel's first entry, and payload_hash is the
+# SHA-256 of the canonical payload returned with each proof. Runs of
+# consecutive entries are periodically sealed into a Merkle tree whose nodes
+# are stored, so an inclusion proof is log2(seal size) sibling hashes fetched
+# in one query:
+#
+#     leaf = sha256("leaf:" + entry_hash)
+#     node = sha256("node:" + left + right)
+#
+# An odd node is promoted unchanged. Seals chain through prev_root.
+
+
+def sha256_hex(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def mutation_payload(mutation: MutationRecord, status: str, decided_at: datetime) -> str:
+    """Canonical ledger payload of a decided mutation"""
+    return "|".join([
+        "mutation", mutation.id, mutation.land_id, mutation.previous_owner_id, mutation.new_owner_id,
+        mutation.transaction_id, status, decided_at.isoformat(),
+    ])
+
+
+def document_payload(document: Document) -> str:
+    """Canonical ledger payload of an uploaded document"""
+    return "|".join([
+        "document", document.id, document.land_id, document.file_hash, document.uploaded_at.isoformat(),
+    ])
+
+
+def parcel_head(db: Session, land_id: str) -> str:
+    """Get the entry hash ending a parcel's chain, or "" when it has none"""
+    head = db.query(LedgerEntry.entry_hash).filter(LedgerEntry.land_id == land_id) \
+        .order_by(LedgerEntry.seq.desc()).limit(1).scalar()
+    return head or ""
+
+
+def parcel_heads(db: Session, land_ids: Iterable[str]) -> Dict[str, str]:
+    """Get the chain heads of many parcels in one query; parcels without entries map to """""
+    land_ids = list(set(land_ids))
+    latest = db.query(func.max(LedgerEntry.seq)).filter(LedgerEntry.land_id.in_(land_ids)) \
+        .group_by(LedgerEntry.land_id)
+    heads = dict.fromkeys(land_ids, "")
+    heads.update(
+        db.query(LedgerEntry.land_id, LedgerEntry.entry_hash).filter(LedgerEntry.seq.in_(latest)).all()
+    )
+    return heads
+
+
+def append_many(db: Session, items: List[Tuple[str, str, str, str]]) -> List[str]:
+    """Append (land_id, entry_type, ref_id, payload) entries in order with one INSERT (caller commits)
+
+    Returns the entry hashes, in order.
+    """
+    if not items:
+        return []
+    heads = parcel_heads(db, [land_id for land_id, _, _, _ in items])
+    rows = []
+    for land_id, entry_type, ref_id, payload in items:
+        payload_hash = sha256_hex(payload)
+        prev_hash = heads[land_id]
+        heads[land_id] = sha256_hex(prev_hash + payload_hash)
+        rows.append({
+            "land_id": land_id,
+            "entry_type": entry_type,
+            "ref_id": ref_id,
+            "payload_hash": payload_hash,
+            "prev_hash": prev_hash,
+            "entry_hash": heads[land_id],
+        })
+    db.execute(insert(LedgerEntry), rows)
+    return [row["entry_hash"] for row in rows]
+
+
+def append(db: Session, land_id: str, entry_type: str, ref_id: str, payload: str,
+           heads: Optional[Dict[str, str]] = None) -> LedgerEntry:
+    """Append an entry to a parcel's chain (caller commits)
+
+    ``heads`` caches chain heads across appends in one transaction. Two
+    transactions extending the same chain concurrently collide on the unique
+    (land_id, prev_hash) constraint, so the chain cannot fork.
+    """
+    heads = {} if heads is None else heads
+    if land_id not in heads:
+        heads[land_id] = parcel_head(db, land_id)
+    payload_hash = sha256_hex(payload)
+    prev_hash = heads[land_id]
+    entry = LedgerEntry(
+        land_id=land_id,
+        entry_type=entry_type,
+        ref_id=ref_id,
+        payload_hash=payload_hash,
+        prev_hash=prev_hash,
+        entry_hash=sha256_hex(prev_hash + payload_hash),
+    )
+    db.add(entry)
+    heads[land_id] = entry.entry_hash
+    return entry
+
+
+def _leaf(entry_hash: str) -> str:
+    return sha256_hex(LEAF_TAG + entry_hash)
+
+
+def _parent(left: str, right: str) -> str:
+    return sha256_hex(NODE_TAG + left + right)
+
+
+def seal(db: Session, max_leaves: int = LEDGER_SEAL_SIZE) -> Optional[LedgerSeal]:
+    """Seal the oldest unsealed entries (up to max_leaves) under a new Merkle root"""
+    db.flush()
+    last = db.query(LedgerSeal).order_by(LedgerSeal.id.desc()).first()
+    first_seq = last.last_seq + 1 if last else 1
+    leaves = db.query(LedgerEntry.seq, LedgerEntry.entry_hash).filter(LedgerEntry.seq >= first_seq) \
+        .order_by(LedgerEntry.seq).limit(max_leaves).all()
+    if not leaves:
+        return None
+
+    levels = [[_leaf(entry_hash) for _, entry_hash in leaves]]
+    while len(levels[-1]) > 1:
+        below = levels[-1]
+        levels.append([
+            _parent(below[i], below[i + 1]) if i + 1 < len(below) else below[i]
+            for i in range(0, len(below), 2)
+        ])
+    ledger_seal = LedgerSeal(
+        first_seq=leaves[0][0],
+        last_seq=leaves[-1][0],
+        leaf_count=len(leaves),
+        merkle_root=levels[-1][0],
+        prev_root=last.merkle_root if last else "",
+        sealed_at=datetime.now(),
+    )
+    db.add(ledger_seal)
+    db.flush()
+    db.execute(insert(LedgerNode), [
+        {"seal_id": ledger_seal.id, "level": level, "position": position, "hash": node_hash}
+        for level, nodes in enumerate(levels)
+        for position, node_hash in enumerate(nodes)
+    ])
+    db.query(LedgerEntry).filter(LedgerEntry.seq.between(ledger_seal.first_seq, ledger_seal.last_seq)) \
+        .update({LedgerEntry.seal_id: ledger_seal.id}, synchronize_session=False)
+    return ledger_seal
+
+
+def seal_due(db: Session) -> bool:
+    """Whether a full batch is waiting or the oldest waiting entry is past LEDGER_SEAL_MAX_AGE"""
+    sealed_through = db.query(func.max(LedgerSeal.last_seq)).scalar() or 0
+    latest = db.query(func.max(LedgerEntry.seq)).scalar() or 0
+    if latest - sealed_through >= LEDGER_SEAL_SIZE:
+        return True
+    oldest = db.query(LedgerEntry.created_at).filter(LedgerEntry.seq > sealed_through) \
+        .order_by(LedgerEntry.seq).limit(1).scalar()
+    return oldest is not None and oldest <= datetime.now() - LEDGER_SEAL_MAX_AGE
+
+
+def seal_if_due(db: Session):
+    """Seal the waiting entries once a full batch is waiting or they have waited too long (caller commits)"""
+    db.flush()
+    if seal_due(db):
+        seal(db)
+
+
+def seal_all(db: Session) -> int:
+    """Seal every waiting entry, including a final partial batch, and commit"""
+    seals = 0
+    while seal(db) is not None:
+        seals += 1
+        db.commit()
+    return seals
+
+
+def inclusion_proof(db: Session, entry: LedgerEntry) -> Optional[dict]:
+    """Get the Merkle path from a sealed entry to its seal's root
+
+    Verify by starting from ``sha256("leaf:" + entry_hash)`` and, for each
+    step, hashing ``"node:" + sibling + current`` when the sibling is on the
+    left or ``"node:" + current + sibling`` when it is on the right; the
+    result must equal merkle_root. Returns None while the entry is not
+    sealed yet.
+    """
+    if entry.seal_id is None:
+        return None
+    ledger_seal = db.query(LedgerSeal).filter(LedgerSeal.id == entry.seal_id).first()
+
+    # Walk up the tree collecting sibling coordinates, then fetch them in one query
+    position = entry.seq - ledger_seal.first_seq
+    width = ledger_seal.leaf_count
+    path = []
+    level = 0
+    while width > 1:
+        sibling = position ^ 1
+        if sibling < width:
+            path.append((level, sibling, "left" if sibling < position else "right"))
+        position //= 2
+        width = (width + 1) // 2
+        level += 1
+    nodes = {
+        (node_level, node_position): node_hash
+        for node_level, node_position, node_hash in db.query(
+            LedgerNode.level, LedgerNode.position, LedgerNode.hash
+        ).filter(
+            LedgerNode.seal_id == ledger_seal.id,
+            or_(*[and_(LedgerNode.level == lvl, LedgerNode.position == pos) for lvl, pos, _ in path]),
+        )
+    } if path else {}
+    return {
+        "seal": {
+            "id": ledger_seal.id,
+            "merkle_root": ledger_seal.merkle_root,
+            "prev_root": ledger_seal.prev_root,
+            "first_seq": ledger_seal.first_seq,
+            "last_seq": ledger_seal.last_seq,
+            "sealed_at": ledger_seal.sealed_at,
+        },
+        "path": [{"hash": nodes[(lvl, pos)], "side": side} for lvl, pos, side in path],
+    }
+
+
+def entry_payload(db: Session, entry: LedgerEntry) -> Optional[str]:
+    """Rebuild an entry's canonical payload from the mutation or document it records
+
+    Its SHA-256 matches payload_hash unless the record was changed after it
+    was ledgered.
+    """
+    if entry.entry_type == "mutation":
+        mutation = db.query(MutationRecord).filter(MutationRecord.id == entry.ref_id).first()
+        if mutation is None:
+            return None
+        # Mutations ledgered by backfill without a decision time used their request date
+        return mutation_payload(mutation, mutation.status, mutation.decided_at or mutation.mutation_date)
+    document = db.query(Document).filter(Document.id == entry.ref_id).first()
+    return document_payload(document) if document is not None else None
+
+
+def entry_view(entry: LedgerEntry) -> dict:
+    return {
+        "seq": entry.seq,
+        "land_id": entry.land_id,
+        "entry_type": entry.entry_type,
+        "ref_id": entry.ref_id,
+        "payload_hash": entry.payload_hash,
+        "prev_hash": entry.prev_hash,
+        "entry_hash": entry.entry_hash,
+        "created_at": entry.created_at,
+    }
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """Append entries for decided mutations and documents that predate the ledger
+
+    Items are appended oldest first. Backfilled mutations get their chained
+    entry hash as verification_hash. Commits per batch and seals at the end.
+    """
+    ledgered = db.query(LedgerEntry.ref_id)
+    items = []
+    for mutation in db.query(MutationRecord).filter(
+        MutationRecord.status.in_(["approved", "rejected"]), ~MutationRecord.id.in_(ledgered)
+    ):
+        items.append((mutation.decided_at or mutation.mutation_date, "mutation", mutation))
+    for document in db.query(Document).filter(~Document.id.in_(ledgered)):
+        items.append((document.uploaded_at, "document", document))
+    items.sort(key=lambda item: (item[0] or datetime.min, item[2].id))
+
+    heads = {}
+    for count, (moment, entry_type, item) in enumerate(items, start=1):
+        if entry_type == "mutation":
+            entry = append(db, item.land_id, "mutation", item.id,
+                           mutation_payload(item, item.status, item.decided_at or item.mutation_date), heads)
+            item.verification_hash = entry.entry_hash
+        else:
+            append(db, item.land_id, "document", item.id, document_payload(item), heads)
+        if count % batch_size == 0:
+            seal_if_due(db)
+            db.commit()
+    db.commit()
+    seal_all(db)
+    return len(items)
+
+
+def parcel_chain(db: Session, land_id: str, limit: int) -> List[LedgerEntry]:
+    """Get a parcel's ledger entries, oldest first"""
+    return db.query(LedgerEntry).filter(LedgerEntry.land_id == land_id) \
+        .order_by(LedgerEntry.seq).limit(limit).all()
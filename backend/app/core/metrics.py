@@ -0,0 +1,201 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.routing import APIRoute
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+
+# Queries slower than this are logged, with their bound parameters redacted
+SLOW_QUERY_MS = settings.slow_query_ms
+# Admins can send this header to get a cProfile report instead of the response
+PROFILE_HEADER = b"x-profile"
+PROFILE_LINES = 40
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+slow_query_log = logging.getLogger("app.sql.slow")
+
+# Per-request measurements, shared with the worker thread running the endpoint
+request_stats: ContextVar[Optional[dict]] = ContextVar("request_stats", default=None)
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"), buckets=LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_queries", "SQL statements executed per request", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement type", ("statement",), buckets=LATENCY_BUCKETS
+)
+slow_queries = Counter("db_slow_queries", "SQL statements slower than SLOW_QUERY_MS", ("statement", "route"))
+
+
+def render_metrics() -> bytes:
+    """Render every metric in the Prometheus text exposition format
+
+    Under the multi-worker launcher (serve.py) each worker writes its samples
+    to PROMETHEUS_MULTIPROC_DIR, and a scrape of any worker aggregates them
+    all; otherwise this process's own registry is rendered.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def _statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA") else "OTHER"
+
+
+def install_sql_hooks(engine):
+    """Time every statement on an engine, per request and overall, and log slow ones"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        kind = _statement_type(statement)
+        query_duration.labels(kind).observe(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats["queries"] += 1
+            stats["query_seconds"] += elapsed
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            route = stats["route"] if stats is not None else "-"
+            slow_queries.labels(kind, route).inc()
+            rows = len(parameters) if executemany else 1
+            slow_query_log.warning(
+                "slow query %.1f ms on %s: %s [parameters redacted, %d row(s)]",
+                elapsed * 1000, route, " ".join(statement.split()), rows,
+            )
+
+
+class InstrumentedRoute(APIRoute):
+    """Route that labels request metrics with its path template and can profile its endpoint"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not _is_async(call):
+            self.dependant.call = _profiled(call)
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def instrumented_handler(request):
+            stats = request_stats.get()
+            if stats is not None:
+                stats["route"] = path
+            return await handler(request)
+
+        return instrumented_handler
+
+
+def _is_async(call) -> bool:
+    return asyncio.iscoroutinefunction(call) or asyncio.iscoroutinefunction(getattr(call, "__call__", None))
+
+
+def _profiled(call):
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        stats = request_stats.get()
+        profiler = stats.get("profiler") if stats is not None else None
+        if profiler is None:
+            return call(*args, **kwargs)
+        # Endpoints run in a worker thread, and cProfile only sees the thread enabling it
+        profiler.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profiler.disable()
+    return run
+
+
+def _profile_report(profiler: cProfile.Profile, status: int, elapsed: float, stats: dict) -> bytes:
+    out = io.StringIO()
+    out.write(f"{stats['route']} -> {status} in {elapsed * 1000:.1f} ms, "
+              f"{stats['queries']} queries in {stats['query_seconds'] * 1000:.1f} ms\n\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return out.getvalue().encode()
+
+
+def _is_admin_token(authorization: Optional[bytes]) -> bool:
+    from ..api.auth import get_current_user
+    from ..db.database import SessionLocal
+    if not authorization or not authorization.lower().startswith(b"bearer "):
+        return False
+    db = SessionLocal()
+    try:
+        return get_current_user(authorization[7:].decode("latin-1"), db).is_admin
+    except Exception:
+        return False
+    finally:
+        db.close()
+
+
+class MetricsMiddleware:
+    """Record request latency and query counts per route, and serve admin profiles
+
+    Adds a Server-Timing header with the time spent in the database.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = {"route": "unmatched", "queries": 0, "query_seconds": 0.0, "profiler": None}
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers and await run_in_threadpool(_is_admin_token, headers.get(b"authorization")):
+            stats["profiler"] = cProfile.Profile()
+        token = request_stats.set(stats)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats["profiler"] is not None:
+                    return
+                timing = (f'db;dur={stats["query_seconds"] * 1000:.1f};desc="{stats["queries"]} queries", '
+                          f'app;dur={(time.perf_counter() - started) * 1000:.1f}')
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            elif message["type"] == "http.response.body" and stats["profiler"] is not None:
+                # The profile report replaces the response
+                if message.get("more_body", False):
+                    return
+                report = _profile_report(stats["profiler"], status, time.perf_counter() - started, stats)
+                await send({"type": "http.response.start", "status": 200, "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(report)).encode()),
+                    (b"x-profiled-status", str(status).encode()),
+                ]})
+                message = {"type": "http.response.body", "body": report}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            method = scope["method"]
+            request_duration.labels(method, stats["route"], str(status)).observe(elapsed)
+            request_queries.labels(method, stats["route"]).observe(stats["queries"])
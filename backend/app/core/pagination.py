@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_
+
+# Opaque keyset cursors: the sort key name, the sort value and the row id of
+# the last row on a page, encoded as URL-safe base64 JSON.
+
+
+def encode_cursor(sort: str, value: datetime, row_id: str) -> str:
+    """Build the cursor that continues after the given row"""
+    payload = json.dumps([sort, value.isoformat() if value else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Optional[datetime], str]:
+    """Parse a cursor produced by encode_cursor, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort order")
+    return (datetime.fromisoformat(value) if value else None), row_id
+
+
+def keyset_page(query, sort_column, id_column, after, limit: int, descending: bool):
+    """Order a query by (sort_column, id_column), resume after a decoded cursor and fetch limit + 1 rows"""
+    if after is not None:
+        value, row_id = after
+        if descending:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, id_column < row_id)))
+        else:
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, id_column > row_id)))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    return query.limit(limit + 1).all()
+
+
+def merge_pages(pages: List[list], sort: str, limit: int, descending: bool) -> list:
+    """Merge keyset pages of the same listing fetched through different indexes"""
+    rows = {}
+    for page in pages:
+        for row in page:
+            rows[row.id] = row
+    merged = sorted(rows.values(), key=lambda row: (getattr(row, sort), row.id), reverse=descending)
+    return merged[:limit + 1]
+
+
+def split_page(rows: list, sort: str, limit: int) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row and build the next cursor when there are more rows"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort), last.id)
@@ -0,0 +1,147 @@
+import io
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+from .config import settings
+from .storage import UPLOAD_DIR
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional; without it no previews are made
+    Image = None
+
+try:
+    import pymupdf
+except ImportError:  # optional; needed for PDF previews only
+    pymupdf = None
+
+# First-page previews of scanned documents, so a document list can show
+# thumbnails without transferring whole scans. A preview is a JPEG at most
+# PREVIEW_SIZE pixels on its longer side, made on first request and stored
+# under previews/ by the document's SHA-256, so identical uploads share one
+# and a preview never goes stale. The directory is a least-recently-used
+# cache: serving a preview bumps its mtime, and when a new preview takes the
+# directory over PREVIEW_CACHE_MB the oldest are deleted. They are remade on
+# demand, so the directory can also be cleared at any time.
+
+PREVIEW_DIR = UPLOAD_DIR / "previews"
+PREVIEW_SIZE = settings.preview_size
+PREVIEW_CACHE_BYTES = settings.preview_cache_mb * 1024 * 1024
+JPEG_QUALITY = 80
+EVICT_TO = 0.9  # fraction of the budget left after evicting
+
+_lock = threading.Lock()
+_cache_bytes: Optional[int] = None  # this process's running estimate
+
+
+def preview_path(file_hash: str) -> Path:
+    return PREVIEW_DIR / file_hash[:2] / f"{file_hash}-{PREVIEW_SIZE}.jpg"
+
+
+def _render_pdf(source: Path) -> "Image.Image":
+    with pymupdf.open(source) as document:
+        page = document[0]
+        zoom = PREVIEW_SIZE / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _render_image(source: Path) -> "Image.Image":
+    image = Image.open(source)
+    # Lets JPEG decode at a fraction of full size
+    image.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    return image.convert("RGB")
+
+
+def render(source: Path) -> Optional[bytes]:
+    """Render the first page of a PDF or an image as a JPEG preview, or None if it cannot be"""
+    if Image is None:
+        return None
+    with open(source, "rb") as file:
+        is_pdf = file.read(5) == b"%PDF-"
+    try:
+        if is_pdf:
+            if pymupdf is None:
+                return None
+            image = _render_pdf(source)
+        else:
+            image = _render_image(source)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+    except Exception:
+        # Not an image, damaged, encrypted or a decompression bomb
+        return None
+
+
+def _scan():
+    entries = []
+    for path in PREVIEW_DIR.glob("*/*.jpg"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _evict():
+    """Delete the least recently used previews until the cache is under budget"""
+    global _cache_bytes
+    entries = sorted(_scan())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= PREVIEW_CACHE_BYTES * EVICT_TO:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+    _cache_bytes = total
+
+
+def _added(size: int):
+    global _cache_bytes
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _scan())
+        else:
+            _cache_bytes += size
+        # Other workers add previews too; the scan in _evict counts those
+        if _cache_bytes > PREVIEW_CACHE_BYTES:
+            _evict()
+
+
+def get_preview(file_hash: str, source: Path) -> Optional[Path]:
+    """Get the cached preview of a stored document, making it if needed
+
+    Blocking. Returns None when no preview can be made.
+    """
+    target = preview_path(file_hash)
+    try:
+        os.utime(target)
+        return target
+    except FileNotFoundError:
+        pass
+
+    content = render(source)
+    if content is None:
+        return None
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=".preview-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    _added(len(content))
+    return target
@@ -0,0 +1,177 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..db.database import increment
+from ..models.models import Document, LandRecord, MutationRecord, ReportAggregate
+
+# Dashboard figures are read from report_aggregates, a table of (metric,
+# bucket) -> count/area counters updated in the same transaction as the
+# writes they summarise. Metrics:
+#   parcels             all            registered parcels and their area
+#   parcels.owner       <owner id>     parcels and area held by each owner
+#   parcels.status      active|inactive
+#   parcels.month       YYYY-MM        registrations per month
+#   parcels.documented  all            parcels with at least one document
+#   owners              all            users holding at least one parcel
+#   mutations.status    pending|approved|rejected
+#   mutations.requested YYYY-MM        transfer requests per month
+#   mutations.approved  YYYY-MM        approvals per month (throughput)
+#   mutations.rejected  YYYY-MM        rejections per month
+#   documents           all            uploaded documents
+#   documents.type      <type>
+#   documents.month     YYYY-MM
+
+ParcelDelta = Dict[Tuple[str, str], list]
+
+
+def month_bucket(moment: Optional[datetime]) -> str:
+    """Get the YYYY-MM bucket of a timestamp"""
+    return (moment or datetime.now()).strftime("%Y-%m")
+
+
+def _apply(db: Session, deltas: ParcelDelta):
+    for (metric, bucket), (count, area) in deltas.items():
+        if count or area:
+            increment(db, ReportAggregate, {"metric": metric, "bucket": bucket}, {"count": count, "area_sqft": area})
+
+
+def _owner_counts(db: Session, owner_ids: Iterable[str]) -> Dict[str, int]:
+    return dict(db.query(ReportAggregate.bucket, ReportAggregate.count).filter(
+        ReportAggregate.metric == "parcels.owner", ReportAggregate.bucket.in_(set(owner_ids))
+    ))
+
+
+def _apply_owner_deltas(db: Session, owner_deltas: Dict[str, list]):
+    """Move parcel counts between owners, keeping the distinct owner count in step"""
+    before = _owner_counts(db, owner_deltas)
+    owners = 0
+    for owner_id, (count, area) in owner_deltas.items():
+        held = before.get(owner_id, 0)
+        owners += (held + count > 0) - (held > 0)
+    deltas = {("parcels.owner", owner_id): delta for owner_id, delta in owner_deltas.items()}
+    deltas[("owners", "all")] = [owners, 0.0]
+    _apply(db, deltas)
+
+
+def record_parcels_created(db: Session, parcels: Iterable[Tuple[str, float, datetime]]):
+    """Count newly registered (owner id, area, created at) parcels (caller commits)"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    owner_deltas = defaultdict(lambda: [0, 0.0])
+    for owner_id, area, created_at in parcels:
+        area = area or 0.0
+        for key in (("parcels", "all"), ("parcels.status", "active"), ("parcels.month", month_bucket(created_at))):
+            deltas[key][0] += 1
+            deltas[key][1] += area
+        owner_deltas[owner_id][0] += 1
+        owner_deltas[owner_id][1] += area
+    _apply(db, deltas)
+    if owner_deltas:
+        _apply_owner_deltas(db, owner_deltas)
+
+
+def record_mutation_requested(db: Session, mutation_date: Optional[datetime]):
+    """Count a new pending transfer request (caller commits)"""
+    _apply(db, {
+        ("mutations.status", "pending"): [1, 0.0],
+        ("mutations.requested", month_bucket(mutation_date)): [1, 0.0],
+    })
+
+
+def record_mutations_decided(db: Session, status: str, decided: int, decided_at: datetime,
+                             transfers: Iterable[Tuple[str, str, float]] = ()):
+    """Count decided mutations and the (previous owner, new owner, area) transfers they applied"""
+    if not decided:
+        return
+    _apply(db, {
+        ("mutations.status", "pending"): [-decided, 0.0],
+        ("mutations.status", status): [decided, 0.0],
+        (f"mutations.{status}", month_bucket(decided_at)): [decided, 0.0],
+    })
+    owner_deltas = defaultdict(lambda: [0, 0.0])
+    for previous_owner_id, new_owner_id, area in transfers:
+        owner_deltas[previous_owner_id][0] -= 1
+        owner_deltas[previous_owner_id][1] -= area or 0.0
+        owner_deltas[new_owner_id][0] += 1
+        owner_deltas[new_owner_id][1] += area or 0.0
+    if owner_deltas:
+        _apply_owner_deltas(db, owner_deltas)
+
+
+def record_documents_uploaded(db: Session, document_types: Iterable[str], uploaded_at: datetime,
+                              first_for_parcel: bool):
+    """Count uploaded documents, and the parcel if these are its first (caller commits)"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for document_type in document_types:
+        deltas[("documents", "all")][0] += 1
+        deltas[("documents.type", document_type)][0] += 1
+        deltas[("documents.month", month_bucket(uploaded_at))][0] += 1
+    if first_for_parcel:
+        deltas[("parcels.documented", "all")][0] += 1
+    _apply(db, deltas)
+
+
+def read_metric(db: Session, metric: str) -> Dict[str, Tuple[int, float]]:
+    """Get every bucket of a metric as bucket -> (count, area)"""
+    return {
+        bucket: (count, area)
+        for bucket, count, area in db.query(
+            ReportAggregate.bucket, ReportAggregate.count, ReportAggregate.area_sqft
+        ).filter(ReportAggregate.metric == metric)
+    }
+
+
+def read_bucket(db: Session, metric: str, bucket: str) -> Tuple[int, float]:
+    """Get the (count, area) of one bucket, zero if it was never counted"""
+    row = db.query(ReportAggregate.count, ReportAggregate.area_sqft).filter(
+        ReportAggregate.metric == metric, ReportAggregate.bucket == bucket
+    ).first()
+    return (row[0], row[1]) if row else (0, 0.0)
+
+
+def rebuild_reports(db: Session):
+    """Recompute every aggregate from the source tables"""
+    db.query(ReportAggregate).delete(synchronize_session=False)
+    deltas = defaultdict(lambda: [0, 0.0])
+
+    def add(metric, bucket, count, area=0.0):
+        deltas[(metric, bucket)][0] += count
+        deltas[(metric, bucket)][1] += area or 0.0
+
+    month = func.strftime("%Y-%m", LandRecord.created_at)
+    for owner_id, count, area in db.query(
+        LandRecord.owner_id, func.count(), func.sum(LandRecord.area_sqft)
+    ).group_by(LandRecord.owner_id):
+        add("parcels", "all", count, area)
+        add("parcels.owner", owner_id, count, area)
+        add("owners", "all", 1)
+    for is_active, count, area in db.query(
+        LandRecord.is_active, func.count(), func.sum(LandRecord.area_sqft)
+    ).group_by(LandRecord.is_active):
+        add("parcels.status", "inactive" if is_active is False else "active", count, area)
+    for bucket, count, area in db.query(month, func.count(), func.sum(LandRecord.area_sqft)).group_by(month):
+        add("parcels.month", bucket, count, area)
+    add("parcels.documented", "all", db.query(func.count(func.distinct(Document.land_id))).scalar() or 0)
+
+    for status, count in db.query(MutationRecord.status, func.count()).group_by(MutationRecord.status):
+        add("mutations.status", status, count)
+    requested = func.strftime("%Y-%m", MutationRecord.mutation_date)
+    for bucket, count in db.query(requested, func.count()).group_by(requested):
+        add("mutations.requested", bucket, count)
+    decided = func.strftime("%Y-%m", func.coalesce(MutationRecord.decided_at, MutationRecord.mutation_date))
+    for status, bucket, count in db.query(MutationRecord.status, decided, func.count()).filter(
+        MutationRecord.status.in_(["approved", "rejected"])
+    ).group_by(MutationRecord.status, decided):
+        add(f"mutations.{status}", bucket, count)
+
+    uploaded = func.strftime("%Y-%m", Document.uploaded_at)
+    for document_type, bucket, count in db.query(
+        Document.document_type, uploaded, func.count()
+    ).group_by(Document.document_type, uploaded):
+        add("documents", "all", count)
+        add("documents.type", document_type, count)
+        add("documents.month", bucket, count)
+
+    _apply(db, deltas)
+    db.commit()
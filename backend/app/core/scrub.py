@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.models import Document
+from .storage import CHUNK_SIZE
+
+# A scrub pass re-hashes stored documents and compares them with
+# Document.file_hash. Documents are visited in id order, a batch at a time:
+# the distinct files of a batch are hashed across a process pool, mismatches
+# are reported, and the last id of the batch is checkpointed, so an
+# interrupted pass resumes where it stopped. Identical uploads share one
+# object, which is hashed once per batch.
+
+# Outcome of hashing one file: (digest or None, bytes read, error or None)
+HashResult = Tuple[Optional[str], int, Optional[str]]
+
+
+def hash_file(path: Optional[str], max_bytes_per_second: float = 0) -> HashResult:
+    """Hash a stored file, reading at most max_bytes_per_second (0 for no cap)
+
+    Runs in pool workers. Pages read are dropped from the page cache where the
+    platform allows, so a pass over a large store does not evict hot data.
+    """
+    if not path:
+        # A document row without a stored path
+        return None, 0, "missing"
+    sha256_hash = hashlib.sha256()
+    size = 0
+    started = time.monotonic()
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha256_hash.update(chunk)
+                size += len(chunk)
+                if max_bytes_per_second:
+                    ahead = size / max_bytes_per_second - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except FileNotFoundError:
+        return None, size, "missing"
+    except OSError as e:
+        return None, size, f"unreadable: {e.strerror or e}"
+    return sha256_hash.hexdigest(), size, None
+
+
+@dataclass
+class ScrubResult:
+    checked: int = 0
+    mismatched: int = 0
+    bytes_read: int = 0
+    checkpoint: Optional[str] = None
+
+
+def scrub_documents(
+    db: Session,
+    workers: Optional[int] = None,
+    max_bytes_per_second: float = 0,
+    start_after: Optional[str] = None,
+    batch_size: int = 1000,
+    on_mismatch: Optional[Callable[[dict], None]] = None,
+    on_checkpoint: Optional[Callable[[str], None]] = None,
+) -> ScrubResult:
+    """Verify stored documents against their recorded hashes
+
+    ``max_bytes_per_second`` caps the pass as a whole and is split evenly
+    between the workers. ``on_mismatch`` receives one dict per missing,
+    unreadable or altered document; ``on_checkpoint`` receives the id of the
+    last document of each finished batch, to pass back as ``start_after``.
+    """
+    workers = workers or os.cpu_count() or 1
+    per_worker_rate = max_bytes_per_second / workers if max_bytes_per_second else 0
+    result = ScrubResult(checkpoint=start_after)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            query = db.query(Document.id, Document.land_id, Document.file_path, Document.file_hash)
+            if result.checkpoint is not None:
+                query = query.filter(Document.id > result.checkpoint)
+            batch = query.order_by(Document.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            paths = list(dict.fromkeys(file_path for _, _, file_path, _ in batch))
+            chunksize = max(1, len(paths) // (workers * 4))
+            hashed: Dict[str, HashResult] = dict(zip(
+                paths, pool.map(hash_file, paths, [per_worker_rate] * len(paths), chunksize=chunksize)
+            ))
+            result.bytes_read += sum(size for _, size, _ in hashed.values())
+
+            for document_id, land_id, file_path, expected in batch:
+                actual, _, error = hashed[file_path]
+                result.checked += 1
+                if error is None and actual != expected:
+                    error = "hash mismatch"
+                if error is not None:
+                    result.mismatched += 1
+                    if on_mismatch:
+                        on_mismatch({
+                            "document_id": document_id,
+                            "land_id": land_id,
+                            "file_path": file_path,
+                            "expected_hash": expected,
+                            "actual_hash": actual,
+                            "error": error,
+                        })
+
+            result.checkpoint = batch[-1][0]
+            if on_checkpoint:
+                on_checkpoint(result.checkpoint)
+            # Release the read transaction between batches
+            db.rollback()
+    return result
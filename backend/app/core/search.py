@@ -0,0 +1,142 @@
+import re
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Parcel search runs on parcel_search, an FTS5 table using the trigram
+# tokenizer over survey number, address and owner name (migration 8). A
+# trigram index matches any substring of three or more characters, so a query
+# is first run as one phrase per word: every word must occur somewhere, which
+# covers prefixes and partial addresses. If that finds too little, parcels
+# sharing the most trigrams with the query are fetched by bm25 rank and
+# re-ranked by word similarity (as in PostgreSQL's pg_trgm: the overlap of
+# the trigram sets of the words padded with spaces), which tolerates
+# misspelled names. Only the query's rarest trigrams are used to fetch
+# candidates, looked up in the parcel_search_terms vocabulary, so common
+# ones like "000" or "roa" never make the index walk every parcel. bm25
+# scoring costs time per match, so a query matching more than
+# RANK_CANDIDATES parcels ranks only the first (oldest) RANK_CANDIDATES.
+
+MIN_TERM_LENGTH = 3
+FUZZY_CANDIDATES = 200
+FUZZY_POSTINGS_BUDGET = 20000
+FUZZY_MIN_SIMILARITY = 0.3
+RANK_CANDIDATES = 1000
+WORD_SEPARATORS = re.compile(r"[\s,;]+")
+# bm25 weights per column: land_id (not indexed), survey number, address, owner name
+RANK = "bm25(parcel_search, 0.0, 10.0, 4.0, 2.0)"
+
+MATCHES_SQL = """
+    FROM parcel_search JOIN land_records ON land_records.id = parcel_search.land_id
+    WHERE parcel_search MATCH :query {owner_filter}
+"""
+# rowid of the match past the ranking bound, if there is one
+BOUND_SQL = "SELECT parcel_search.rowid" + MATCHES_SQL + "ORDER BY parcel_search.rowid LIMIT 1 OFFSET :offset"
+SEARCH_SQL = f"""
+    SELECT land_records.id, land_records.survey_number, land_records.property_address,
+           land_records.area_sqft, land_records.owner_id, parcel_search.owner_name, {RANK} AS rank
+    {MATCHES_SQL} {{bound_filter}}
+    ORDER BY rank
+    LIMIT :limit
+"""
+
+
+def search_terms(query: str) -> List[str]:
+    """Split a query into the words long enough to be matched"""
+    return [term for term in WORD_SEPARATORS.split(query.lower()) if len(term) >= MIN_TERM_LENGTH]
+
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def word_similarity(left: str, right: str) -> float:
+    """Share of trigrams two words have in common, padded so short words compare well"""
+    left_grams, right_grams = trigrams(f"  {left} "), trigrams(f"  {right} ")
+    return len(left_grams & right_grams) / len(left_grams | right_grams)
+
+
+def _similarity(terms: List[str], row) -> float:
+    # Each query word is scored against its closest word in the parcel
+    words = [word for value in (row.survey_number, row.property_address, row.owner_name) if value
+             for word in WORD_SEPARATORS.split(value.lower()) if word]
+    if not words:
+        return 0.0
+    return sum(max(word_similarity(term, word) for word in words) for term in terms) / len(terms)
+
+
+def _rare_trigrams(db: Session, grams: Set[str]) -> List[str]:
+    """Pick the rarest indexed trigrams whose parcel counts fit the postings budget"""
+    counts: Dict[str, int] = {}
+    for gram in grams:
+        count = db.execute(text("SELECT doc FROM parcel_search_terms WHERE term = :term"), {"term": gram}).scalar()
+        if count:
+            counts[gram] = count
+    chosen, budget = [], FUZZY_POSTINGS_BUDGET
+    for gram in sorted(counts, key=counts.get):
+        if chosen and counts[gram] > budget:
+            break
+        chosen.append(gram)
+        budget -= counts[gram]
+    return chosen
+
+
+def _run(db: Session, match: str, limit: int, owner_id: Optional[str]) -> list:
+    owner_filter = "AND land_records.owner_id = :owner_id" if owner_id else ""
+    params = {"query": match, "limit": limit, "offset": RANK_CANDIDATES}
+    if owner_id:
+        params["owner_id"] = owner_id
+    bound = db.execute(text(BOUND_SQL.format(owner_filter=owner_filter)), params).scalar()
+    bound_filter = "AND parcel_search.rowid < :bound" if bound is not None else ""
+    params["bound"] = bound
+    sql = SEARCH_SQL.format(owner_filter=owner_filter, bound_filter=bound_filter)
+    return db.execute(text(sql), params).all()
+
+
+def _result(row, match: str, score: float) -> dict:
+    return {
+        "id": row.id,
+        "survey_number": row.survey_number,
+        "property_address": row.property_address,
+        "area_sqft": row.area_sqft,
+        "owner_id": row.owner_id,
+        "owner_name": row.owner_name,
+        "match": match,
+        "score": round(score, 4),
+    }
+
+
+def search_parcels(db: Session, query: str, limit: int = 20, owner_id: Optional[str] = None) -> List[dict]:
+    """Find parcels by partial or misspelled survey number, address or owner name
+
+    Exact matches come first, ranked by bm25, then fuzzy matches by trigram
+    similarity. Pass owner_id to search only that owner's parcels.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError(f"Search for at least one word of {MIN_TERM_LENGTH} or more characters")
+
+    results = [
+        _result(row, "exact", -row.rank)
+        for row in _run(db, " ".join(_phrase(term) for term in terms), limit, owner_id)
+    ]
+    if len(results) >= limit:
+        return results
+
+    grams = _rare_trigrams(db, set().union(*(trigrams(term) for term in terms)))
+    if not grams:
+        return results
+    seen = {result["id"] for result in results}
+    fuzzy = []
+    for row in _run(db, " OR ".join(_phrase(gram) for gram in grams), FUZZY_CANDIDATES, owner_id):
+        if row.id in seen:
+            continue
+        similarity = _similarity(terms, row)
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            fuzzy.append(_result(row, "fuzzy", similarity))
+    fuzzy.sort(key=lambda result: -result["score"])
+    return results + fuzzy[:limit - len(results)]
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from .config import settings
+
+UPLOAD_DIR = Path(settings.upload_dir)
+OBJECT_DIR = UPLOAD_DIR / "objects"
+MAX_UPLOAD_BYTES = settings.max_upload_bytes
+DOWNLOAD_ACCEL_PREFIX = settings.download_accel_prefix.rstrip("/")
+CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+def object_path(file_hash: str) -> Path:
+    """Get the content-addressed location of a stored file"""
+    return OBJECT_DIR / file_hash[:2] / file_hash[2:4] / file_hash
+
+
+def accel_redirect(path: Path) -> Optional[str]:
+    """Get the X-Accel-Redirect target for a stored file, if nginx is to send it
+
+    nginx serves it from an internal location aliased to the object store,
+    using sendfile and handling Range requests itself.
+    """
+    if not DOWNLOAD_ACCEL_PREFIX:
+        return None
+    try:
+        relative = Path(path).resolve().relative_to(OBJECT_DIR.resolve())
+    except ValueError:
+        return None
+    return f"{DOWNLOAD_ACCEL_PREFIX}/{relative.as_posix()}"
+
+
+def store_stream(source: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, Path, int]:
+    """Copy a file object into the object store, hashing it while it is written
+
+    Files are stored once per SHA-256 digest, so re-uploading an identical
+    document reuses the existing object. Blocking; run it in a worker thread
+    from async code. Returns the hex digest, the stored path and the size.
+    """
+    OBJECT_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=OBJECT_DIR, prefix=".upload-")
+    sha256_hash = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            source.seek(0)
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes} byte upload limit")
+                sha256_hash.update(chunk)
+                buffer.write(chunk)
+        file_hash = sha256_hash.hexdigest()
+        target = object_path(file_hash)
+        if target.exists():
+            # Identical content is already stored
+            os.unlink(temp_path)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return file_hash, target, size
@@ -0,0 +1,117 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session, aliased
+from ..models.models import Document, LandRecord, MutationRecord, User
+from .cache import TTLCache
+from .config import settings
+
+VERIFICATION_CACHE_SIZE = settings.verification_cache_size
+VERIFICATION_CACHE_TTL = settings.verification_cache_ttl
+
+# Read-through cache of verification answers keyed by (kind, key). Writes that
+# change an answer invalidate it in this process only; other workers keep
+# serving their cached answer for up to VERIFICATION_CACHE_TTL seconds.
+# Unknown keys are cached too, so repeated probes for a missing hash stay cheap.
+verification_cache = TTLCache(maxsize=VERIFICATION_CACHE_SIZE, ttl=VERIFICATION_CACHE_TTL)
+_NOT_FOUND = object()
+
+
+def invalidate(kind: str, keys: Iterable[str]):
+    """Drop cached answers after a write ("property", "document" or "transaction")"""
+    for key in keys:
+        verification_cache.pop((kind, key))
+
+
+def _properties(db: Session, survey_numbers: List[str]) -> Dict[str, dict]:
+    rows = db.query(LandRecord, User.full_name).outerjoin(User, User.id == LandRecord.owner_id) \
+        .filter(LandRecord.survey_number.in_(survey_numbers)).all()
+    pending = {land_id for (land_id,) in db.query(MutationRecord.land_id).filter(
+        MutationRecord.land_id.in_([record.id for record, _ in rows]),
+        MutationRecord.status == "pending",
+    )} if rows else set()
+    return {
+        record.survey_number: {
+            "id": record.id,
+            "survey_number": record.survey_number,
+            "property_address": record.property_address,
+            "area_sqft": record.area_sqft,
+            "geo_latitude": record.geo_latitude,
+            "geo_longitude": record.geo_longitude,
+            "owner_id": record.owner_id,
+            "owner_name": owner_name,
+            "document_hash": record.document_hash,
+            "created_at": record.created_at,
+            "updated_at": record.updated_at,
+            "status": "inactive" if record.is_active is False else "pending" if record.id in pending else "active",
+        }
+        for record, owner_name in rows
+    }
+
+
+def _documents(db: Session, file_hashes: List[str]) -> Dict[str, dict]:
+    # Identical content may be attached more than once; answer with the first upload
+    rows = db.query(Document).filter(Document.file_hash.in_(file_hashes)) \
+        .order_by(Document.uploaded_at, Document.id)
+    found = {}
+    for document in rows:
+        found.setdefault(document.file_hash, {
+            "id": document.id,
+            "document_type": document.document_type,
+            "file_name": document.file_name,
+            "file_hash": document.file_hash,
+            "land_id": document.land_id,
+            "uploaded_at": document.uploaded_at,
+        })
+    return found
+
+
+def _transactions(db: Session, transaction_ids: List[str]) -> Dict[str, dict]:
+    previous_owner = aliased(User)
+    new_owner = aliased(User)
+    rows = db.query(MutationRecord, previous_owner.full_name, new_owner.full_name) \
+        .outerjoin(previous_owner, previous_owner.id == MutationRecord.previous_owner_id) \
+        .outerjoin(new_owner, new_owner.id == MutationRecord.new_owner_id) \
+        .filter(MutationRecord.transaction_id.in_(transaction_ids))
+    return {
+        mutation.transaction_id: {
+            "id": mutation.id,
+            "transaction_id": mutation.transaction_id,
+            "land_id": mutation.land_id,
+            "previous_owner_id": mutation.previous_owner_id,
+            "previous_owner_name": previous_name,
+            "new_owner_id": mutation.new_owner_id,
+            "new_owner_name": new_name,
+            "mutation_date": mutation.mutation_date,
+            "mutation_reason": mutation.mutation_reason,
+            "status": mutation.status,
+            "decided_at": mutation.decided_at,
+            "verification_hash": mutation.verification_hash,
+        }
+        for mutation, previous_name, new_name in rows
+    }
+
+
+_LOADERS = {"property": _properties, "document": _documents, "transaction": _transactions}
+
+
+def lookup(db: Session, kind: str, keys: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """Verify many keys of one kind, querying the database once for all cache misses"""
+    answers = {}
+    misses = []
+    for key in dict.fromkeys(keys):
+        cached = verification_cache.get((kind, key))
+        if cached is None:
+            misses.append(key)
+        else:
+            answers[key] = None if cached is _NOT_FOUND else cached
+    if misses:
+        found = _LOADERS[kind](db, misses)
+        for key in misses:
+            answer = found.get(key)
+            verification_cache.set((kind, key), _NOT_FOUND if answer is None else answer)
+            answers[key] = answer
+    return answers
+
+
+def lookup_one(db: Session, kind: str, key: str) -> Optional[dict]:
+    """Verify a single key"""
+    return lookup(db, kind, [key])[key]
@@ -1,17 +1,130 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session, sessionmaker
+from ..core.config import settings
+from .writer import SerialWriter
 
-load_dotenv()
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./land_registration.db")
+# Route handlers are plain functions run in the server's worker thread pool,
+# which is sized to match this connection pool (see main.lifespan)
+DB_POOL_SIZE = settings.db_pool_size
+DB_MAX_OVERFLOW = settings.db_max_overflow
+DB_POOL_TIMEOUT = settings.db_pool_timeout
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite tuning. "production" mode reads through a pool of read-only
+# connections and funnels every write through one connection (see writer.py);
+# "simple" mode uses a single pool for both.
+DB_MODE = settings.db_mode
+SQLITE_BUSY_TIMEOUT_MS = settings.sqlite_busy_timeout_ms
+SQLITE_SYNCHRONOUS = settings.sqlite_synchronous
+SQLITE_CACHE_MB = settings.sqlite_cache_mb
+SQLITE_MMAP_MB = settings.sqlite_mmap_mb
+# A batch of writes is committed once nobody else is waiting to write, it
+# holds GROUP_COMMIT_MAX transactions, or its oldest has waited this long
+GROUP_COMMIT_WINDOW_MS = settings.group_commit_window_ms
+GROUP_COMMIT_MAX = settings.group_commit_max
+
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+in_memory = is_sqlite and SQLALCHEMY_DATABASE_URL.rstrip("/").endswith((":memory:", "sqlite:"))
+
+def _sqlite_pragmas(read_only: bool):
+    def configure(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return configure
+
+def _create_engine(**pool_args):
+    if not is_sqlite:
+        return create_engine(SQLALCHEMY_DATABASE_URL, pool_timeout=DB_POOL_TIMEOUT, **pool_args)
+    return create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_timeout=DB_POOL_TIMEOUT,
+        **pool_args,
+    )
+
+production_mode = DB_MODE == "production" and is_sqlite and not in_memory
+
+if production_mode:
+    # The write pool only serves the shared writer connection and schema changes
+    engine = _create_engine(pool_size=1, max_overflow=1)
+    read_engine = _create_engine(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    event.listen(engine, "connect", _sqlite_pragmas(read_only=False))
+    event.listen(read_engine, "connect", _sqlite_pragmas(read_only=True))
+
+    @event.listens_for(engine, "connect")
+    def _manual_transactions(dbapi_connection, _):
+        # Let SQLAlchemy emit BEGIN and SAVEPOINT itself instead of pysqlite
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        # The shared writer takes the write lock up front so it never fails upgrading to it
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.info.get("serial_writer") else "BEGIN")
+
+    writer = SerialWriter(engine, GROUP_COMMIT_WINDOW_MS / 1000, GROUP_COMMIT_MAX, DB_POOL_TIMEOUT)
+else:
+    engine = _create_engine(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    read_engine = engine
+    if is_sqlite:
+        event.listen(engine, "connect", _sqlite_pragmas(read_only=False))
+    writer = None
+
+class RoutingSession(Session):
+    """Session that reads from the read pool until it first writes
+
+    From its first write until it commits or rolls back, every statement
+    (reads included) runs in the session's savepoint on the shared writer.
+    Commit returns once the write is durable.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._writing or self._flushing or getattr(clause, "is_dml", False):
+            self._writing = True
+            return writer.acquire(self)
+        return read_engine
+
+    def _release_writer(self, committed: bool):
+        if self._writing:
+            self._writing = False
+            writer.release(self, committed)
+
+    def commit(self):
+        # On failure the savepoint stays open until rollback() or close()
+        super().commit()
+        self._release_writer(committed=True)
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._release_writer(committed=False)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_writer(committed=False)
+
+if production_mode:
+    SessionLocal = sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False, join_transaction_mode="create_savepoint"
+    )
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -21,4 +134,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def increment(db, model, key: dict, deltas: dict):
+    """Add deltas to the counter row identified by key, creating the row if needed"""
+    table = model.__table__
+    stmt = update(table).where(*[table.c[name] == value for name, value in key.items()]).values(
+        {name: table.c[name] + value for name, value in deltas.items()}
+    )
+    if db.execute(stmt).rowcount == 0:
+        db.execute(insert(table).values(**key, **deltas))
@@ -0,0 +1,149 @@
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy.exc import TimeoutError as WriterTimeout
+
+
+class GroupCommitFailed(Exception):
+    """The COMMIT that was to make a batch of transactions durable failed"""
+
+
+class _Ticket:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+
+class SerialWriter:
+    """A single write connection that sessions take turns on, with group commit
+
+    The connection keeps one transaction open. A session that writes holds
+    the connection exclusively and works in its own savepoint; committing
+    releases the savepoint and hands the connection on. One COMMIT then makes
+    the whole batch of released savepoints durable, once nobody is waiting
+    to write, the batch is full or its oldest member has waited ``window``
+    seconds. Each session's commit returns only after that COMMIT.
+    """
+
+    def __init__(self, engine, window: float, max_batch: int, timeout: float):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = None
+        self._waiting = 0
+        self._flush_requested = False
+        self._connection = None
+        self._transaction = None
+        self._batch: List[_Ticket] = []
+        self._batch_started = 0.0
+
+    def acquire(self, session):
+        """Wait for the write connection, opening the shared transaction if needed"""
+        with self._cond:
+            if self._owner is session:
+                return self._connection
+            self._waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                # Newcomers also wait while an overdue batch is being committed
+                while self._owner is not None or self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise WriterTimeout(f"Timed out after {self.timeout:g}s waiting for the database writer")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._owner = session
+
+        try:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+                self._connection.info["serial_writer"] = True
+            if self._transaction is None:
+                self._transaction = self._connection.begin()
+        except Exception:
+            self._discard_connection()
+            with self._cond:
+                self._owner = None
+                self._cond.notify_all()
+            raise
+        return self._connection
+
+    def release(self, session, committed: bool):
+        """Hand the connection back, waiting for durability if the session committed
+
+        The savepoint must already be released (committed) or rolled back.
+        """
+        with self._cond:
+            if self._owner is not session:
+                return
+            self._owner = None
+            self._cond.notify_all()
+            if not committed:
+                if not self._batch and not self._waiting:
+                    # Nothing to make durable; end the transaction so other processes can write
+                    self._flush()
+                return
+
+            ticket = _Ticket()
+            if not self._batch:
+                self._batch_started = time.monotonic()
+            self._batch.append(ticket)
+            while not ticket.done:
+                overdue = time.monotonic() - self._batch_started >= self.window
+                if self._owner is None and (not self._waiting or overdue or len(self._batch) >= self.max_batch):
+                    self._flush()
+                elif overdue:
+                    self._flush_requested = True
+                    self._cond.wait()
+                else:
+                    self._cond.wait(self._batch_started + self.window - time.monotonic())
+
+        if ticket.error is not None:
+            raise GroupCommitFailed("Could not commit the transaction batch") from ticket.error
+
+    def _flush(self):
+        # Called holding the condition; the COMMIT itself runs without it
+        batch, self._batch = self._batch, []
+        transaction, self._transaction = self._transaction, None
+        self._owner = self
+        self._cond.release()
+        error = None
+        try:
+            if transaction is not None:
+                transaction.commit()
+        except Exception as e:
+            error = e
+            self._discard_connection()
+        finally:
+            self._cond.acquire()
+        for ticket in batch:
+            ticket.done = True
+            ticket.error = error
+        # Requests made while committing are settled too; later batches ask again
+        self._flush_requested = False
+        self._owner = None
+        self._cond.notify_all()
+
+    def _discard_connection(self):
+        connection, self._connection = self._connection, None
+        self._transaction = None
+        if connection is not None:
+            try:
+                connection.invalidate()
+            except Exception:
+                pass
+
+    def close(self):
+        """Commit anything pending and close the write connection"""
+        with self._cond:
+            while self._owner is not None:
+                self._cond.wait()
+            self._flush()
+            connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
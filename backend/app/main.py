@@ -1,17 +1,41 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi.middleware.cors import CORSMiddleware
-from .api import auth, land_records, mutations
-from .db.database import engine
-from .models.models import Base
+from .api import auth, duplicates, exports, land_records, monitoring, mutations, reports, verification
+from .core import events
+from .core.compression import CompressionMiddleware
+from .core.http_cache import ETagMiddleware
+from .core.metrics import MetricsMiddleware, install_sql_hooks
+from .core.projection import FastJSONResponse
+from .db.database import DB_MAX_OVERFLOW, DB_POOL_SIZE, engine, read_engine, writer
+from .db.migrations import check_schema
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `manage.py migrate`, not by every worker
+check_schema(engine)
+for bind in {engine, read_engine}:
+    install_sql_hooks(bind)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database work runs in worker threads; allow one per pooled connection
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    yield
+    await events.hub.stop()
+    if writer is not None:
+        writer.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="Digital Land Records API",
     description="API for managing digital land records with tamper-proof verification",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -30,12 +54,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "X-Export-Watermark"],
 )
+# Conditional GET inside compression, so ETags are computed on the identity body
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Outermost, so latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    # A versioned row changed between read and write (optimistic concurrency)
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "The record was modified by another request; reload and retry"},
+    )
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    # A concurrent write won a unique constraint, e.g. two appends to one ledger chain
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Conflicting concurrent update; reload and retry"},
+    )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(land_records.router)
 app.include_router(mutations.router)
+app.include_router(reports.router)
+app.include_router(verification.router)
+app.include_router(duplicates.router)
+app.include_router(exports.router)
+app.include_router(monitoring.router)
 
 @app.get("/")
 async def root():
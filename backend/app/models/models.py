@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, Integer, BigInteger, LargeBinary, Index, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,6 +17,7 @@ class User(Base):
     aadhaar_number = Column(String, unique=True, index=True)  # For KYC verification
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    access_version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped when access changes
     created_at = Column(DateTime, default=datetime.now)
     
     land_records = relationship("LandRecord", back_populates="owner")
@@ -33,13 +34,25 @@ class LandRecord(Base):
     document_hash = Column(String, nullable=True)  # For tamper-proof verification
     geo_latitude = Column(Float, nullable=True)    # For geospatial mapping
     geo_longitude = Column(Float, nullable=True)   # For geospatial mapping
+    geo_cell = Column(BigInteger, nullable=True, index=True)  # Map grid cell, see core.geo
+    boundary = Column(LargeBinary, nullable=True)  # WKB polygon, see core.boundaries
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Optimistic concurrency
     
     owner = relationship("User", back_populates="land_records")
     mutations = relationship("MutationRecord", back_populates="land_record")
     documents = relationship("Document", back_populates="land_record")
+    
+    # Keyset pagination indexes for the record listings
+    __table_args__ = (
+        Index("ix_land_records_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_land_records_owner_updated", "owner_id", "updated_at", "id"),
+        Index("ix_land_records_created", "created_at", "id"),
+        Index("ix_land_records_updated", "updated_at", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 
 class MutationRecord(Base):
@@ -54,10 +67,39 @@ class MutationRecord(Base):
     transaction_id = Column(String, unique=True)
     status = Column(String, default="pending")  # pending, approved, rejected
     verification_hash = Column(String, nullable=True)  # For tamper-proof verification
+    decided_at = Column(DateTime, nullable=True)  # When approved or rejected
     
     land_record = relationship("LandRecord", back_populates="mutations")
     previous_owner = relationship("User", foreign_keys=[previous_owner_id])
     new_owner = relationship("User", foreign_keys=[new_owner_id])
+    
+    # Keyset pagination indexes for the mutation listings
+    __table_args__ = (
+        Index("ix_mutation_records_date", "mutation_date", "id"),
+        Index("ix_mutation_records_status_date", "status", "mutation_date", "id"),
+        Index("ix_mutation_records_previous_owner_date", "previous_owner_id", "mutation_date", "id"),
+        Index("ix_mutation_records_new_owner_date", "new_owner_id", "mutation_date", "id"),
+        Index("ix_mutation_records_land_date", "land_id", "mutation_date", "id"),
+        Index("ix_mutation_records_decided", "decided_at", "id"),
+    )
+
+
+class OwnershipInterval(Base):
+    __tablename__ = "ownership_intervals"
+    
+    # Who owned each parcel when: [valid_from, valid_to), kept in step with
+    # land_records.owner_id by triggers (see db/migrations.py)
+    id = Column(Integer, primary_key=True)
+    land_id = Column(String, ForeignKey("land_records.id"), nullable=False)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime, nullable=True)  # None for the current owner
+    
+    __table_args__ = (
+        Index("ix_ownership_intervals_land_from", "land_id", "valid_from"),
+        Index("ix_ownership_intervals_owner_from", "owner_id", "valid_from", "valid_to", "land_id"),
+        Index("uq_ownership_intervals_current", "land_id", unique=True, sqlite_where=text("valid_to IS NULL")),
+    )
 
 
 class Document(Base):
@@ -68,7 +110,126 @@ class Document(Base):
     document_type = Column(String)  # deed, survey, tax receipt, etc.
     file_path = Column(String)
     file_name = Column(String)
-    file_hash = Column(String)  # For tamper-proof verification
+    file_hash = Column(String, index=True)  # For tamper-proof verification
     uploaded_at = Column(DateTime, default=datetime.now)
     
-    land_record = relationship("LandRecord", back_populates="documents")
\ No newline at end of file
+    land_record = relationship("LandRecord", back_populates="documents")
+    
+    __table_args__ = (
+        Index("ix_documents_uploaded", "uploaded_at", "id"),
+    )
+
+
+class ParcelCluster(Base):
+    __tablename__ = "parcel_clusters"
+    
+    # Running parcel count and coordinate sums per map grid cell (see core.geo)
+    zoom = Column(Integer, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    parcel_count = Column(Integer, default=0)
+    lat_sum = Column(Float, default=0.0)
+    lon_sum = Column(Float, default=0.0)
+
+
+class ReportAggregate(Base):
+    __tablename__ = "report_aggregates"
+    
+    # Incrementally maintained dashboard counters (see core.reports)
+    metric = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+    area_sqft = Column(Float, default=0.0)
+
+
+class LedgerEntry(Base):
+    __tablename__ = "ledger_entries"
+    
+    # Append-only, per-parcel hash chain of decided mutations and documents (see core.ledger)
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    land_id = Column(String, ForeignKey("land_records.id"))
+    entry_type = Column(String)  # mutation, document
+    ref_id = Column(String, index=True)  # Mutation or document id
+    payload_hash = Column(String)
+    prev_hash = Column(String)  # entry_hash of the parcel's previous entry, "" for the first
+    entry_hash = Column(String, unique=True, index=True)
+    seal_id = Column(Integer, ForeignKey("ledger_seals.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        UniqueConstraint("land_id", "prev_hash", name="uq_ledger_entries_chain"),
+        Index("ix_ledger_entries_land_seq", "land_id", "seq"),
+    )
+
+
+class LedgerSeal(Base):
+    __tablename__ = "ledger_seals"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    first_seq = Column(Integer)
+    last_seq = Column(Integer)
+    leaf_count = Column(Integer)
+    merkle_root = Column(String)
+    prev_root = Column(String)  # Root of the previous seal, "" for the first
+    sealed_at = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        # Two processes sealing the same entries at once cannot both succeed
+        Index("uq_ledger_seals_first_seq", "first_seq", unique=True),
+    )
+
+
+class LedgerNode(Base):
+    __tablename__ = "ledger_nodes"
+    
+    # Merkle tree nodes of a seal; level 0 holds the leaf hashes of its entries
+    seal_id = Column(Integer, ForeignKey("ledger_seals.id"), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    hash = Column(String)
+
+class DuplicateBucket(Base):
+    __tablename__ = "duplicate_buckets"
+    
+    # MinHash LSH band buckets of parcel and user signatures (see core.duplicates)
+    kind = Column(String, primary_key=True)  # parcel, user
+    bucket = Column(BigInteger, primary_key=True)  # Hash of the band number, blocking key and band values
+    entity_id = Column(String, primary_key=True)
+    
+    # Rows are only ever looked up by bucket, so the primary key is the table
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class DuplicateCandidate(Base):
+    __tablename__ = "duplicate_candidates"
+    
+    # Review queue of likely duplicate parcels or users (see core.duplicates)
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String)  # parcel, user
+    first_id = Column(String)  # The pair's smaller id
+    second_id = Column(String)
+    similarity = Column(Float)
+    status = Column(String, default="pending")  # pending, confirmed, dismissed
+    detected_at = Column(DateTime, default=datetime.now)
+    reviewed_by = Column(String, ForeignKey("users.id"), nullable=True)
+    reviewed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("kind", "first_id", "second_id", name="uq_duplicate_candidates_pair"),
+        Index("ix_duplicate_candidates_status_detected", "status", "detected_at", "id"),
+        Index("ix_duplicate_candidates_detected", "detected_at", "id"),
+    )
+
+
+class MutationEvent(Base):
+    __tablename__ = "mutation_events"
+    
+    # Recent mutation changes, streamed to the parties and admins (see core.events)
+    seq = Column(Integer, primary_key=True)  # Event id; never reused
+    event_type = Column(String)  # created, approved, rejected
+    mutation_id = Column(String)
+    audience = Column(String)  # Space-separated ids of the users involved
+    payload = Column(String)  # The mutation's new state as JSON
+    created_at = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Literal, Tuple
 from datetime import datetime
 
 # User schemas
@@ -20,6 +20,10 @@ class UserResponse(UserBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class UserAccessUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
@@ -37,7 +41,8 @@ class LandRecordBase(BaseModel):
     geo_longitude: Optional[float] = None
 
 class LandRecordCreate(LandRecordBase):
-    pass
+    # Boundary ring of [longitude, latitude] positions, as in a GeoJSON polygon
+    boundary: Optional[List[Tuple[float, float]]] = Field(None, max_length=1000)
 
 class LandRecordResponse(LandRecordBase):
     id: str
@@ -48,6 +53,26 @@ class LandRecordResponse(LandRecordBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    checkpoint: int  # Pass back as start_row to resume after this row
+    errors: List[ImportRowError]
+
+class LandRecordSearchResult(BaseModel):
+    id: str
+    survey_number: str
+    property_address: str
+    area_sqft: float
+    owner_id: str
+    owner_name: Optional[str] = None
+    match: Literal["exact", "fuzzy"]
+    score: float
+
 # Mutation schemas
 class MutationCreate(BaseModel):
     land_id: str
@@ -63,9 +88,26 @@ class MutationResponse(BaseModel):
     mutation_reason: str
     transaction_id: str
     status: str
+    verification_hash: Optional[str] = None  # Ledger entry hash once decided
     
     model_config = ConfigDict(from_attributes=True)
 
+class MutationBatchDecision(BaseModel):
+    action: Literal["approve", "reject"]
+    mutation_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class MutationDecisionResult(BaseModel):
+    mutation_id: str
+    outcome: str  # approved, rejected, conflict, not_found, invalid
+    detail: Optional[str] = None
+
+class MutationBatchResult(BaseModel):
+    results: List[MutationDecisionResult]
+    approved: int
+    rejected: int
+    conflicts: int
+    failed: int
+
 # Document schemas
 class DocumentCreate(BaseModel):
     land_id: str
@@ -79,4 +121,46 @@ class DocumentResponse(BaseModel):
     file_hash: str
     uploaded_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class OwnerSummary(BaseModel):
+    id: str
+    username: str
+    full_name: str
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class MutationHistoryEntry(MutationResponse):
+    decided_at: Optional[datetime] = None
+    previous_owner: Optional[OwnerSummary] = None
+    new_owner: Optional[OwnerSummary] = None
+
+class LandRecordDetail(LandRecordResponse):
+    is_active: bool
+    owner: Optional[OwnerSummary] = None
+    owner_since: datetime  # Last approved transfer to the owner, else registration
+    documents: List[DocumentResponse]
+    mutations: List[MutationHistoryEntry]  # Title chain, oldest first
+
+# Duplicate review schemas
+class DuplicateCandidateResponse(BaseModel):
+    id: str
+    kind: Literal["parcel", "user"]
+    first_id: str
+    second_id: str
+    similarity: float
+    status: str
+    detected_at: datetime
+    reviewed_by: Optional[str] = None
+    reviewed_at: Optional[datetime] = None
+    first: Optional[dict] = None  # Summary of each record, None if it was removed
+    second: Optional[dict] = None
+
+class DuplicateReview(BaseModel):
+    status: Literal["confirmed", "dismissed"]
+
+# Verification schemas
+class VerificationBatchRequest(BaseModel):
+    survey_numbers: List[str] = Field(default_factory=list, max_length=500)
+    document_hashes: List[str] = Field(default_factory=list, max_length=500)
+    transaction_ids: List[str] = Field(default_factory=list, max_length=500)
\ No newline at end of file
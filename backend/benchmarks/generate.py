@@ -0,0 +1,247 @@
+"""Generate a seeded synthetic land registry into a SQLite file.
+
+Usage: python -m benchmarks.generate [--preset small|medium|large] [--seed N] [--out PATH]
+
+The same preset and seed always produce the same registry. Documents point
+at a small set of shared blobs written next to the database, so the file
+store stays small while every document row still verifies.
+"""
+import argparse
+import hashlib
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.geo import cell_key, cluster_deltas
+from app.core.reports import rebuild_reports
+from app.core.security import hash_password
+from app.db.migrations import migrate
+from app.models.models import Document, LandRecord, MutationRecord, ParcelCluster, User
+
+PRESETS = {
+    "small": {"users": 1_000, "parcels": 10_000, "mutations": 50_000, "documents": 50_000},
+    "medium": {"users": 10_000, "parcels": 100_000, "mutations": 500_000, "documents": 500_000},
+    "large": {"users": 100_000, "parcels": 1_000_000, "mutations": 5_000_000, "documents": 5_000_000},
+}
+# Every generated account, including the administrators, has this password
+PASSWORD = "benchmark"
+ADMINS = 5
+BLOBS = 64
+CHUNK = 10_000
+PENDING_SHARE = 0.05
+REJECTED_SHARE = 0.05
+DOCUMENT_TYPES = ["sale_deed", "survey_map", "tax_receipt", "mutation_order", "encumbrance_certificate"]
+MUTATION_REASONS = ["sale", "inheritance", "gift", "partition", "court_order"]
+
+# Parcels are spread over a few districts so map viewports have realistic density
+DISTRICTS = [
+    (28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (22.57, 88.36),
+    (13.08, 80.27), (17.39, 78.49), (23.02, 72.57), (26.91, 75.79),
+]
+DISTRICT_SPREAD = 0.25
+EPOCH = datetime(2022, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def default_path(preset: str, seed: int) -> Path:
+    return Path(__file__).resolve().parent / "data" / f"registry-{preset}-{seed}.db"
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _moment(rng: random.Random, after: datetime = EPOCH) -> datetime:
+    remaining = max(1, int((EPOCH + timedelta(seconds=SPAN_SECONDS) - after).total_seconds()))
+    return after + timedelta(seconds=rng.randrange(remaining))
+
+
+def _insert(conn, model, rows: list):
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(insert(model.__table__), rows[start:start + CHUNK])
+
+
+def _write_blobs(root: Path, rng: random.Random) -> list:
+    """Write the shared document blobs in the object store layout and return (hash, path) pairs"""
+    blobs = []
+    for _ in range(BLOBS):
+        content = rng.randbytes(rng.randrange(2_000, 200_000))
+        file_hash = hashlib.sha256(content).hexdigest()
+        relative = Path("uploads") / "objects" / file_hash[:2] / file_hash[2:4] / file_hash
+        target = root / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        blobs.append((file_hash, str(relative)))
+    return blobs
+
+
+def generate(path: Path, users: int, parcels: int, mutations: int, documents: int, seed: int):
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def fast_bulk_load(dbapi_connection, _):
+        # Nothing to recover if generation dies halfway; just run it again
+        dbapi_connection.execute("PRAGMA journal_mode=OFF")
+        dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+    migrate(engine)
+    password_hash = hash_password(PASSWORD)
+    started = time.monotonic()
+
+    def progress(step: str):
+        print(f"[{time.monotonic() - started:7.1f}s] {step}", flush=True)
+
+    with engine.begin() as conn:
+        user_ids = [_uuid(rng) for _ in range(users)]
+        _insert(conn, User, [
+            {
+                "id": user_id,
+                "username": f"admin{i}" if i < ADMINS else f"user{i}",
+                "email": f"user{i}@example.test",
+                "full_name": f"Benchmark User {i}",
+                "hashed_password": password_hash,
+                "aadhaar_number": f"{100000000000 + i}",
+                "is_active": True,
+                "is_admin": i < ADMINS,
+                "created_at": _moment(rng),
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+        progress(f"{users} users")
+
+        # Parcels are written a chunk at a time together with their mutations,
+        # which decide the current owner, and their documents
+        blobs = _write_blobs(path.parent, rng)
+        mutation_counts = [0] * parcels
+        for _ in range(mutations):
+            mutation_counts[rng.randrange(parcels)] += 1
+        document_counts = [0] * parcels
+        for _ in range(documents):
+            document_counts[rng.randrange(parcels)] += 1
+
+        clusters = defaultdict(lambda: [0, 0.0, 0.0])
+        totals = defaultdict(int)
+        for chunk_start in range(0, parcels, CHUNK):
+            parcel_rows, mutation_rows, document_rows = [], [], []
+            for parcel in range(chunk_start, min(parcels, chunk_start + CHUNK)):
+                parcel_id = _uuid(rng)
+                owner_id = rng.choice(user_ids)
+                created_at = _moment(rng)
+                moment = created_at
+                for n in range(mutation_counts[parcel]):
+                    moment = _moment(rng, moment)
+                    new_owner_id = rng.choice(user_ids)
+                    roll = rng.random()
+                    # Only a parcel's latest transfer can still be pending
+                    if n == mutation_counts[parcel] - 1 and roll < PENDING_SHARE:
+                        status, decided_at = "pending", None
+                    else:
+                        status = "rejected" if roll < PENDING_SHARE + REJECTED_SHARE else "approved"
+                        decided_at = moment + timedelta(days=rng.randrange(1, 30))
+                    mutation_rows.append({
+                        "id": _uuid(rng),
+                        "land_id": parcel_id,
+                        "previous_owner_id": owner_id,
+                        "new_owner_id": new_owner_id,
+                        "mutation_date": moment,
+                        "mutation_reason": rng.choice(MUTATION_REASONS),
+                        "transaction_id": _uuid(rng),
+                        "status": status,
+                        "decided_at": decided_at,
+                    })
+                    totals[status] += 1
+                    if status == "approved":
+                        owner_id = new_owner_id
+                        moment = decided_at
+
+                document_hash = None
+                uploaded_at = created_at
+                for _ in range(document_counts[parcel]):
+                    file_hash, file_path = rng.choice(blobs)
+                    uploaded_at = _moment(rng, uploaded_at)
+                    document_rows.append({
+                        "id": _uuid(rng),
+                        "land_id": parcel_id,
+                        "document_type": rng.choice(DOCUMENT_TYPES),
+                        "file_path": file_path,
+                        "file_name": f"{file_hash[:12]}.pdf",
+                        "file_hash": file_hash,
+                        "uploaded_at": uploaded_at,
+                    })
+                    document_hash = file_hash
+
+                center_lat, center_lon = DISTRICTS[parcel % len(DISTRICTS)]
+                lat = center_lat + rng.uniform(-DISTRICT_SPREAD, DISTRICT_SPREAD)
+                lon = center_lon + rng.uniform(-DISTRICT_SPREAD, DISTRICT_SPREAD)
+                parcel_rows.append({
+                    "id": parcel_id,
+                    "owner_id": owner_id,
+                    "property_address": f"Plot {parcel}, Ward {parcel % 97}, District {parcel % len(DISTRICTS)}",
+                    "area_sqft": round(rng.uniform(400, 20_000), 1),
+                    "survey_number": f"SN-{parcel:08d}",
+                    "document_hash": document_hash,
+                    "geo_latitude": lat,
+                    "geo_longitude": lon,
+                    "geo_cell": cell_key(lat, lon),
+                    "is_active": True,
+                    "created_at": created_at,
+                    "updated_at": max(created_at, moment),
+                    "version": 1,
+                })
+
+            _insert(conn, LandRecord, parcel_rows)
+            _insert(conn, MutationRecord, mutation_rows)
+            _insert(conn, Document, document_rows)
+            for cell, (count, lat_sum, lon_sum) in cluster_deltas(
+                (row["geo_latitude"], row["geo_longitude"]) for row in parcel_rows
+            ).items():
+                total = clusters[cell]
+                total[0] += count
+                total[1] += lat_sum
+                total[2] += lon_sum
+            progress(f"{chunk_start + len(parcel_rows)}/{parcels} parcels")
+
+        _insert(conn, ParcelCluster, [
+            {"zoom": level, "cell_x": x, "cell_y": y, "parcel_count": count, "lat_sum": lat_sum, "lon_sum": lon_sum}
+            for (level, x, y), (count, lat_sum, lon_sum) in clusters.items()
+        ])
+        progress(f"{mutations} mutations ({totals['pending']} pending), {documents} documents, {len(clusters)} map clusters")
+
+    with Session(engine) as db:
+        rebuild_reports(db)
+    progress("report aggregates")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    progress(f"wrote {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="defaults to benchmarks/data/registry-<preset>-<seed>.db")
+    for name in ("users", "parcels", "mutations", "documents"):
+        parser.add_argument(f"--{name}", type=int, help=f"override the preset's number of {name}")
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    generate(args.out or default_path(args.preset, args.seed), seed=args.seed, **sizes)
+
+
+if __name__ == "__main__":
+    main()
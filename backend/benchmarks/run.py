@@ -0,0 +1,383 @@
+"""Drive the API in-process with a realistic request mix and report latency.
+
+Usage: python -m benchmarks.run DB [--mix registry] [--requests N] [--concurrency N]
+                                   [--save-baseline PATH] [--baseline PATH]
+
+DB is a registry written by benchmarks.generate. It is copied to a scratch
+directory first, so writes made by the run never change it and every run
+starts from the same state. Requests go through an ASGI client, so the
+numbers cover routing, middleware, validation, the database and
+serialization but not the network.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Scenario weights per mix
+MIXES = {
+    "registry": {
+        "login": 2, "map": 25, "list": 12, "detail": 20, "verify": 22,
+        "upload": 5, "approve": 6, "reports": 3, "mutations": 5,
+    },
+    "read": {"map": 30, "list": 15, "detail": 25, "verify": 25, "reports": 5},
+    "write": {"upload": 40, "approve": 40, "detail": 20},
+    "verify": {"verify": 100},
+}
+SAMPLE_PARCELS = 5000
+SAMPLE_KEYS = 5000
+QUERY_HEADER = "x-benchmark-queries"
+
+request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def prepare_workdir(db_path: Path) -> Path:
+    """Copy the registry and its blob store to a scratch directory and enter it"""
+    workdir = Path(tempfile.mkdtemp(prefix="land-bench-"))
+    shutil.copy(db_path, workdir / "registry.db")
+    uploads = db_path.parent / "uploads"
+    if uploads.exists():
+        shutil.copytree(uploads, workdir / "uploads")
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'registry.db'}"
+    os.environ["UPLOAD_DIR"] = "uploads"
+    return workdir
+
+
+def _sample_column(con, table: str, column: str, rng: random.Random) -> list:
+    max_rowid = con.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0] or 0
+    rowids = sorted({rng.randint(1, max_rowid) for _ in range(SAMPLE_KEYS)}) if max_rowid else []
+    return [row[0] for row in con.execute(
+        f"SELECT {column} FROM {table} WHERE rowid IN ({','.join('?' * len(rowids))}) ORDER BY rowid", rowids
+    )] if rowids else []
+
+
+def load_fixtures(rng: random.Random) -> SimpleNamespace:
+    """Sample the parcels, owners and verification keys the scenarios draw from"""
+    con = sqlite3.connect("registry.db")
+    max_rowid = con.execute("SELECT max(rowid) FROM land_records").fetchone()[0] or 0
+    rowids = sorted({rng.randint(1, max_rowid) for _ in range(SAMPLE_PARCELS)}) if max_rowid else []
+    parcels = con.execute(
+        f"SELECT id, survey_number, owner_id, geo_latitude, geo_longitude FROM land_records "
+        f"WHERE rowid IN ({','.join('?' * len(rowids))}) ORDER BY rowid", rowids
+    ).fetchall() if rowids else []
+    owner_ids = sorted({owner_id for _, _, owner_id, _, _ in parcels})
+    users = {
+        user_id: (username, bool(is_admin))
+        for user_id, username, is_admin in con.execute(
+            f"SELECT id, username, is_admin FROM users WHERE id IN ({','.join('?' * len(owner_ids))})", owner_ids
+        )
+    } if owner_ids else {}
+    admins = con.execute("SELECT id, username FROM users WHERE is_admin = 1 ORDER BY username").fetchall()
+    fixtures = SimpleNamespace(
+        parcels=[parcel for parcel in parcels if parcel[2] in users],
+        users=users,
+        admins=admins,
+        usernames=[username for username, _ in users.values()],
+        document_hashes=[row[0] for row in con.execute(
+            "SELECT DISTINCT file_hash FROM documents LIMIT ?", (SAMPLE_KEYS,))],
+        transaction_ids=_sample_column(con, "mutation_records", "transaction_id", rng),
+        pending=[row[0] for row in con.execute(
+            "SELECT id FROM mutation_records WHERE status = 'pending' ORDER BY id")],
+    )
+    con.close()
+    if not fixtures.parcels or not fixtures.admins:
+        sys.exit("The registry has no parcels or no administrators; generate it with benchmarks.generate")
+    rng.shuffle(fixtures.pending)
+    return fixtures
+
+
+def build_tokens(fixtures) -> dict:
+    """Issue tokens for the sampled owners and administrators (after migrations)"""
+    from app.api.auth import principal_claims
+    from app.core.security import create_access_token
+    from app.db.database import SessionLocal
+    from app.models.models import User
+    user_ids = [*fixtures.users, *(user_id for user_id, _ in fixtures.admins)]
+    db = SessionLocal()
+    try:
+        # Real rows, so the claims carry everything the app checks them against
+        return {
+            user.id: {"Authorization": f"Bearer {create_access_token(principal_claims(user))}"}
+            for user in db.query(User).filter(User.id.in_(user_ids))
+        }
+    finally:
+        db.close()
+
+
+# Scenarios: each sends one request and returns the response
+
+async def scenario_login(client, fixtures, tokens, rng):
+    from benchmarks.generate import PASSWORD
+    return await client.post("/token", data={"username": rng.choice(fixtures.usernames), "password": PASSWORD})
+
+
+async def scenario_map(client, fixtures, tokens, rng):
+    _, _, owner_id, lat, lon = rng.choice(fixtures.parcels)
+    if rng.random() < 0.5:
+        # Registry-wide view for an administrator, served from clusters
+        span, zoom, headers = 0.5, rng.choice([9, 11, 13]), tokens[rng.choice(fixtures.admins)[0]]
+    else:
+        span, zoom, headers = 0.02, 16, tokens[owner_id]
+    params = {"min_lat": lat - span, "min_lon": lon - span, "max_lat": lat + span, "max_lon": lon + span, "zoom": zoom}
+    return await client.get("/land-records/map", params=params, headers=headers)
+
+
+async def scenario_list(client, fixtures, tokens, rng):
+    owner_id = rng.choice(fixtures.parcels)[2]
+    return await client.get("/land-records/", params={"limit": 50}, headers=tokens[owner_id])
+
+
+async def scenario_detail(client, fixtures, tokens, rng):
+    record_id, _, owner_id, _, _ = rng.choice(fixtures.parcels)
+    return await client.get(f"/land-records/{record_id}/full", headers=tokens[owner_id])
+
+
+async def scenario_mutations(client, fixtures, tokens, rng):
+    owner_id = rng.choice(fixtures.parcels)[2]
+    return await client.get("/mutations/", params={"limit": 50}, headers=tokens[owner_id])
+
+
+async def scenario_verify(client, fixtures, tokens, rng):
+    headers = tokens[rng.choice(fixtures.parcels)[2]]
+    kind = rng.random()
+    if kind < 0.4:
+        return await client.get("/verification/property", params={"survey_number": rng.choice(fixtures.parcels)[1]}, headers=headers)
+    if kind < 0.7 and fixtures.document_hashes:
+        return await client.get("/verification/document", params={"hash": rng.choice(fixtures.document_hashes)}, headers=headers)
+    return await client.get("/verification/transaction", params={"id": rng.choice(fixtures.transaction_ids)}, headers=headers)
+
+
+async def scenario_upload(client, fixtures, tokens, rng):
+    record_id, _, owner_id, _, _ = rng.choice(fixtures.parcels)
+    content = rng.randbytes(rng.randrange(8_000, 64_000))
+    return await client.post(
+        f"/land-records/{record_id}/documents",
+        data={"document_type": "survey_map"},
+        files={"file": ("scan.pdf", content, "application/pdf")},
+        headers=tokens[owner_id],
+    )
+
+
+async def scenario_approve(client, fixtures, tokens, rng):
+    if not fixtures.pending:
+        # Nothing left to decide; keep the mix running with a verification
+        return await scenario_verify(client, fixtures, tokens, rng)
+    mutation_id = fixtures.pending.pop()
+    action = "approve" if rng.random() < 0.8 else "reject"
+    return await client.put(f"/mutations/{mutation_id}/{action}", headers=tokens[rng.choice(fixtures.admins)[0]])
+
+
+async def scenario_reports(client, fixtures, tokens, rng):
+    return await client.get("/reports/analytics", headers=tokens[rng.choice(fixtures.admins)[0]])
+
+
+SCENARIOS = {name[len("scenario_"):]: function for name, function in globals().items() if name.startswith("scenario_")}
+
+
+def instrument(app, engines):
+    """Count SQL statements per request and report them in a response header"""
+    from sqlalchemy import event
+
+    def count_query(*_):
+        counter = request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count_query)
+
+    async def counted_app(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        counter = [0]
+        request_queries.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (QUERY_HEADER.encode(), str(counter[0]).encode())]}
+            await send(message)
+
+        await app(scope, receive, send_with_count)
+
+    return counted_app
+
+
+async def drive(app, fixtures, tokens, mix: dict, requests: int, warmup: int, concurrency: int, seed: int) -> tuple:
+    import httpx
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = []
+    issued = 0
+
+    async def worker(worker_id: int, client):
+        nonlocal issued
+        rng = random.Random(seed * 1000 + worker_id)
+        while issued < warmup + requests:
+            issued += 1
+            measured = issued > warmup
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            response = await SCENARIOS[name](client, fixtures, tokens, rng)
+            elapsed = time.perf_counter() - started
+            if measured:
+                samples.append((name, elapsed, response.status_code, int(response.headers.get(QUERY_HEADER, 0))))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, client) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+    return samples, wall
+
+
+def summarize(samples: list, wall: float) -> dict:
+    groups = defaultdict(list)
+    for name, elapsed, status, queries in samples:
+        groups[name].append((elapsed, status, queries))
+    groups["overall"] = [(elapsed, status, queries) for _, elapsed, status, queries in samples]
+
+    summary = {}
+    for name, rows in sorted(groups.items()):
+        latencies = sorted(elapsed for elapsed, _, _ in rows)
+        summary[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, status, _ in rows if status >= 500 or status in (401, 403, 404, 422)),
+            "throughput_rps": round(len(rows) / wall, 2) if wall else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "queries_per_request": round(sum(queries for _, _, queries in rows) / len(rows), 2),
+        }
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"{'scenario':<12}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, row in summary.items():
+        print(f"{name:<12}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['queries_per_request']:>9}")
+
+
+def compare(summary: dict, summary_meta: dict, baseline: dict, max_regression: float) -> bool:
+    """Print the change against a baseline; return False if any scenario regressed"""
+    ok = True
+    for key in ("registry", "mix", "concurrency"):
+        if baseline.get("meta", {}).get(key) != summary_meta.get(key):
+            print(f"warning: baseline {key} {baseline.get('meta', {}).get(key)!r} differs from {summary_meta.get(key)!r}")
+    print(f"\n{'scenario':<12}{'p95 ms':>20}{'req/s':>20}{'queries':>16}")
+    for name, row in summary.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        slower = before["p95_ms"] and row["p95_ms"] > before["p95_ms"] * (1 + max_regression)
+        # Cache hits vary a little between runs; a new query per request does not
+        more_queries = row["queries_per_request"] > before["queries_per_request"] * 1.1 + 0.1
+        flag = "  REGRESSION" if slower or more_queries else ""
+        ok = ok and not flag
+        print(f"{name:<12}{before['p95_ms']:>9} -> {row['p95_ms']:<8}"
+              f"{before['throughput_rps']:>9} -> {row['throughput_rps']:<8}"
+              f"{before['queries_per_request']:>6} -> {row['queries_per_request']:<6}{flag}")
+    return ok
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", type=Path, help="registry written by benchmarks.generate")
+    parser.add_argument("--mix", choices=MIXES, default="registry")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write the results here as JSON")
+    parser.add_argument("--save-baseline", type=Path, help="write the results here as the new baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated p95 increase, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    db_path = args.db.resolve()
+    origin = Path.cwd()
+    outputs = [path.resolve() for path in (args.output, args.save_baseline) if path]
+    if not db_path.exists():
+        sys.exit(f"No registry at {db_path}; run python -m benchmarks.generate first")
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    workdir = prepare_workdir(db_path)
+    try:
+        rng = random.Random(args.seed)
+        fixtures = load_fixtures(rng)
+
+        # Imported only now, as the app binds its engine to DATABASE_URL on import
+        from app.db.database import engine, read_engine, writer
+        from app.db.migrations import migrate
+        migrate(engine)
+        from app.main import app
+        tokens = build_tokens(fixtures)
+        samples, wall = asyncio.run(drive(
+            instrument(app, {engine, read_engine}), fixtures, tokens, MIXES[args.mix],
+            args.requests, args.warmup, args.concurrency, args.seed,
+        ))
+        if writer is not None:
+            writer.close()
+        engine.dispose()
+        read_engine.dispose()
+    finally:
+        os.chdir(origin)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(samples, wall)
+    print_summary(summary)
+    results = {
+        "meta": {
+            "registry": db_path.name,
+            "mix": args.mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": summary,
+    }
+    for path in outputs:
+        path.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline is not None and not compare(summary, results["meta"], baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Maintenance commands for the land records backend.
+
+Usage: python manage.py <command> [options]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from app.db.database import SessionLocal, engine
+from app.db.migrations import (
+    MIGRATIONS, check_schema, migrate as apply_migrations, rebuild_ownership_intervals, rebuild_parcel_search,
+)
+from app.models.models import User
+from app.core.bulk_import import detect_format, import_land_records, iter_rows
+from app.core.boundaries import rebuild_boundary_index
+from app.core.duplicates import KINDS, find_duplicates as find_duplicate_candidates
+from app.core.geo import rebuild_parcel_grid
+from app.core.reports import rebuild_reports as rebuild_report_aggregates
+from app.core import export, ledger
+from app.core.scrub import scrub_documents as scrub_stored_documents
+
+
+def migrate(args):
+    """Apply pending schema migrations"""
+    applied = apply_migrations(engine, on_applied=lambda step: print(f"Applied {step.version}: {step.name}"))
+    print(f"Schema is at version {MIGRATIONS[-1].version}" + ("" if applied else " (nothing to apply)"))
+
+
+def rebuild_search(args):
+    """Reindex every land record for full-text search"""
+    with engine.begin() as conn:
+        rebuild_parcel_search(conn)
+    print("Search index rebuilt")
+
+
+def rebuild_ownership(args):
+    """Rebuild the ownership history of every land record from approved transfers"""
+    with engine.begin() as conn:
+        rebuild_ownership_intervals(conn)
+    print("Ownership history rebuilt")
+
+
+def rebuild_boundaries(args):
+    """Reindex every land record boundary for point and overlap lookups"""
+    with engine.begin() as conn:
+        indexed = rebuild_boundary_index(conn)
+    print(f"Indexed {indexed} land record boundaries")
+
+
+def find_duplicates(args):
+    """Rebuild the duplicate detection index and queue likely duplicate parcels and users for review"""
+    db = SessionLocal()
+    try:
+        for kind in [args.kind] if args.kind else KINDS:
+            result = find_duplicate_candidates(db, kind, batch_size=args.batch_size)
+            print(f"{kind}: indexed {result.indexed}, compared {result.compared} pairs, queued {result.queued} for review")
+    finally:
+        db.close()
+
+
+def rebuild_map_grid(args):
+    """Recompute map grid cells and parcel clusters for every land record"""
+    db = SessionLocal()
+    try:
+        indexed = rebuild_parcel_grid(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Indexed {indexed} located land records")
+
+
+def import_records(args):
+    """Bulk import land records from a CSV or NDJSON file, resuming from a checkpoint"""
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        sys.exit("Could not detect file format; pass --format csv or --format ndjson")
+
+    checkpoint_file = Path(args.checkpoint_file or f"{args.path}.checkpoint")
+    start_row = int(checkpoint_file.read_text()) if checkpoint_file.exists() else 0
+    if start_row:
+        print(f"Resuming after row {start_row}")
+
+    def save_checkpoint(row_number):
+        temp_file = checkpoint_file.with_suffix(".tmp")
+        temp_file.write_text(str(row_number))
+        os.replace(temp_file, checkpoint_file)
+
+    db = SessionLocal()
+    errors = open(args.errors_file, "a") if args.errors_file else None
+    try:
+        owner_id = None
+        if args.owner:
+            owner = db.query(User).filter(User.username == args.owner).first()
+            if owner is None:
+                sys.exit(f"Unknown owner: {args.owner}")
+            owner_id = owner.id
+
+        def report_error(row_number, message):
+            if errors:
+                errors.write(json.dumps({"row": row_number, "error": message}) + "\n")
+
+        with open(args.path, "rb") as stream:
+            result = import_land_records(
+                db,
+                iter_rows(stream, fmt),
+                default_owner_id=owner_id,
+                start_row=start_row,
+                batch_size=args.batch_size,
+                on_error=report_error,
+                on_checkpoint=save_checkpoint,
+            )
+    finally:
+        db.close()
+        if errors:
+            errors.close()
+    print(f"Imported {result.imported} records, {result.failed} failed, checkpoint at row {result.checkpoint}")
+
+
+def export_dataset(args):
+    """Write land records, mutations or document hashes as NDJSON or CSV, in full or changed since a time"""
+    try:
+        since = datetime.fromisoformat(args.since) if args.since else None
+    except ValueError:
+        sys.exit(f"--since must be an ISO timestamp, got {args.since!r}")
+    compress = args.gzip or (args.output or "").endswith(".gz")
+    next_since = export.watermark(datetime.now())
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with engine.connect() as conn:
+            batches = export.iter_rows(conn, args.dataset, since, batch_size=args.batch_size)
+            for chunk in export.encode(args.dataset, args.format, batches, compress):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    # On stderr, so it stays out of the export when writing to stdout
+    print(f"Next incremental export: --since {next_since.isoformat()}", file=sys.stderr)
+
+
+def rebuild_reports(args):
+    """Recompute the report aggregates from the land, mutation and document tables"""
+    db = SessionLocal()
+    try:
+        rebuild_report_aggregates(db)
+    finally:
+        db.close()
+    print("Report aggregates rebuilt")
+
+
+def seal_ledger(args):
+    """Seal every unsealed ledger entry so it has an inclusion proof"""
+    db = SessionLocal()
+    try:
+        seals = ledger.seal_all(db)
+    finally:
+        db.close()
+    print(f"Created {seals} ledger seals")
+
+
+def backfill_ledger(args):
+    """Append decided mutations and documents that predate the ledger, then seal"""
+    db = SessionLocal()
+    try:
+        appended = ledger.backfill(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Appended {appended} ledger entries")
+
+
+def scrub_documents(args):
+    """Re-hash stored documents and report any that are missing or altered"""
+    checkpoint_file = Path(args.checkpoint_file)
+    start_after = None
+    if checkpoint_file.exists() and not args.restart:
+        start_after = checkpoint_file.read_text() or None
+        print(f"Resuming after document {start_after}")
+
+    def save_checkpoint(document_id):
+        temp_file = checkpoint_file.with_suffix(".tmp")
+        temp_file.write_text(document_id)
+        os.replace(temp_file, checkpoint_file)
+
+    db = SessionLocal()
+    report = open(args.report_file, "a")
+    try:
+        def report_mismatch(mismatch):
+            report.write(json.dumps(mismatch) + "\n")
+            report.flush()
+
+        result = scrub_stored_documents(
+            db,
+            workers=args.workers,
+            max_bytes_per_second=args.max_mb_per_second * 1024 * 1024,
+            start_after=start_after,
+            batch_size=args.batch_size,
+            on_mismatch=report_mismatch,
+            on_checkpoint=save_checkpoint,
+        )
+    finally:
+        db.close()
+        report.close()
+    # The pass is complete; the next run starts over
+    checkpoint_file.unlink(missing_ok=True)
+    print(f"Checked {result.checked} documents ({result.bytes_read} bytes), {result.mismatched} failed verification")
+    if result.mismatched:
+        sys.exit(f"Mismatches written to {args.report_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrations = commands.add_parser("migrate", help=migrate.__doc__)
+    migrations.set_defaults(handler=migrate)
+
+    grid = commands.add_parser("rebuild-map-grid", help=rebuild_map_grid.__doc__)
+    grid.add_argument("--batch-size", type=int, default=5000)
+    grid.set_defaults(handler=rebuild_map_grid)
+
+    records = commands.add_parser("import-records", help=import_records.__doc__)
+    records.add_argument("path")
+    records.add_argument("--format", choices=["csv", "ndjson"])
+    records.add_argument("--owner", help="username owning rows without owner_username/owner_id")
+    records.add_argument("--batch-size", type=int, default=5000)
+    records.add_argument("--checkpoint-file", help="defaults to <path>.checkpoint")
+    records.add_argument("--errors-file", help="append per-row errors here as NDJSON")
+    records.set_defaults(handler=import_records)
+
+    exporter = commands.add_parser("export", help=export_dataset.__doc__)
+    exporter.add_argument("dataset", choices=list(export.DATASETS))
+    exporter.add_argument("--format", choices=export.FORMATS, default="ndjson")
+    exporter.add_argument("--since", help="only rows created or changed after this ISO timestamp")
+    exporter.add_argument("--output", help="defaults to stdout; gzipped if it ends in .gz")
+    exporter.add_argument("--gzip", action="store_true")
+    exporter.add_argument("--batch-size", type=int, default=export.EXPORT_BATCH_SIZE)
+    exporter.set_defaults(handler=export_dataset)
+
+    reports = commands.add_parser("rebuild-reports", help=rebuild_reports.__doc__)
+    reports.set_defaults(handler=rebuild_reports)
+
+    search = commands.add_parser("rebuild-search", help=rebuild_search.__doc__)
+    search.set_defaults(handler=rebuild_search)
+
+    ownership = commands.add_parser("rebuild-ownership", help=rebuild_ownership.__doc__)
+    ownership.set_defaults(handler=rebuild_ownership)
+
+    boundaries = commands.add_parser("rebuild-boundaries", help=rebuild_boundaries.__doc__)
+    boundaries.set_defaults(handler=rebuild_boundaries)
+
+    duplicate = commands.add_parser("find-duplicates", help=find_duplicates.__doc__)
+    duplicate.add_argument("--kind", choices=KINDS)
+    duplicate.add_argument("--batch-size", type=int, default=5000)
+    duplicate.set_defaults(handler=find_duplicates)
+
+    seal = commands.add_parser("seal-ledger", help=seal_ledger.__doc__)
+    seal.set_defaults(handler=seal_ledger)
+
+    backfill = commands.add_parser("backfill-ledger", help=backfill_ledger.__doc__)
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(handler=backfill_ledger)
+
+    scrub = commands.add_parser("scrub-documents", help=scrub_documents.__doc__)
+    scrub.add_argument("--workers", type=int, help="hashing processes, defaults to the CPU count")
+    scrub.add_argument("--max-mb-per-second", type=float, default=0, help="total read rate cap, 0 for none")
+    scrub.add_argument("--batch-size", type=int, default=1000)
+    scrub.add_argument("--checkpoint-file", default="scrub.checkpoint")
+    scrub.add_argument("--report-file", default="scrub-report.ndjson", help="append mismatches here as NDJSON")
+    scrub.add_argument("--restart", action="store_true", help="ignore the checkpoint and start a new pass")
+    scrub.set_defaults(handler=scrub_documents)
+
+    args = parser.parse_args()
+    if args.handler is not migrate:
+        check_schema(engine)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import uvicorn
-import os
+from app.db.database import engine
+from app.db.migrations import migrate
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Development server; use serve.py in production
+    migrate(engine)
+    engine.dispose()
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
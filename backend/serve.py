@@ -0,0 +1,84 @@
+"""Run the API in production: a gunicorn master supervising uvicorn worker processes.
+
+Usage: python serve.py [--workers N] [--bind HOST:PORT]
+
+Pending migrations are applied once, then the app is imported in the master
+and forked into the workers, so they start without importing anything and
+share its memory. Signals go to the master:
+
+    HUP   start fresh workers and gracefully stop the old ones
+    TERM  stop accepting connections, finish in-flight requests and exit
+    USR2  re-execute the master with new code (then QUIT the old one)
+
+Workers share the database but not memory. Metrics are written by every
+worker to PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory unless set;
+empty it before a cold start if you set it), so a scrape of /metrics served
+by any worker reports them all. The principal and verification caches stay
+per worker: a change is invalidated at once only in the worker making it,
+and the others can serve the old answer until it expires
+(PRINCIPAL_CACHE_TTL and VERIFICATION_CACHE_TTL seconds).
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+from gunicorn.app.base import BaseApplication
+from app.core.config import settings
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.db.database import engine, read_engine
+        from app.main import app
+        # Connections opened while importing must not be shared with forked workers
+        engine.dispose()
+        read_engine.dispose()
+        return app
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    # Drop the exited worker's live samples; its counters and histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency or multiprocessing.cpu_count())
+    parser.add_argument("--bind", default=f"{settings.host}:{settings.port}")
+    parser.add_argument("--skip-migrations", action="store_true", help="fail instead if the schema is behind")
+    args = parser.parse_args()
+
+    # Must be set before anything imports prometheus_client
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="land-registry-metrics-"))
+
+    if not args.skip_migrations:
+        from app.db.database import engine
+        from app.db.migrations import migrate
+        for step in migrate(engine):
+            print(f"Applied migration {step.version}: {step.name}", flush=True)
+        engine.dispose()
+
+    Server({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": settings.graceful_timeout,
+        "max_requests": settings.max_requests,
+        "max_requests_jitter": settings.max_requests // 10,
+        "accesslog": "-",
+        "child_exit": child_exit,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
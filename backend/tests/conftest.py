@@ -0,0 +1,51 @@
+import os
+import tempfile
+import uuid
+import pytest
+
+# Settings are read when the app is imported, so point it at a scratch
+# database first; the tracked .env and land_registration.db stay untouched
+_workdir = tempfile.mkdtemp(prefix="land-registry-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/registry.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+os.environ["DB_MODE"] = "simple"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.db.database import engine
+    from app.db.migrations import migrate
+    migrate(engine)
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Register a user and return their auth headers and id"""
+    from sqlalchemy import update
+    from app.db.database import SessionLocal
+    from app.models.models import User
+
+    def make(admin: bool = False):
+        name = f"user{uuid.uuid4().hex[:12]}"
+        response = client.post("/register", json={
+            "username": name, "email": f"{name}@example.com", "full_name": name.title(),
+            "password": "password", "aadhaar_number": name,
+        })
+        assert response.status_code == 200, response.text
+        user_id = response.json()["id"]
+        if admin:
+            db = SessionLocal()
+            try:
+                db.execute(update(User).where(User.id == user_id).values(is_admin=True))
+                db.commit()
+            finally:
+                db.close()
+        token = client.post("/token", data={"username": name, "password": "password"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}, user_id
+    return make
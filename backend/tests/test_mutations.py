@@ -0,0 +1,157 @@
+import uuid
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.db.database import SessionLocal, engine
+from app.models.models import LandRecord, MutationRecord
+
+
+def _parcel(client, headers) -> str:
+    survey_number = f"SV-{uuid.uuid4().hex[:10]}"
+    response = client.post("/land-records/", headers=headers, json={
+        "property_address": f"{survey_number} Main Road", "area_sqft": 1200.0, "survey_number": survey_number,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _transfer(client, headers, land_id: str, new_owner_id: str) -> str:
+    response = client.post("/mutations/", headers=headers, json={
+        "land_id": land_id, "new_owner_id": new_owner_id, "mutation_reason": "sale",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _decide(client, headers, action: str, mutation_ids):
+    return client.post("/mutations/batch", headers=headers, json={"action": action, "mutation_ids": mutation_ids})
+
+
+def _state(land_id: str, mutation_ids):
+    """The parcel's owner and version, and the status of each mutation"""
+    db = SessionLocal()
+    try:
+        parcel = db.query(LandRecord.owner_id, LandRecord.version).filter(LandRecord.id == land_id).one()
+        statuses = dict(db.query(MutationRecord.id, MutationRecord.status).filter(MutationRecord.id.in_(mutation_ids)))
+        return parcel.owner_id, parcel.version, [statuses[mutation_id] for mutation_id in mutation_ids]
+    finally:
+        db.close()
+
+
+@contextmanager
+def _run_before(statement_prefix: str, sql: str, parameters=()):
+    """Run sql on the same connection just before the first statement starting
+    with statement_prefix, as if another request had committed it in between"""
+    def interleave(conn, cursor, statement, _parameters, context, executemany):
+        if statement.startswith(statement_prefix) and not fired:
+            fired.append(statement)
+            cursor.execute(sql, parameters)
+
+    fired = []
+    event.listen(engine, "before_cursor_execute", interleave)
+    try:
+        yield
+    finally:
+        event.remove(engine, "before_cursor_execute", interleave)
+    assert fired, f"no statement started with {statement_prefix!r}"
+
+
+def test_batch_chains_transfers_of_one_parcel(client, make_user):
+    admin, _ = make_user(admin=True)
+    seller, _ = make_user()
+    _, buyer_id = make_user()
+    _, next_buyer_id = make_user()
+    land_id = _parcel(client, seller)
+    first = _transfer(client, seller, land_id, buyer_id)
+    # The buyer's onward sale, requested before the first one is decided
+    db = SessionLocal()
+    try:
+        second = MutationRecord(
+            land_id=land_id, previous_owner_id=buyer_id, new_owner_id=next_buyer_id,
+            mutation_reason="resale", transaction_id=f"MUT-{uuid.uuid4().hex[:12]}", status="pending",
+        )
+        db.add(second)
+        db.commit()
+        second = second.id
+    finally:
+        db.close()
+
+    response = _decide(client, admin, "approve", [first, second])
+
+    assert response.status_code == 200, response.text
+    assert [result["outcome"] for result in response.json()["results"]] == ["approved", "approved"]
+    assert _state(land_id, [first, second]) == (next_buyer_id, 3, ["approved", "approved"])
+
+
+def test_batch_returns_conflicting_transfer_to_pending(client, make_user):
+    admin, _ = make_user(admin=True)
+    seller, _ = make_user()
+    _, buyer_id = make_user()
+    _, other_buyer_id = make_user()
+    land_id = _parcel(client, seller)
+    first = _transfer(client, seller, land_id, buyer_id)
+    second = _transfer(client, seller, land_id, other_buyer_id)
+
+    response = _decide(client, admin, "approve", [first, second])
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [result["outcome"] for result in body["results"]] == ["approved", "conflict"]
+    assert (body["approved"], body["conflicts"]) == (1, 1)
+    assert _state(land_id, [first, second]) == (buyer_id, 2, ["approved", "pending"])
+    # The released mutation can be decided again
+    response = _decide(client, admin, "reject", [second])
+    assert [result["outcome"] for result in response.json()["results"]] == ["rejected"]
+
+
+def test_single_approval_of_conflicting_transfer_is_409(client, make_user):
+    admin, _ = make_user(admin=True)
+    seller, _ = make_user()
+    _, buyer_id = make_user()
+    _, other_buyer_id = make_user()
+    land_id = _parcel(client, seller)
+    first = _transfer(client, seller, land_id, buyer_id)
+    second = _transfer(client, seller, land_id, other_buyer_id)
+    assert client.put(f"/mutations/{first}/approve", headers=admin).status_code == 200
+
+    response = client.put(f"/mutations/{second}/approve", headers=admin)
+
+    assert response.status_code == 409
+    assert _state(land_id, [second]) == (buyer_id, 2, ["pending"])
+
+
+def test_batch_skips_mutations_decided_by_another_request(client, make_user):
+    admin, _ = make_user(admin=True)
+    seller, seller_id = make_user()
+    _, buyer_id = make_user()
+    land_id = _parcel(client, seller)
+    raced = _transfer(client, seller, land_id, buyer_id)
+    other_land_id = _parcel(client, seller)
+    claimed = _transfer(client, seller, other_land_id, buyer_id)
+
+    # Rejected after the batch read it as pending, before the batch claims it
+    reject = "UPDATE mutation_records SET status = 'rejected' WHERE id = ?"
+    with _run_before("UPDATE mutation_records SET status", reject, (raced,)):
+        response = _decide(client, admin, "approve", [raced, claimed])
+
+    assert response.json()["results"] == [
+        {"mutation_id": raced, "outcome": "invalid", "detail": "Mutation was decided by another request"},
+        {"mutation_id": claimed, "outcome": "approved", "detail": None},
+    ]
+    assert _state(land_id, [raced]) == (seller_id, 1, ["rejected"])
+    assert _state(other_land_id, [claimed]) == (buyer_id, 2, ["approved"])
+
+
+def test_batch_stale_parcel_is_409_and_rolled_back(client, make_user):
+    admin, _ = make_user(admin=True)
+    seller, seller_id = make_user()
+    _, buyer_id = make_user()
+    land_id = _parcel(client, seller)
+    mutation_id = _transfer(client, seller, land_id, buyer_id)
+
+    # Another request updates the parcel after the batch read its version
+    bump = "UPDATE land_records SET version = version + 1 WHERE id = ?"
+    with _run_before("UPDATE land_records SET owner_id", bump, (land_id,)):
+        response = _decide(client, admin, "approve", [mutation_id])
+
+    assert response.status_code == 409
+    assert _state(land_id, [mutation_id]) == (seller_id, 1, ["pending"])
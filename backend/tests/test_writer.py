@@ -0,0 +1,217 @@
+import threading
+import time
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, insert, select, update
+from sqlalchemy.orm import declarative_base, sessionmaker
+from app.db import database
+from app.db.database import RoutingSession
+from app.db.writer import GroupCommitFailed, SerialWriter, WriterTimeout
+
+Base = declarative_base()
+
+
+class Note(Base):
+    __tablename__ = "notes"
+    id = Column(Integer, primary_key=True)
+    body = Column(String)
+
+
+notes = Note.__table__
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A write engine set up as in production mode (see db/database.py)"""
+    engine = create_engine(f"sqlite:///{tmp_path}/writer.db", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _manual_transactions(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.info.get("serial_writer") else "BEGIN")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def commits(engine):
+    """COMMITs of the writer's shared transaction"""
+    seen = []
+    event.listen(engine, "commit", lambda conn: seen.append(conn))
+    return seen
+
+
+def _bodies(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(select(notes.c.body)).scalars())
+
+
+def _write(writer, body, commit=True):
+    """Write a note the way a RoutingSession does: in a savepoint on the shared connection"""
+    owner = object()
+    conn = writer.acquire(owner)
+    savepoint = conn.begin_nested()
+    conn.execute(insert(notes).values(body=body))
+    if commit:
+        savepoint.commit()
+    else:
+        savepoint.rollback()
+    writer.release(owner, committed=commit)
+
+
+def _queue_writers(writer, targets):
+    """Start a thread per target while the writer is held, so all of them
+    queue up, then let them through; returns each thread's error or None"""
+    gate = object()
+    writer.acquire(gate)
+    errors = [None] * len(targets)
+
+    def run(index, target):
+        try:
+            target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=run, args=(index, target)) for index, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while writer._waiting < len(threads):
+        assert time.monotonic() < deadline, "writers did not queue up"
+        time.sleep(0.001)
+    writer.release(gate, committed=False)
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+    return errors
+
+
+def test_concurrent_commits_share_one_commit(engine, commits):
+    writer = SerialWriter(engine, window=10, max_batch=100, timeout=5)
+    bodies = [f"note {n}" for n in range(8)]
+
+    errors = _queue_writers(writer, [lambda body=body: _write(writer, body) for body in bodies])
+
+    assert errors == [None] * len(bodies)
+    assert len(commits) == 1
+    assert _bodies(engine) == set(bodies)
+    writer.close()
+
+
+def test_full_batch_commits_without_waiting_for_the_rest(engine, commits):
+    writer = SerialWriter(engine, window=10, max_batch=3, timeout=5)
+    bodies = [f"note {n}" for n in range(6)]
+
+    errors = _queue_writers(writer, [lambda body=body: _write(writer, body) for body in bodies])
+
+    assert errors == [None] * len(bodies)
+    assert len(commits) == 2
+    assert _bodies(engine) == set(bodies)
+    writer.close()
+
+
+def test_rollback_in_a_batch_keeps_the_other_writes(engine, commits):
+    writer = SerialWriter(engine, window=10, max_batch=100, timeout=5)
+
+    errors = _queue_writers(writer, [
+        lambda: _write(writer, "first"),
+        lambda: _write(writer, "rolled back", commit=False),
+        lambda: _write(writer, "last"),
+    ])
+
+    assert errors == [None, None, None]
+    assert len(commits) == 1
+    assert _bodies(engine) == {"first", "last"}
+    writer.close()
+
+
+def test_failed_commit_fails_every_transaction_in_the_batch(engine, commits):
+    writer = SerialWriter(engine, window=10, max_batch=100, timeout=5)
+
+    def fail(conn):
+        raise OSError("disk I/O error")
+
+    event.listen(engine, "commit", fail)
+    errors = _queue_writers(writer, [lambda body=body: _write(writer, body) for body in ("a", "b", "c")])
+    event.remove(engine, "commit", fail)
+
+    assert all(isinstance(error, GroupCommitFailed) for error in errors), errors
+    assert all(isinstance(error.__cause__, OSError) for error in errors)
+    assert _bodies(engine) == set()
+    # The broken connection is replaced on the next write
+    _write(writer, "after")
+    assert _bodies(engine) == {"after"}
+    writer.close()
+
+
+def test_acquire_times_out_while_the_writer_is_held(engine):
+    writer = SerialWriter(engine, window=0.01, max_batch=100, timeout=0.05)
+    holder = object()
+    writer.acquire(holder)
+
+    started = time.monotonic()
+    with pytest.raises(WriterTimeout):
+        writer.acquire(object())
+
+    assert time.monotonic() - started >= 0.05
+    writer.release(holder, committed=False)
+    _write(writer, "after")
+    assert _bodies(engine) == {"after"}
+    writer.close()
+
+
+@pytest.fixture
+def routing(engine, monkeypatch):
+    """Sessions routed between a read engine and a writer, as in production mode"""
+    read_engine = create_engine(engine.url, connect_args={"check_same_thread": False})
+    writer = SerialWriter(engine, window=0.01, max_batch=100, timeout=5)
+    monkeypatch.setattr(database, "read_engine", read_engine)
+    monkeypatch.setattr(database, "writer", writer)
+    yield sessionmaker(class_=RoutingSession, autoflush=False, join_transaction_mode="create_savepoint"), read_engine
+    writer.close()
+    read_engine.dispose()
+
+
+def test_session_reads_from_the_read_pool_until_dml(engine, routing):
+    Session, read_engine = routing
+    session = Session()
+    try:
+        assert session.get_bind() is read_engine
+        assert session.execute(select(notes.c.id)).all() == []
+        assert database.writer._owner is None
+
+        session.execute(insert(notes).values(body="first"))
+
+        assert database.writer._owner is session
+        # Reads after the first write see it, on the writer
+        assert session.get_bind() is database.writer._connection
+        assert session.execute(select(notes.c.body)).scalars().all() == ["first"]
+        session.commit()
+        assert database.writer._owner is None
+        assert session.get_bind() is read_engine
+    finally:
+        session.close()
+    assert _bodies(engine) == {"first"}
+
+
+def test_session_switches_to_the_writer_on_flush(engine, routing):
+    Session, read_engine = routing
+    session = Session()
+    try:
+        session.add(Note(body="flushed"))
+        assert database.writer._owner is None
+
+        session.flush()
+
+        assert database.writer._owner is session
+        session.execute(update(notes).values(body="updated"))
+        session.rollback()
+        assert database.writer._owner is None
+    finally:
+        session.close()
+    assert _bodies(engine) == set()
@@ -74,6 +74,18 @@ const api = {
         }
     },
     
+    getMapFeatures: async (bounds, zoom) => {
+        try {
+            const response = await axiosInstance.get('/land-records/map', {
+                params: { ...bounds, zoom }
+            });
+            return response.data;
+        } catch (error) {
+            console.error('Failed to fetch map features:', error);
+            throw new Error(error.response?.data?.detail || 'Failed to fetch map features');
+        }
+    },
+    
     getLandRecord: async (recordId) => {
         try {
             console.log(`Fetching land record details for ID: ${recordId}`);
@@ -85,6 +97,16 @@ const api = {
         }
     },
     
+    getLandRecordFull: async (recordId) => {
+        try {
+            const response = await axiosInstance.get(`/land-records/${recordId}/full`);
+            return response.data;
+        } catch (error) {
+            console.error('Failed to fetch land record details:', error);
+            throw new Error(error.response?.data?.detail || 'Failed to fetch land record details');
+        }
+    },
+    
     createLandRecord: async (landRecordData) => {
         try {
             console.log('Creating new land record with data:', landRecordData);
@@ -108,6 +130,33 @@ const api = {
         }
     },
     
+    // Document file as a Blob; the server supports Range for resuming large scans
+    downloadDocument: async (landId, documentId) => {
+        try {
+            const response = await axiosInstance.get(
+                `/land-records/${landId}/documents/${documentId}/file`,
+                { responseType: 'blob', timeout: 0 }
+            );
+            return response.data;
+        } catch (error) {
+            console.error('Failed to download document:', error);
+            throw new Error(error.response?.status === 404 ? 'Document not found' : 'Failed to download document');
+        }
+    },
+    
+    // Small JPEG of the document's first page, or null for files without one
+    getDocumentPreview: async (landId, documentId) => {
+        try {
+            const response = await axiosInstance.get(
+                `/land-records/${landId}/documents/${documentId}/preview`,
+                { responseType: 'blob' }
+            );
+            return response.data;
+        } catch (error) {
+            return null;
+        }
+    },
+    
     uploadDocument: async (landId, documentType, file) => {
         try {
             console.log(`Uploading document for land ID: ${landId}, type: ${documentType}`);
@@ -327,6 +327,13 @@ document.addEventListener('DOMContentLoaded', function() {
           gap: 10px;
         }
         
+        .document-preview {
+          width: 100%;
+          height: 100%;
+          object-fit: cover;
+          border-radius: 50%;
+        }
+        
         .document-icon {
           font-size: 20px;
           min-width: 40px;
@@ -788,6 +795,7 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
         
         documentsList.appendChild(docCard);
+        loadDocumentPreview(doc, docCard.querySelector('.document-icon'));
         
         // Add event listeners
         const viewBtn = docCard.querySelector('.view-btn');
@@ -883,16 +891,42 @@ document.addEventListener('DOMContentLoaded', function() {
       }
     }
     
+    // Replace a card's icon with a thumbnail of the document's first page
+    async function loadDocumentPreview(doc, iconElement) {
+      if (!iconElement || typeof api === 'undefined' || !doc.land_id) return;
+      
+      const preview = await api.getDocumentPreview(doc.land_id, doc.id);
+      if (!preview) return;
+      
+      const image = new Image();
+      image.src = URL.createObjectURL(preview);
+      image.alt = doc.file_name;
+      image.className = 'document-preview';
+      image.onload = () => URL.revokeObjectURL(image.src);
+      iconElement.replaceChildren(image);
+    }
+    
     // Download document
-    function downloadDocument(document) {
-      // In a real implementation, this would download the actual file
-      // For this demo, we'll just show a notification
-      showNotification(`Downloading ${document.file_name}...`, 'info');
+    async function downloadDocument(doc) {
+      showNotification(`Downloading ${doc.file_name}...`, 'info');
       
-      // Simulate a download delay
-      setTimeout(() => {
-        showNotification(`${document.file_name} downloaded successfully!`, 'success');
-      }, 1500);
+      try {
+        const blob = await api.downloadDocument(doc.land_id, doc.id);
+        
+        // Save through a temporary link so the browser keeps the file name
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(blob);
+        link.download = doc.file_name;
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+        
+        showNotification(`${doc.file_name} downloaded successfully!`, 'success');
+      } catch (error) {
+        console.error('Failed to download document:', error);
+        showNotification(`Failed to download ${doc.file_name}: ${error.message}`, 'error');
+      }
     }
     
 })
\ No newline at end of file
@@ -3,6 +3,9 @@ let map;
 let parcelsLayer;
 let selectedParcel = null;
 let allProperties = []; // Store all properties for reference
+let mapFeaturesHandler = null;
+let mapFeaturesRequest = 0; // Responses to superseded viewports are dropped
+let pendingPopupId = null;
 
 function initMap() {
     try {
@@ -113,98 +116,54 @@ function performPropertySearch(query) {
     }
 }
 
+// Convert a land record to the feature shape used by the details panel
+function recordFeature(record) {
+    return {
+        type: "Feature",
+        properties: {
+            id: record.id,
+            property_address: record.property_address,
+            area_sqft: record.area_sqft,
+            survey_number: record.survey_number,
+            document_hash: record.document_hash,
+            created_at: record.created_at,
+            updated_at: record.updated_at,
+            owner_id: record.owner_id,
+            status: "verified" // Default status, can be updated based on actual data
+        },
+        geometry: record.geo_latitude && record.geo_longitude ? {
+            type: "Point",
+            coordinates: [record.geo_longitude, record.geo_latitude]
+        } : null
+    };
+}
+
 async function loadLandRecords() {
     try {
         console.log('Loading land records...');
         const records = await api.getLandRecords();
         console.log('Records received:', records);
         
-        // Store all properties for reference
+        // Store the first page for search; the map itself loads by viewport
         allProperties = records;
         
-        // Convert records to GeoJSON
-        const geojsonFeatures = records.map(record => {
-            // Skip records without coordinates
-            if (!record.geo_latitude || !record.geo_longitude) {
-                console.log('Record missing coordinates:', record.id);
-                return null;
-            }
-            
-            return {
-                type: "Feature",
-                properties: {
-                    id: record.id,
-                    property_address: record.property_address,
-                    area_sqft: record.area_sqft,
-                    survey_number: record.survey_number,
-                    document_hash: record.document_hash,
-                    created_at: record.created_at,
-                    updated_at: record.updated_at,
-                    owner_id: record.owner_id,
-                    status: "verified" // Default status, can be updated based on actual data
-                },
-                geometry: {
-                    type: "Point",
-                    coordinates: [record.geo_longitude, record.geo_latitude]
-                }
-            };
-        }).filter(feature => feature !== null);
-        
-        console.log('GeoJSON features:', geojsonFeatures);
-        
-        // Create GeoJSON layer
-        if (parcelsLayer) {
-            map.removeLayer(parcelsLayer);
+        if (!mapFeaturesHandler) {
+            mapFeaturesHandler = () => loadMapFeatures();
+            map.on('moveend', mapFeaturesHandler);
         }
         
-        parcelsLayer = L.geoJSON({
-            type: "FeatureCollection",
-            features: geojsonFeatures
-        }, {
-            pointToLayer: function(feature, latlng) {
-                return L.circle(latlng, {
-                    radius: 50, // Adjust based on your needs
-                    color: getStatusColor(feature.properties.status),
-                    fillColor: getStatusColor(feature.properties.status),
-                    fillOpacity: 0.2,
-                    weight: 2
-                });
-            },
-            onEachFeature: function(feature, layer) {
-                // Add popup
-                const popupContent = `
-                    <div class="parcel-popup">
-                        <h4>${feature.properties.property_address.split(',')[0] || 'Property'}</h4>
-                        <p>${feature.properties.property_address.split(',').slice(1).join(',').trim() || 'No address details'}</p>
-                        <p><strong>Survey Number:</strong> ${feature.properties.survey_number}</p>
-                        <p><strong>Area:</strong> ${feature.properties.area_sqft} sq.ft</p>
-                        <button class="popup-view-btn" onclick="selectPropertyById('${feature.properties.id}')">View Details</button>
-                    </div>
-                `;
-                layer.bindPopup(popupContent);
-                
-                // Add click handler
-                layer.on('click', function() {
-                    selectedParcel = feature;
-                    updatePropertyDetails(feature);
-                    
-                    // Update the selected property in the sidebar
-                    updateSelectedPropertySidebar(feature);
-                });
-                
-                // Store reference to layer in feature for later use
-                feature.layer = layer;
-            }
-        }).addTo(map);
-        
-        // Fit map to parcels if there are any
-        if (geojsonFeatures.length > 0) {
-            map.fitBounds(parcelsLayer.getBounds());
+        // Fit map to the records if any are located; the move then loads its features
+        const located = records.filter(record => record.geo_latitude && record.geo_longitude);
+        if (located.length > 0) {
+            map.fitBounds(L.latLngBounds(located.map(record => [record.geo_latitude, record.geo_longitude])), {
+                maxZoom: 16
+            });
         } else {
-            console.log('No features with coordinates found');
+            console.log('No records with coordinates found');
+            await loadMapFeatures();
         }
         
-        return geojsonFeatures;
+        return records;
     } catch (error) {
         console.error('Failed to load land records:', error);
         alert('Failed to load land records. Please try again later.');
@@ -212,6 +171,93 @@ async function loadLandRecords() {
     }
 }
 
+// Load the clusters and parcels inside the current viewport
+async function loadMapFeatures() {
+    const request = ++mapFeaturesRequest;
+    const bounds = map.getBounds();
+    const clamp = (value, limit) => Math.max(-limit, Math.min(limit, value));
+    
+    try {
+        const collection = await api.getMapFeatures({
+            min_lat: clamp(bounds.getSouth(), 90),
+            min_lon: clamp(bounds.getWest(), 180),
+            max_lat: clamp(bounds.getNorth(), 90),
+            max_lon: clamp(bounds.getEast(), 180)
+        }, Math.round(map.getZoom()));
+        
+        // A later move has already asked for another viewport
+        if (request !== mapFeaturesRequest) return [];
+        
+        renderMapFeatures(collection.features);
+        return collection.features;
+    } catch (error) {
+        console.error('Failed to load map features:', error);
+        return [];
+    }
+}
+
+function renderMapFeatures(features) {
+    if (parcelsLayer) {
+        map.removeLayer(parcelsLayer);
+    }
+    
+    parcelsLayer = L.geoJSON({
+        type: "FeatureCollection",
+        features: features
+    }, {
+        pointToLayer: function(feature, latlng) {
+            if (feature.properties.cluster) {
+                const count = feature.properties.point_count;
+                const size = count < 100 ? 32 : count < 1000 ? 40 : 48;
+                return L.marker(latlng, {
+                    icon: L.divIcon({
+                        className: 'parcel-cluster',
+                        html: `<div>${count}</div>`,
+                        iconSize: [size, size]
+                    })
+                });
+            }
+            return L.circle(latlng, {
+                radius: 50, // Adjust based on your needs
+                color: getStatusColor('verified'),
+                fillColor: getStatusColor('verified'),
+                fillOpacity: 0.2,
+                weight: 2
+            });
+        },
+        onEachFeature: function(feature, layer) {
+            if (feature.properties.cluster) {
+                // Zoom in on a cluster to split it up
+                layer.on('click', function() {
+                    map.setView(layer.getLatLng(), Math.min(map.getZoom() + 2, map.getMaxZoom()));
+                });
+                return;
+            }
+            
+            // Add popup
+            const popupContent = `
+                <div class="parcel-popup">
+                    <h4>Survey #${feature.properties.survey_number}</h4>
+                    <p><strong>Area:</strong> ${feature.properties.area_sqft} sq.ft</p>
+                    <button class="popup-view-btn" onclick="selectPropertyById('${feature.properties.id}')">View Details</button>
+                </div>
+            `;
+            layer.bindPopup(popupContent);
+            
+            // Add click handler
+            layer.on('click', function() {
+                selectPropertyById(feature.properties.id);
+            });
+            
+            // Reopen the popup of a parcel selected before the map moved
+            if (pendingPopupId === feature.properties.id) {
+                pendingPopupId = null;
+                setTimeout(() => layer.openPopup(), 0);
+            }
+        }
+    }).addTo(map);
+}
+
 function getStatusColor(status) {
     switch(status) {
         case 'verified':
@@ -247,11 +293,9 @@ function updatePropertyDetails(feature) {
 
 async function fetchPropertyDetails(recordId) {
     try {
-        // Get full record details
-        const record = await api.getLandRecord(recordId);
-        
-        // Get documents for this record
-        const documents = await api.getDocuments(recordId);
+        // Get the record with its owner, documents and history in one request
+        const record = await api.getLandRecordFull(recordId);
+        const documents = record.documents;
         
         // Update document list
         const documentList = document.getElementById('document-list');
@@ -284,16 +328,14 @@ async function fetchPropertyDetails(recordId) {
             });
         }
         
-        // Try to fetch owner information
+        // Show owner information
         try {
-            // In a real app, you would have an API endpoint to get user details
-            // For now, we'll use the owner_id and make a fake display
-            const ownerId = record.owner_id;
-            const ownerInitials = ownerId.split('-')[0].substring(0, 2).toUpperCase();
+            const ownerName = record.owner ? record.owner.full_name : `Owner ID: ${record.owner_id.substring(0, 8)}...`;
+            const ownerInitials = ownerName.split(/\s+/).map(part => part[0]).join('').substring(0, 2).toUpperCase();
             
             document.getElementById('owner-initials').textContent = ownerInitials;
-            document.getElementById('owner-name').textContent = `Owner ID: ${ownerId.substring(0, 8)}...`;
-            document.getElementById('owner-since').textContent = 'Owner since: ' + new Date(record.created_at).toLocaleDateString('en-US', {
+            document.getElementById('owner-name').textContent = ownerName;
+            document.getElementById('owner-since').textContent = 'Owner since: ' + new Date(record.owner_since).toLocaleDateString('en-US', {
                 year: 'numeric', month: 'short', day: 'numeric'
             });
         } catch (ownerError) {
@@ -318,49 +360,19 @@ function selectPropertyById(propertyId) {
     if (property) {
         console.log('Property found in local cache:', property);
         
-        // Check if we have a GeoJSON feature for this property
+        // Show the full record, then the parcel on the map if it is located
+        const feature = recordFeature(property);
+        selectedParcel = feature;
+        updatePropertyDetails(feature);
+        updateSelectedPropertySidebar(feature);
+        
         if (parcelsLayer) {
-            let foundFeature = null;
-            
-            parcelsLayer.eachLayer(layer => {
-                if (layer.feature && layer.feature.properties.id === propertyId) {
-                    foundFeature = layer.feature;
-                    
-                    // Zoom to the feature
-                    map.setView([property.geo_latitude, property.geo_longitude], 15);
-                    
-                    // Open popup
-                    layer.openPopup();
-                    
-                    // Set as selected
-                    selectedParcel = foundFeature;
-                    
-                    // Update UI
-                    updatePropertyDetails(foundFeature);
-                    updateSelectedPropertySidebar(foundFeature);
-                }
-            });
-            
-            if (!foundFeature) {
-                console.log('Property found but no corresponding layer. May be missing coordinates.');
-                
-                // Create a temporary feature object to display details
-                const tempFeature = {
-                    properties: {
-                        id: property.id,
-                        property_address: property.property_address,
-                        area_sqft: property.area_sqft,
-                        survey_number: property.survey_number,
-                        document_hash: property.document_hash,
-                        created_at: property.created_at,
-                        updated_at: property.updated_at,
-                        owner_id: property.owner_id
-                    }
-                };
-                
-                selectedParcel = tempFeature;
-                updatePropertyDetails(tempFeature);
-                updateSelectedPropertySidebar(tempFeature);
+            if (feature.geometry) {
+                // The viewport reloads once the map has moved; its parcel layer opens the popup
+                pendingPopupId = propertyId;
+                map.setView([property.geo_latitude, property.geo_longitude], Math.max(map.getZoom(), 15));
+            } else {
+                console.log('Property found but it has no coordinates.');
             }
         } else {
             console.log('Parcel layer not initialized yet.');
@@ -6,6 +6,8 @@ document.addEventListener('DOMContentLoaded', function() {
       initialized: false,
       propertyCache: null,
       mutationCache: null,
+      eventStream: null, // AbortController of the open mutation event stream
+      lastEventId: null,
       debugMode: localStorage.getItem('debugMode') === 'true' || false,
       apiAvailable: false, // Default to false to ensure fallback works
       apiBaseUrl: localStorage.getItem('apiBaseUrl') || window.location.origin
@@ -162,6 +164,7 @@ document.addEventListener('DOMContentLoaded', function() {
       // Initialize mutation UI functionality in a specific order
       setTimeout(() => {
         loadMutations();
+        connectMutationEvents();
         initMutationFilter();
         initPropertySelect();
         initReasonSelect();
@@ -1095,8 +1098,10 @@ document.addEventListener('DOMContentLoaded', function() {
           mutationForm.reset();
           document.getElementById('other-reason-group').style.display = 'none';
           
-          // Refresh mutations list
-          loadMutations(true);
+          // Refresh mutations list, unless the event stream will deliver it
+          if (!window.mutationApp.eventStream) {
+            loadMutations(true);
+          }
           
           // Show confirmation modal
           showMutationConfirmation(result);
@@ -1878,6 +1883,91 @@ document.addEventListener('DOMContentLoaded', function() {
       });
     }
     
+    // Keep the mutations list current from the server's event stream. Uses
+    // fetch rather than EventSource, which cannot send the Authorization header.
+    async function connectMutationEvents() {
+      const app = window.mutationApp;
+      const token = localStorage.getItem('token');
+      if (!app.apiAvailable || !token || app.eventStream) {
+        return;
+      }
+      
+      const controller = new AbortController();
+      app.eventStream = controller;
+      let retryMs = 3000;
+      
+      try {
+        const headers = { 'Authorization': `Bearer ${token}` };
+        if (app.lastEventId) {
+          headers['Last-Event-ID'] = app.lastEventId;
+        }
+        const response = await fetch(`${app.apiBaseUrl}/api/mutations/events`, {
+          headers,
+          signal: controller.signal
+        });
+        if (!response.ok) {
+          throw new Error(`Server returned ${response.status}`);
+        }
+        
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          
+          // Messages end with a blank line
+          let end;
+          while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const message = { event: 'message', data: '' };
+            for (const line of buffer.slice(0, end).split('\n')) {
+              const separator = line.indexOf(': ');
+              if (line.startsWith(':') || separator === -1) continue;
+              message[line.slice(0, separator)] = line.slice(separator + 2);
+            }
+            buffer = buffer.slice(end + 2);
+            if (message.retry) retryMs = Number(message.retry);
+            if (message.id) app.lastEventId = message.id;
+            handleMutationEvent(message);
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.warn('Mutation event stream interrupted:', error.message);
+      }
+      
+      // Reconnect, resuming after the last event received
+      if (app.eventStream === controller) {
+        app.eventStream = null;
+        setTimeout(connectMutationEvents, retryMs);
+      }
+    }
+    
+    // Apply one server event to the cached mutations list
+    function handleMutationEvent(message) {
+      const app = window.mutationApp;
+      if (message.event === 'reset') {
+        // Changes were missed while disconnected
+        loadMutations(true);
+        return;
+      }
+      if (message.event !== 'mutation' || !app.mutationCache) {
+        return;
+      }
+      
+      const { mutation } = JSON.parse(message.data);
+      const index = app.mutationCache.findIndex(existing => existing.id === mutation.id);
+      if (index === -1) {
+        app.mutationCache.unshift(mutation);
+      } else {
+        app.mutationCache[index] = { ...app.mutationCache[index], ...mutation };
+      }
+      
+      if (document.getElementById('mutations-list')) {
+        renderMutationsList(app.mutationCache);
+      }
+    }
+    
     async function createMutation(mutationData) {
       try {
         console.log('Creating mutation with data:', mutationData);